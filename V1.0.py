@@ -1,176 +1,175 @@
 import tkinter as tk
 from tkinter import *
 from tkinter import ttk, messagebox, filedialog
-import sqlite3
-import random
 import datetime
-from tkcalendar import DateEntry
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 import os
 
+from rims import schema, aggregates, report, uiprofile
+from rims.availability import rental_period
+from rims.charts import ChartPanel, PieChart, BarChart, LineChart, TextChart
+from rims.lazy import lazy_import
+from rims.metrics import timed
+from rims.paging import KeysetPager
+from rims.picker import CustomerPicker
+from rims.pricing import PricingEngine, DISCOUNT_TIERS
+from rims.service import RentalService
+from rims.tasks import TaskExecutor
+from rims.virtual_tree import VirtualTreeview
+
+# Heavy stacks load on first use, not at startup: matplotlib when the Analytics
+# tab is first opened (reportlab is imported by rims.report on the first export)
+backend_tkagg = lazy_import("matplotlib.backends.backend_tkagg")
+mpl_figure = lazy_import("matplotlib.figure")
+
 class DatabaseManager:
-    def __init__(self, db_name="rental_inventory.db"):
+    # columns the LIKE fallback searches when FTS5 is unavailable
+    LIKE_FIELDS = ("receipt_ref", "product_type")
+    
+    # column order of the tuples save_rental() takes (the rentals table minus rental_id/created_date)
+    RENTAL_COLUMNS = schema.RENTALS_COLUMN_NAMES[1:-1]
+    
+    def __init__(self, db_name="rental_inventory.db", profile=None, write_behind=None):
         self.db_name = db_name
-        self.init_database()
-    
-    def init_database(self):
-        """Initialize the database and create tables"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # Create customers table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_name TEXT NOT NULL,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                created_date DATE DEFAULT CURRENT_DATE
-            )
-        ''')
-        
-        # Create rentals table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rentals (
-                rental_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                receipt_ref TEXT UNIQUE,
-                product_type TEXT,
-                product_code TEXT,
-                no_days INTEGER,
-                cost_per_day REAL,
-                account_open TEXT,
-                app_date DATE,
-                next_credit_review DATE,
-                last_credit_review INTEGER,
-                date_rev DATE,
-                credit_limit TEXT,
-                credit_check TEXT,
-                sett_due_day INTEGER,
-                payment_due TEXT,
-                discount REAL,
-                deposit TEXT,
-                pay_due_day TEXT,
-                payment_method TEXT,
-                check_credit INTEGER,
-                term_agreed INTEGER,
-                account_on_hold INTEGER,
-                restrict_mailing INTEGER,
-                tax REAL,
-                subtotal REAL,
-                total REAL,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
-            )
-        ''')
-        
-        # Create products table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                product_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_type TEXT NOT NULL,
-                product_code TEXT UNIQUE,
-                cost_per_day REAL,
-                available_quantity INTEGER DEFAULT 1,
-                status TEXT DEFAULT 'Available'
-            )
-        ''')
-        
-        # Insert default products if they don't exist
-        default_products = [
-            ('Car', 'CAR452', 12.00, 5),
-            ('Van', 'VAN775', 19.00, 3),
-            ('Minibus', 'MIN334', 12.00, 2),
-            ('Truck', 'TRK7483', 15.00, 2)
-        ]
-        
-        for product in default_products:
-            cursor.execute('''
-                INSERT OR IGNORE INTO products (product_type, product_code, cost_per_day, available_quantity)
-                VALUES (?, ?, ?, ?)
-            ''', product)
-        
-        conn.commit()
-        conn.close()
-    
-    def save_rental(self, rental_data):
-        """Save rental data to database"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO rentals (
-                customer_id, receipt_ref, product_type, product_code, no_days, cost_per_day,
-                account_open, app_date, next_credit_review, last_credit_review, date_rev,
-                credit_limit, credit_check, sett_due_day, payment_due, discount, deposit,
-                pay_due_day, payment_method, check_credit, term_agreed, account_on_hold,
-                restrict_mailing, tax, subtotal, total
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', rental_data)
-        
-        conn.commit()
-        conn.close()
+        # Schema setup, search, bookings and the product catalog live in the headless
+        # service (rims/service.py), shared with the HTTP API and batch jobs.
+        # write_behind / $RIMS_WRITE_BEHIND turns on group commit of saves (rims/writebehind.py)
+        # $RIMS_METRICS times every statement and the @timed methods below (rims/metrics.py)
+        self.service = RentalService(db_name, profile, tiers=DISCOUNT_TIERS, write_behind=write_behind)
+        self.pool = self.service.pool
+        # WAL + pragmas; profile defaults to $RIMS_PROFILE or "desk"
+        self.storage = self.service.storage
+        # FTS5 search (LIKE fallback when FTS5 is not compiled in)
+        self.search = self.service.search
+        # Date-interval bookings checked against products.available_quantity
+        self.availability = self.service.availability
+        # Products by type/code in memory; reloaded only when products change
+        self.catalog = self.service.catalog
+    
+    def connect(self):
+        """Borrow this thread's long-lived connection (commits on exit)"""
+        return self.pool.connect()
+    
+    def pool_stats(self):
+        """Connection-reuse counters from the shared connection manager"""
+        return self.service.pool_stats()
+    
+    def checkpoint(self, mode="PASSIVE"):
+        """Fold the WAL back into the main database file on demand"""
+        return self.service.checkpoint(mode)
     
+    def close(self):
+        """Commit anything still queued for write-behind"""
+        self.service.close()
+    
+    @timed("DatabaseManager.save_rental")
+    def save_rental(self, rental_data, start=None, end=None):
+        """Save rental data to database, booking a unit of its product for [start, end).
+        Raises OverbookedError (nothing is saved) when every unit is taken.
+        An empty receipt ref is allocated from the counter; returns the ref saved.
+        With write-behind on, returns once the batch holding the rental has committed."""
+        rental = dict(zip(self.RENTAL_COLUMNS, rental_data))
+        return self.service.write(self.service.insert_rental, rental, start, end)[1]
+    
+    @timed("DatabaseManager.available_units")
+    def available_units(self, product_code, start, end):
+        """Units of product_code free for the whole of [start, end) (None if untracked)"""
+        return self.service.available(product_code, start, end)
+    
+    @timed("DatabaseManager.get_all_rentals")
     def get_all_rentals(self):
         """Get all rental records"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM rentals ORDER BY created_date DESC')
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        with self.connect() as conn:
+            return conn.execute('SELECT * FROM rentals ORDER BY created_date DESC').fetchall()
     
+    @timed("DatabaseManager.search_rentals")
     def search_rentals(self, search_term):
-        """Search rentals by receipt reference or product type"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM rentals 
-            WHERE receipt_ref LIKE ? OR product_type LIKE ?
-            ORDER BY created_date DESC
-        ''', (f'%{search_term}%', f'%{search_term}%'))
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        """Search rentals by receipt reference, product type or code (prefix match)"""
+        where, params = self.search.rentals_filter(search_term, like_fields=self.LIKE_FIELDS)
+        with self.connect() as conn:
+            return conn.execute(f'''
+                SELECT * FROM rentals 
+                WHERE {where}
+                ORDER BY created_date DESC
+            ''', params).fetchall()
+    
+    def rental_pager(self, search_term=None, page_size=100):
+        """Newest-first keyset pages of rentals for the history list"""
+        if search_term:
+            where, params = self.search.rentals_filter(search_term, like_fields=self.LIKE_FIELDS)
+            return KeysetPager(self.pool, where=where, params=params, page_size=page_size)
+        return KeysetPager(self.pool, page_size=page_size)
     
+    @timed("DatabaseManager.export_rentals_pdf")
+    def export_rentals_pdf(self, filename, progress=None, check=None):
+        """Stream the rental history into a PDF report; returns (rows, pages).
+        Rows are read with fetchmany, so memory stays flat however large the table is."""
+        with self.connect() as conn:
+            return report.export(conn, filename, '''
+                SELECT receipt_ref, product_type, no_days, total, created_date
+                FROM rentals ORDER BY created_date DESC
+            ''', layout=report.history_layout_v10(), count_sql="SELECT COUNT(*) FROM rentals",
+                progress=progress, check=check)
+    
+    @timed("DatabaseManager.product_distribution")
+    def product_distribution(self):
+        """(product_type, count, revenue) rows and (date, count) for the last 30 days"""
+        # Read from the trigger-maintained summary tables (rims/aggregates.py)
+        with self.connect() as conn:
+            data = aggregates.by_type(conn)
+            trend_data = [(day, count) for day, count, _ in aggregates.daily(conn, 30)]
+        return data, trend_data
+    
+    @timed("DatabaseManager.monthly_revenue")
+    def monthly_revenue(self):
+        """(month, revenue, count) rows ordered by month"""
+        with self.connect() as conn:
+            return aggregates.monthly(conn)
+    
+    @timed("DatabaseManager.customer_stats")
+    def customer_stats(self):
+        """Totals plus (payment_method, count) rows"""
+        with self.connect() as conn:
+            total_rentals, total_revenue, avg_rental = aggregates.totals(conn)
+            payment_data = [(method, count) for method, count, _ in aggregates.by_payment(conn)]
+        return dict(total_rentals=total_rentals, total_revenue=total_revenue,
+                    avg_rental=avg_rental, payment_data=payment_data)
+    
+    @timed("DatabaseManager.get_product_cost")
+    def get_product_cost(self, product_code):
+        """products.cost_per_day for a code, or None when the code is unknown (from the catalog cache)"""
+        return self.catalog.cost(product_code)
+    
+    @timed("DatabaseManager.get_customers")
     def get_customers(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT customer_id, customer_name, phone, email, address FROM customers ORDER BY created_date DESC")
-        customers = cursor.fetchall()
-        conn.close()
-        return customers
+        return [tuple(c.values()) for c in self.service.customers()]
+    
+    @timed("DatabaseManager.find_customers")
+    def find_customers(self, term, limit=10):
+        """Type-ahead customer matches on name, phone or email (rims/lookup.py):
+        (customer_id, name, phone, email, address) tuples, prefix matches first"""
+        return self.service.lookup.find(term, limit)
     
+    @timed("DatabaseManager.add_customer")
     def add_customer(self, name, phone, email, address):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO customers (customer_name, phone, email, address) VALUES (?, ?, ?, ?)", (name, phone, email, address))
-        conn.commit()
-        conn.close()
+        return self.service.write(self.service.add_customer, name, phone, email, address)
     
+    @timed("DatabaseManager.update_customer")
     def update_customer(self, customer_id, name, phone, email, address):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE customers SET customer_name=?, phone=?, email=?, address=? WHERE customer_id=?", (name, phone, email, address, customer_id))
-        conn.commit()
-        conn.close()
+        self.service.write(self.service.update_customer, customer_id, name, phone, email, address)
     
+    @timed("DatabaseManager.delete_customer")
     def delete_customer(self, customer_id):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM customers WHERE customer_id=?", (customer_id,))
-        conn.commit()
-        conn.close()
+        self.service.write(self.service.delete_customer, customer_id)
 
 class AdvancedRentalInventory:
+    # How often to look for product/price edits (one PRAGMA, no table read)
+    CATALOG_POLL_MS = 1000
+    
     def __init__(self, root):
         self.root = root
+        # $RIMS_UI_PROFILE times every Tk callback and event-loop stall (rims/uiprofile.py);
+        # it hooks callbacks as they are created, so it starts before any widget exists
+        self.ui_profile = uiprofile.from_setting(root)
         self.root.title("Advanced Rental Inventory Management System")
         self.root.geometry("1600x900")
         self.root.configure(background='#2c3e50')
@@ -178,6 +177,13 @@ class AdvancedRentalInventory:
         # Initialize database
         self.db_manager = DatabaseManager()
         
+        # Quotes: actual rental span x products.cost_per_day, day-range discount tiers, 15% tax
+        self.pricing = PricingEngine(tiers=DISCOUNT_TIERS)
+        
+        # Database, PDF and chart queries run on worker threads; results come back via root.after
+        self.tasks = TaskExecutor(root, on_busy=self.set_busy, on_error=self.task_error)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        
         # Configure style
         self.configure_styles()
         
@@ -186,9 +192,14 @@ class AdvancedRentalInventory:
         
         # Create main interface
         self.create_main_interface()
+        self.create_status_bar()
         
         # Create notebook (tabs)
         self.create_notebook()
+        
+        # Product types/rates from the catalog, kept current by polling for edits
+        self.catalog_job = None
+        self.load_products()
     
     def configure_styles(self):
         """Configure modern UI styles"""
@@ -235,6 +246,7 @@ class AdvancedRentalInventory:
         self.customer_phone = StringVar()
         self.customer_email = StringVar()
         self.customer_address = StringVar()
+        self.customer_id_edit = None  # set when a row of the customer table is selected
     
     def create_main_interface(self):
         """Create the main interface layout"""
@@ -247,6 +259,56 @@ class AdvancedRentalInventory:
                            font=('Arial', 24, 'bold'), bg='#2c3e50', fg='white')
         title_label.pack(expand=True)
     
+    def create_status_bar(self):
+        """Status line with a progress indicator for background tasks"""
+        status_frame = Frame(self.root, bg='#2c3e50')
+        status_frame.pack(side=BOTTOM, fill=X, padx=10, pady=(0, 5))
+        
+        self.status_var = StringVar(value="Ready")
+        Label(status_frame, textvariable=self.status_var, font=('Arial', 10),
+              bg='#2c3e50', fg='white').pack(side=LEFT)
+        
+        self.cancel_button = Button(status_frame, text="Cancel", font=('Arial', 10), bg='#e74c3c', fg='white',
+                                    command=self.tasks.cancel_all, state=DISABLED)
+        self.cancel_button.pack(side=RIGHT, padx=5)
+        
+        self.progress_bar = ttk.Progressbar(status_frame, mode='indeterminate', length=200)
+        self.progress_bar.pack(side=RIGHT, padx=5)
+    
+    def set_busy(self, active):
+        """Called by the task executor whenever the number of running tasks changes"""
+        if active:
+            self.progress_bar.configure(mode='indeterminate')
+            self.progress_bar.start(12)
+            self.cancel_button.configure(state=NORMAL)
+            self.status_var.set(f"Working... ({active} task{'s' if active > 1 else ''})")
+        else:
+            self.progress_bar.stop()
+            self.progress_bar['value'] = 0
+            self.cancel_button.configure(state=DISABLED)
+            self.status_var.set("Ready")
+    
+    def task_progress(self, fraction, text=""):
+        """Progress reported by a background task (fraction 0..1)"""
+        if fraction is not None:
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode='determinate', maximum=1.0, value=fraction)
+        if text:
+            self.status_var.set(text)
+    
+    def task_error(self, error):
+        messagebox.showerror("Error", str(error))
+    
+    def close(self):
+        """Stop background work and close the window"""
+        if self.catalog_job is not None:
+            self.root.after_cancel(self.catalog_job)
+        self.tasks.shutdown()
+        self.db_manager.close()
+        if self.ui_profile is not None:
+            self.ui_profile.close()
+        self.root.destroy()
+    
     def create_notebook(self):
         """Create tabbed interface"""
         self.notebook = ttk.Notebook(self.root)
@@ -268,6 +330,16 @@ class AdvancedRentalInventory:
         self.setup_history_tab()
         self.setup_analytics_tab()
         self.setup_customer_tab()
+        
+        # The chart canvas (and matplotlib) is built the first time Analytics is shown
+        self.notebook.bind("<<NotebookTabChanged>>", self.tab_changed, add="+")
+    
+    def tab_changed(self, event=None):
+        """Build tab contents that are deferred until first shown"""
+        if self.notebook.select() == str(self.analytics_tab):
+            self.ensure_charts()
+            # draw anything that changed while the tab was hidden
+            self.chart_panels[self.chart_view].show()
     
     def setup_rental_tab(self):
         """Setup the main rental tab with original functionality"""
@@ -297,7 +369,7 @@ class AdvancedRentalInventory:
         self.cboProdType = ttk.Combobox(product_frame, textvariable=self.ProdType, state='readonly', 
                                        font=('Arial', 12), width=15)
         self.cboProdType.bind("<<ComboboxSelected>>", self.product_selected)
-        self.cboProdType['values'] = ('Select', 'Car', 'Van', 'Minibus', 'Truck')
+        self.cboProdType['values'] = ('Select',)  # product types come from the catalog (products_loaded)
         self.cboProdType.current(0)
         self.cboProdType.grid(row=0, column=1, padx=5, pady=2)
         
@@ -316,6 +388,12 @@ class AdvancedRentalInventory:
         Label(product_frame, text="Cost Per Day:", font=('Arial', 12, 'bold')).grid(row=1, column=2, sticky=W, padx=5)
         Entry(product_frame, textvariable=self.CostPDay, font=('Arial', 12), width=18, state='readonly').grid(row=1, column=3, padx=5, pady=2)
         
+        # Row 3: Customer (type a name, phone number or email and pick from the list)
+        Label(product_frame, text="Customer:", font=('Arial', 12, 'bold')).grid(row=2, column=0, sticky=W, padx=5)
+        self.customer_picker = CustomerPicker(product_frame, self.db_manager.find_customers, self.tasks,
+                                              font=('Arial', 12))
+        self.customer_picker.grid(row=2, column=1, columnspan=3, sticky=EW, padx=5, pady=2)
+        
         # Credit and Payment Frame
         credit_frame = ttk.LabelFrame(parent, text="Credit & Payment Details", padding=10)
         credit_frame.pack(fill=X, padx=10, pady=5)
@@ -492,6 +570,10 @@ class AdvancedRentalInventory:
         search_entry = Entry(search_frame, textvariable=self.search_var, font=('Arial', 12), width=30)
         search_entry.pack(side=LEFT, padx=5)
         
+        # Search as you type (debounced so each keystroke doesn't hit the DB)
+        self.search_job = None
+        self.search_var.trace_add("write", lambda *_: self.schedule_search())
+        
         Button(search_frame, text="Search", font=('Arial', 12), bg='#3498db', fg='white',
                command=self.search_rentals).pack(side=LEFT, padx=5)
         
@@ -521,28 +603,40 @@ class AdvancedRentalInventory:
         self.history_tree.column('Total', width=100)
         self.history_tree.column('Date', width=150)
         
-        history_scroll = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.history_tree.yview)
-        self.history_tree.configure(yscrollcommand=history_scroll.set)
+        history_scroll = ttk.Scrollbar(tree_frame, orient=VERTICAL)
         
         self.history_tree.pack(side=LEFT, fill=BOTH, expand=True)
         history_scroll.pack(side=RIGHT, fill=Y)
         
+        # Virtual list: only the visible rows are Tk items, pages are fetched on scroll
+        # (pages are read on the task executor, never on the Tk thread)
+        self.history_view = VirtualTreeview(self.history_tree, history_scroll, fmt=self.format_history_row,
+                                            tasks=self.tasks)
+        
         # Load initial data
         self.load_all_rentals()
     
     def setup_analytics_tab(self):
-        """Setup analytics tab with charts"""
-        analytics_frame = Frame(self.analytics_tab, bg='#2c3e50')
-        analytics_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
-        
-        # Create matplotlib figure
-        self.fig = Figure(figsize=(12, 8), facecolor='#2c3e50')
-        self.canvas = FigureCanvasTkAgg(self.fig, analytics_frame)
-        self.canvas.get_tk_widget().pack(fill=BOTH, expand=True)
-        
-        # Button frame for analytics
-        button_frame = Frame(analytics_frame, bg='#2c3e50')
-        button_frame.pack(fill=X, pady=10)
+        """Setup analytics tab; the charts themselves are built by ensure_charts"""
+        self.analytics_frame = Frame(self.analytics_tab, bg='#2c3e50')
+        self.analytics_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        
+        # Chart view -> (query, chart builder, error text). Each view keeps its own figure,
+        # built the first time it is shown; switching views swaps canvases instead of redrawing
+        self.chart_views = {
+            'distribution': (self.db_manager.product_distribution, self.product_distribution_charts,
+                             "Failed to generate chart"),
+            'monthly': (self.db_manager.monthly_revenue, self.monthly_revenue_charts,
+                        "Failed to generate chart"),
+            'customers': (self.db_manager.customer_stats, self.customer_stats_chart,
+                          "Failed to generate statistics"),
+        }
+        self.chart_panels = {}
+        self.chart_view = None
+        
+        # Button frame for analytics (packed first so the canvas fills the space above it)
+        button_frame = Frame(self.analytics_frame, bg='#2c3e50')
+        button_frame.pack(side=BOTTOM, fill=X, pady=10)
         
         Button(button_frame, text="Product Distribution", font=('Arial', 12), bg='#3498db', fg='white',
                command=self.show_product_distribution).pack(side=LEFT, padx=5)
@@ -552,156 +646,50 @@ class AdvancedRentalInventory:
         
         Button(button_frame, text="Customer Statistics", font=('Arial', 12), bg='#f39c12', fg='white',
                command=self.show_customer_stats).pack(side=LEFT, padx=5)
-        
-        # Initialize with product distribution chart
-        self.show_product_distribution()
     
-    def setup_customer_tab(self):
-        outer = ttk.LabelFrame(self.customer_tab, text="Customer Management", style="Card.TLabelframe", padding=10)
-        outer.pack(fill=BOTH, expand=True, padx=10, pady=10)
-
-        # form
-        form = Frame(outer)
-        form.pack(fill=X, pady=(0, 10))
-
-        ttk.Label(form, text="Name:").grid(row=0, column=0, sticky=E, padx=5, pady=4)
-        ttk.Entry(form, textvariable=self.customer_name, width=28).grid(row=0, column=1, padx=5, pady=4)
-
-        ttk.Label(form, text="Phone:").grid(row=0, column=2, sticky=E, padx=5, pady=4)
-        ttk.Entry(form, textvariable=self.customer_phone, width=28).grid(row=0, column=3, padx=5, pady=4)
-
-        ttk.Label(form, text="Email:").grid(row=1, column=0, sticky=E, padx=5, pady=4)
-        ttk.Entry(form, textvariable=self.customer_email, width=28).grid(row=1, column=1, padx=5, pady=4)
-
-        ttk.Label(form, text="Address:").grid(row=1, column=2, sticky=E, padx=5, pady=4)
-        ttk.Entry(form, textvariable=self.customer_address, width=28).grid(row=1, column=3, padx=5, pady=4)
-
-        btns = Frame(form)
-        btns.grid(row=2, column=0, columnspan=4, pady=6)
-        ttk.Button(btns, text="Add", command=self.add_customer).pack(side=LEFT, padx=5)
-        ttk.Button(btns, text="Update", command=self.update_customer).pack(side=LEFT, padx=5)
-        ttk.Button(btns, text="Delete", command=self.delete_customer).pack(side=LEFT, padx=5)
-        ttk.Button(btns, text="Clear", command=self.clear_customer_form).pack(side=LEFT, padx=5)
-
-        # table
-        cols = ("ID", "Name", "Phone", "Email", "Address")
-        self.customer_tree = ttk.Treeview(outer, columns=cols, show="headings")
-        for c in cols:
-            self.customer_tree.heading(c, text=c)
-        self.customer_tree.column("ID", width=60)
-        self.customer_tree.column("Name", width=180)
-        self.customer_tree.column("Phone", width=120)
-        self.customer_tree.column("Email", width=200)
-        self.customer_tree.column("Address", width=220)
-
-        vs = ttk.Scrollbar(outer, orient=VERTICAL, command=self.customer_tree.yview)
-        self.customer_tree.configure(yscrollcommand=vs.set)
-        self.customer_tree.pack(side=LEFT, fill=BOTH, expand=True)
-        vs.pack(side=RIGHT, fill=Y)
-
-        self.customer_tree.bind("<<TreeviewSelect>>", self.on_customer_select)
-
-        self.load_customers_table()
+    def ensure_charts(self):
+        """Show the first chart view on first use (imports matplotlib)"""
+        if self.chart_view is None:
+            self.show_product_distribution()
     
-    def load_customers_table(self):
-        for i in self.customer_tree.get_children():
-            self.customer_tree.delete(i)
-        for row in self.db_manager.get_customers():
-            self.customer_tree.insert("", "end", values=row)
-    
-    def on_customer_select(self, _event=None):
-        sel = self.customer_tree.selection()
-        if not sel:
-            self.customer_id_edit = None
-            return
-        vals = self.customer_tree.item(sel[0], "values")
-        self.customer_id_edit = int(vals[0])
-        self.customer_name.set(vals[1])
-        self.customer_phone.set(vals[2])
-        self.customer_email.set(vals[3])
-        self.customer_address.set(vals[4])
+    # Event handlers and methods for original functionality
+    def load_products(self):
+        """Load the product catalog in the background and start watching for edits"""
+        self.tasks.submit(self.db_manager.catalog.load, key="products", on_done=self.products_loaded)
+        self.catalog_job = self.root.after(self.CATALOG_POLL_MS, self.watch_products)
     
-    def clear_customer_form(self):
-        self.customer_id_edit = None
-        self.customer_name.set("")
-        self.customer_phone.set("")
-        self.customer_email.set("")
-        self.customer_address.set("")
+    def watch_products(self):
+        """Reload the catalog when products/prices were edited (from any terminal).
+        The check and the reload run on a worker, out of the busy indicator;
+        a failed poll is simply retried by the next one."""
+        self.tasks.submit(self.db_manager.catalog.reload_if_changed, key="catalog-poll", quiet=True,
+                          on_done=self.catalog_polled, on_error=lambda e: None)
+        self.catalog_job = self.root.after(self.CATALOG_POLL_MS, self.watch_products)
     
-    def add_customer(self):
-        name = self.customer_name.get().strip()
-        if not name:
-            messagebox.showerror("Error", "Customer name is required.")
-            return
-        self.db_manager.add_customer(
-            name,
-            self.customer_phone.get().strip(),
-            self.customer_email.get().strip(),
-            self.customer_address.get().strip(),
-        )
-        messagebox.showinfo("Success", "Customer added.")
-        self.clear_customer_form()
-        self.load_customers_table()
+    def catalog_polled(self, catalog):
+        """Runs on the Tk thread after a poll; None when nothing changed"""
+        if catalog is not None:
+            self.products_loaded(catalog)
     
-    def update_customer(self):
-        if not self.customer_id_edit:
-            messagebox.showerror("Error", "Select a customer to update.")
-            return
-        self.db_manager.update_customer(
-            self.customer_id_edit,
-            self.customer_name.get().strip(),
-            self.customer_phone.get().strip(),
-            self.customer_email.get().strip(),
-            self.customer_address.get().strip(),
-        )
-        messagebox.showinfo("Success", "Customer updated.")
-        self.clear_customer_form()
-        self.load_customers_table()
+    def products_loaded(self, catalog):
+        """Runs on the Tk thread with a fresh catalog: update the type list and the shown rate"""
+        self.cboProdType['values'] = ('Select',) + tuple(catalog.types())
+        product = catalog.get(self.ProdCode.get())
+        if product is not None:
+            self.show_product_rate(product)
     
-    def delete_customer(self):
-        if not self.customer_id_edit:
-            messagebox.showerror("Error", "Select a customer to delete.")
-            return
-        if not messagebox.askyesno("Confirm", "Delete this customer?"):
-            return
-        self.db_manager.delete_customer(self.customer_id_edit)
-        messagebox.showinfo("Success", "Customer deleted.")
-        self.clear_customer_form()
-        self.load_customers_table()
+    def show_product_rate(self, product):
+        """Show a product's code and cost per day in the form"""
+        self.ProdCode.set(product.product_code)
+        self.CostPDay.set("£" + ('%g' % product.cost_per_day))
+        self.SettDueDay.set('%g' % product.cost_per_day)
     
-    # Event handlers and methods for original functionality
     def product_selected(self, event):
         """Handle product type selection"""
-        values = str(self.cboProdType.get())
-        if values == "Car":
-            self.ProdCode.set("CAR452")
-            self.CostPDay.set("£12")
-            self.CreCheck.set("No")
-            self.SettDueDay.set("12")
-            self.PaymentD.set("No")
-            self.Deposit.set("No")
-            self.PaymentM.set("Cash")
-        elif values == "Van":
-            self.ProdCode.set("VAN775")
-            self.CostPDay.set("£19")
-            self.CreCheck.set("No")
-            self.SettDueDay.set("19")
-            self.PaymentD.set("No")
-            self.Deposit.set("No")
-            self.PaymentM.set("Cash")
-        elif values == "Minibus":
-            self.ProdCode.set("MIN334")
-            self.CostPDay.set("£12")
-            self.CreCheck.set("No")
-            self.SettDueDay.set("12")
-            self.PaymentD.set("No")
-            self.Deposit.set("No")
-            self.PaymentM.set("Cash")
-        elif values == "Truck":
-            self.ProdCode.set("TRK7483")
-            self.CostPDay.set("£15")
+        product = self.db_manager.catalog.first(str(self.cboProdType.get()))
+        if product is not None:
+            self.show_product_rate(product)
             self.CreCheck.set("No")
-            self.SettDueDay.set("15")
             self.PaymentD.set("No")
             self.Deposit.set("No")
             self.PaymentM.set("Cash")
@@ -804,34 +792,30 @@ class AdvancedRentalInventory:
     def calculate_total(self):
         """Calculate total cost and generate receipt"""
         try:
-            if not self.LastCreditReview.get() or not self.SettDueDay.get():
+            period = rental_period(self.AppDate.get(), self.NoDays.get(), self.NextCreditReview.get())
+            if period is None or not self.SettDueDay.get():
                 messagebox.showerror("Error", "Please select product type and number of days")
                 return
             
-            n = float(self.LastCreditReview.get())
-            s = float(self.SettDueDay.get())
-            price = n * s
+            # Rate from the products table (the form value only for codes not in it)
+            rate = self.db_manager.get_product_cost(self.ProdCode.get())
+            if rate is None:
+                rate = float(self.SettDueDay.get())
             
-            # Apply discount
-            discount_str = self.Discount.get().replace('%', '')
-            if discount_str and discount_str != 'Select':
-                discount_rate = float(discount_str) / 100
-                price = price * (1 - discount_rate)
+            # Selected discount, or the tier for the rental length
+            discount = self.Discount.get()
+            quote = self.pricing.quote(rate, period[0], period[1],
+                                       discount if discount and discount != 'Select' else None)
             
-            ST = "£" + str('%.2f' % price)
-            iTax = "£" + str('%.2f' % (price * 0.15))
-            self.Tax.set(iTax)
-            self.SubTotal.set(ST)
-            TC = "£" + str('%.2f' % ((price * 0.15) + price))
-            self.Total.set(TC)
+            self.Tax.set("£" + str(quote.tax))
+            self.SubTotal.set("£" + str(quote.subtotal))
+            self.Total.set("£" + str(quote.total))
             
-            # Generate receipt
+            # Generate receipt (the ref itself is allocated by the database on save)
             self.txtReceipt.delete("1.0", END)
-            x = random.randint(10908, 500876)
-            randomRef = str(x)
-            self.Receipt_Ref.set("BILL" + randomRef)
+            self.Receipt_Ref.set("")
             
-            self.txtReceipt.insert(END, 'Receipt Ref:\t\t' + self.Receipt_Ref.get() + '\t\t' + str(self.AppDate.get()) + "\n")
+            self.txtReceipt.insert(END, 'Receipt Ref:\t\t' + (self.Receipt_Ref.get() or '(assigned on save)') + '\t\t' + str(self.AppDate.get()) + "\n")
             self.txtReceipt.insert(END, 'Product Type:\t\t' + self.ProdType.get() + "\n")
             self.txtReceipt.insert(END, 'Product Code:\t\t' + self.ProdCode.get() + "\n")
             self.txtReceipt.insert(END, 'No of Days:\t\t' + self.NoDays.get() + "\n")
@@ -854,10 +838,13 @@ class AdvancedRentalInventory:
             if not self.Total.get() or self.Total.get() == "":
                 messagebox.showerror("Error", "Please calculate total first")
                 return
+            if self.customer_picker.get().strip() and self.customer_picker.customer_id is None:
+                messagebox.showerror("Error", "Please pick the customer from the list (or clear the field)")
+                return
             
             # Prepare rental data
             rental_data = (
-                1,  # customer_id (default for now)
+                self.customer_picker.customer_id,  # None when no customer is picked
                 self.Receipt_Ref.get(),
                 self.ProdType.get(),
                 self.ProdCode.get(),
@@ -870,7 +857,7 @@ class AdvancedRentalInventory:
                 self.DateRev.get(),
                 self.CreLimit.get(),
                 self.CreCheck.get(),
-                int(self.SettDueDay.get()) if self.SettDueDay.get() else 0,
+                self.SettDueDay.get() or 0,
                 self.PaymentD.get(),
                 float(self.Discount.get().replace('%', '')) if self.Discount.get() and self.Discount.get() != 'Select' else 0,
                 self.Deposit.get(),
@@ -885,14 +872,27 @@ class AdvancedRentalInventory:
                 float(self.Total.get().replace('£', '')) if self.Total.get() else 0
             )
             
-            self.db_manager.save_rental(rental_data)
-            messagebox.showinfo("Success", "Rental saved successfully!")
-            self.reset_form()
-            self.load_all_rentals()  # Refresh history
+            # Rental period: application date to the review date set by days_selected
+            period = rental_period(self.AppDate.get() or datetime.date.today(),
+                                   self.NoDays.get(), self.NextCreditReview.get())
+            start, end = period if period else (None, None)
+            
+            if self.tasks.pending("save-rental"):
+                return  # already saving (double click)
+            self.tasks.submit(self.db_manager.save_rental, rental_data, start, end, key="save-rental",
+                              on_done=self.rental_saved,
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to save rental: {str(e)}"))
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save rental: {str(e)}")
     
+    def rental_saved(self, receipt_ref=None):
+        """Runs on the Tk thread once the background insert has committed"""
+        messagebox.showinfo("Success", f"Rental {receipt_ref} saved successfully!")
+        self.reset_form()
+        self.load_all_rentals()  # Refresh history
+        self.refresh_charts()
+    
     def reset_form(self):
         """Reset all form fields"""
         # Clear text widgets
@@ -928,6 +928,7 @@ class AdvancedRentalInventory:
         self.SubTotal.set("")
         self.Total.set("")
         self.Receipt_Ref.set("")
+        self.customer_picker.clear()
         
         # Reset comboboxes
         self.cboProdType.current(0)
@@ -943,24 +944,12 @@ class AdvancedRentalInventory:
     def exit_app(self):
         """Exit application"""
         if messagebox.askyesno("Exit", "Are you sure you want to exit?"):
-            self.root.destroy()
+            self.close()
     
     # Database and analytics methods
     def load_all_rentals(self):
         """Load all rentals into history tree"""
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
-        rentals = self.db_manager.get_all_rentals()
-        for rental in rentals:
-            self.history_tree.insert('', 'end', values=(
-                rental[0],  # rental_id
-                rental[2],  # receipt_ref
-                rental[3],  # product_type
-                rental[5],  # no_days
-                f"£{rental[25]:.2f}",  # total
-                rental[26]  # created_date
-            ))
+        self.load_history_pager(None)
     
     def search_rentals(self):
         """Search rentals"""
@@ -969,223 +958,167 @@ class AdvancedRentalInventory:
             self.load_all_rentals()
             return
         
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
-        rentals = self.db_manager.search_rentals(search_term)
-        for rental in rentals:
-            self.history_tree.insert('', 'end', values=(
-                rental[0],  # rental_id
-                rental[2],  # receipt_ref
-                rental[3],  # product_type
-                rental[5],  # no_days
-                f"£{rental[25]:.2f}",  # total
-                rental[26]  # created_date
-            ))
+        self.load_history_pager(search_term)
+    
+    def load_history_pager(self, search_term):
+        """Count + first page in the background; a newer request replaces a pending one"""
+        self.tasks.submit(self.warm_history_pager, search_term, key="history",
+                          on_done=self.history_view.set_pager)
+    
+    def warm_history_pager(self, search_term):
+        pager = self.db_manager.rental_pager(search_term)
+        pager.count()
+        pager.page(0)
+        return pager
+    
+    def schedule_search(self, delay=250):
+        """Run search_rentals once typing pauses for ``delay`` ms"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(delay, self.run_scheduled_search)
+    
+    def run_scheduled_search(self):
+        self.search_job = None
+        self.search_rentals()
+    
+    def format_history_row(self, rental):
+        """(rental_id, receipt_ref, product_type, no_days, total, created_date) -> tree values"""
+        rental_id, receipt_ref, product_type, no_days, total, created_date = rental
+        return (rental_id, receipt_ref, product_type, no_days, f"£{(total or 0):.2f}", created_date)
     
     def export_to_pdf(self):
         """Export rental history to PDF"""
-        try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf")],
-                title="Save Rental History"
-            )
-            
-            if filename:
-                c = canvas.Canvas(filename, pagesize=letter)
-                width, height = letter
-                
-                # Title
-                c.setFont("Helvetica-Bold", 16)
-                c.drawString(50, height - 50, "Rental History Report")
-                c.drawString(50, height - 70, f"Generated on: {datetime.date.today()}")
-                
-                # Headers
-                c.setFont("Helvetica-Bold", 12)
-                y_position = height - 120
-                c.drawString(50, y_position, "Receipt Ref")
-                c.drawString(150, y_position, "Product")
-                c.drawString(250, y_position, "Days")
-                c.drawString(350, y_position, "Total")
-                c.drawString(450, y_position, "Date")
-                
-                # Data
-                c.setFont("Helvetica", 10)
-                rentals = self.db_manager.get_all_rentals()
-                y_position -= 20
-                
-                for rental in rentals:
-                    if y_position < 50:  # Start new page
-                        c.showPage()
-                        y_position = height - 50
-                    
-                    c.drawString(50, y_position, str(rental[2]))  # receipt_ref
-                    c.drawString(150, y_position, str(rental[3]))  # product_type
-                    c.drawString(250, y_position, str(rental[5]))  # no_days
-                    c.drawString(350, y_position, f"£{rental[25]:.2f}")  # total
-                    c.drawString(450, y_position, str(rental[26])[:10])  # date
-                    y_position -= 15
-                
-                c.save()
-                messagebox.showinfo("Success", f"Report exported to {filename}")
+        if self.tasks.pending("export-pdf"):
+            messagebox.showinfo("Export", "An export is already running.")
+            return
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf")],
+            title="Save Rental History"
+        )
+        
+        if filename:
+            self.tasks.submit(self.write_pdf_report, filename, key="export-pdf", pass_task=True,
+                              on_progress=self.task_progress,
+                              on_done=lambda f: messagebox.showinfo("Success", f"Report exported to {f}"),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to export PDF: {str(e)}"))
+    
+    def write_pdf_report(self, filename, task):
+        """Build the PDF on a worker thread (streamed, cancellable between batches)"""
+        def progress(done, total):
+            task.report(done / total if total else None, f"Exporting PDF... {done:,}/{total or 0:,} rows")
         
+        self.db_manager.export_rentals_pdf(filename, progress=progress, check=task.check)
+        return filename
+    
+    
+    def show_chart(self, name):
+        """Switch the Analytics tab to chart view ``name`` and reload it on a worker.
+        Rapid clicks only load the latest view; unchanged data is not redrawn."""
+        panel = self.chart_panels.get(name) or self.build_chart_panel(name)
+        if self.chart_view != name:
+            if self.chart_view is not None:
+                self.chart_panels[self.chart_view].canvas.get_tk_widget().pack_forget()
+            panel.canvas.get_tk_widget().pack(side=TOP, fill=BOTH, expand=True)
+            self.chart_view = name
+        panel.refresh()
+    
+    def build_chart_panel(self, name):
+        """Figure, canvas and charts for one view (rims/charts.py keeps the artists and updates them in place)"""
+        query, build, error_text = self.chart_views[name]
+        fig = mpl_figure.Figure(figsize=(12, 8), facecolor='#2c3e50')
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, self.analytics_frame)
+        charts, split = build(fig)
+        
+        def load(render):
+            self.tasks.submit(query, key="chart", on_done=lambda result: self.draw_chart(render, result, error_text),
+                              on_error=lambda e: messagebox.showerror("Error", f"{error_text}: {str(e)}"))
+        
+        panel = ChartPanel(canvas, charts, split, visible=lambda: self.chart_visible(name), load=load)
+        self.chart_panels[name] = panel
+        return panel
+    
+    def chart_visible(self, name):
+        return self.chart_view == name and self.notebook.select() == str(self.analytics_tab)
+    
+    def draw_chart(self, render, result, error_text):
+        try:
+            render(result)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to export PDF: {str(e)}")
+            messagebox.showerror("Error", f"{error_text}: {str(e)}")
     
+    def refresh_charts(self):
+        """Reload the chart view on screen; the others reload when next shown"""
+        for panel in self.chart_panels.values():
+            panel.refresh()
+    
+    def style_axes(self, *axes):
+        for ax in axes:
+            ax.set_facecolor('#34495e')
+            ax.tick_params(colors='white')
+            ax.xaxis.label.set_color('white')
+            ax.yaxis.label.set_color('white')
     
     def show_product_distribution(self):
         """Show product distribution chart"""
-        try:
-            self.fig.clear()
-            
-            conn = sqlite3.connect(self.db_manager.db_name)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT product_type, COUNT(*) as count, SUM(total) as revenue
-                FROM rentals 
-                GROUP BY product_type
-            ''')
-            data = cursor.fetchall()
-            conn.close()
-            
-            if data:
-                products = [row[0] for row in data]
-                counts = [row[1] for row in data]
-                revenues = [row[2] for row in data]
-                
-                # Create subplots
-                ax1 = self.fig.add_subplot(221)
-                ax2 = self.fig.add_subplot(222)
-                ax3 = self.fig.add_subplot(212)
-                
-                # Pie chart for distribution
-                ax1.pie(counts, labels=products, autopct='%1.1f%%', startangle=90)
-                ax1.set_title('Product Distribution by Count', color='white')
-                
-                # Bar chart for revenue
-                ax2.bar(products, revenues, color=['#3498db', '#e74c3c', '#27ae60', '#f39c12'])
-                ax2.set_title('Revenue by Product Type', color='white')
-                ax2.set_ylabel('Revenue (£)', color='white')
-                
-                # Line chart for trend (last 30 days)
-                cursor = conn = sqlite3.connect(self.db_manager.db_name)
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT DATE(created_date) as date, COUNT(*) as count
-                    FROM rentals 
-                    WHERE created_date >= date('now', '-30 days')
-                    GROUP BY DATE(created_date)
-                    ORDER BY date
-                ''')
-                trend_data = cursor.fetchall()
-                conn.close()
-                
-                if trend_data:
-                    dates = [row[0] for row in trend_data]
-                    daily_counts = [row[1] for row in trend_data]
-                    ax3.plot(dates, daily_counts, marker='o', color='#3498db')
-                    ax3.set_title('Daily Rentals (Last 30 Days)', color='white')
-                    ax3.set_ylabel('Number of Rentals', color='white')
-                    ax3.tick_params(axis='x', rotation=45)
-            
-            # Style the figure
-            self.fig.patch.set_facecolor('#2c3e50')
-            for ax in self.fig.get_axes():
-                ax.set_facecolor('#34495e')
-                ax.tick_params(colors='white')
-                ax.xaxis.label.set_color('white')
-                ax.yaxis.label.set_color('white')
-            
-            self.fig.tight_layout()
-            self.canvas.draw()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate chart: {str(e)}")
+        self.show_chart('distribution')
+    
+    def product_distribution_charts(self, fig):
+        ax1 = fig.add_subplot(221)
+        ax2 = fig.add_subplot(222)
+        ax3 = fig.add_subplot(212)
+        self.style_axes(ax1, ax2, ax3)
+        charts = [
+            # Pie chart for distribution
+            PieChart(ax1, 'Product Distribution by Count', text_color='white'),
+            # Bar chart for revenue
+            BarChart(ax2, 'Revenue by Product Type', ylabel='Revenue (£)',
+                     color=['#3498db', '#e74c3c', '#27ae60', '#f39c12'], text_color='white'),
+            # Line chart for trend (last 30 days)
+            LineChart(ax3, 'Daily Rentals (Last 30 Days)', ylabel='Number of Rentals', rotation=45,
+                      color='#3498db', text_color='white'),
+        ]
+        
+        def split(result):
+            data, trend_data = result
+            return ([(p, count) for p, count, _ in data], [(p, revenue) for p, _, revenue in data], trend_data)
+        return charts, split
     
     def show_monthly_revenue(self):
         """Show monthly revenue chart"""
-        try:
-            self.fig.clear()
-            
-            conn = sqlite3.connect(self.db_manager.db_name)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT strftime('%Y-%m', created_date) as month, 
-                       SUM(total) as revenue, COUNT(*) as count
-                FROM rentals 
-                GROUP BY strftime('%Y-%m', created_date)
-                ORDER BY month
-            ''')
-            data = cursor.fetchall()
-            conn.close()
-            
-            if data:
-                months = [row[0] for row in data]
-                revenues = [row[1] for row in data]
-                counts = [row[2] for row in data]
-                
-                ax1 = self.fig.add_subplot(211)
-                ax2 = self.fig.add_subplot(212)
-                
-                # Revenue chart
-                ax1.bar(months, revenues, color='#27ae60')
-                ax1.set_title('Monthly Revenue', color='white')
-                ax1.set_ylabel('Revenue (£)', color='white')
-                
-                # Count chart
-                ax2.bar(months, counts, color='#3498db')
-                ax2.set_title('Monthly Rental Count', color='white')
-                ax2.set_ylabel('Number of Rentals', color='white')
-            
-            # Style the figure
-            self.fig.patch.set_facecolor('#2c3e50')
-            for ax in self.fig.get_axes():
-                ax.set_facecolor('#34495e')
-                ax.tick_params(colors='white', axis='x', rotation=45)
-                ax.xaxis.label.set_color('white')
-                ax.yaxis.label.set_color('white')
-            
-            self.fig.tight_layout()
-            self.canvas.draw()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate chart: {str(e)}")
+        self.show_chart('monthly')
+    
+    def monthly_revenue_charts(self, fig):
+        ax1 = fig.add_subplot(211)
+        ax2 = fig.add_subplot(212)
+        self.style_axes(ax1, ax2)
+        charts = [
+            BarChart(ax1, 'Monthly Revenue', ylabel='Revenue (£)', rotation=45, color='#27ae60', text_color='white'),
+            BarChart(ax2, 'Monthly Rental Count', ylabel='Number of Rentals', rotation=45, color='#3498db',
+                     text_color='white'),
+        ]
+        
+        def split(data):
+            return [(month, revenue) for month, revenue, _ in data], [(month, count) for month, _, count in data]
+        return charts, split
     
     def show_customer_stats(self):
         """Show customer statistics"""
-        try:
-            self.fig.clear()
-            
-            conn = sqlite3.connect(self.db_manager.db_name)
-            cursor = conn.cursor()
-            
-            # Get statistics
-            cursor.execute('SELECT COUNT(*) FROM rentals')
-            total_rentals = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT SUM(total) FROM rentals')
-            total_revenue = cursor.fetchone()[0] or 0
-            
-            cursor.execute('SELECT AVG(total) FROM rentals')
-            avg_rental = cursor.fetchone()[0] or 0
-            
-            # Payment method distribution
-            cursor.execute('''
-                SELECT payment_method, COUNT(*) as count
-                FROM rentals 
-                WHERE payment_method != 'Select'
-                GROUP BY payment_method
-            ''')
-            payment_data = cursor.fetchall()
-            
-            conn.close()
-            
-            # Create text summary
-            ax = self.fig.add_subplot(111)
-            ax.axis('off')
-            
-            stats_text = f"""
+        self.show_chart('customers')
+    
+    def customer_stats_chart(self, fig):
+        ax = fig.add_subplot(111)
+        chart = TextChart(ax, fontsize=14, color='white',
+                          bbox=dict(boxstyle="round,pad=0.5", facecolor='#34495e', alpha=0.8))
+        return [chart], lambda stats: [self.format_customer_stats(stats)]
+    
+    def format_customer_stats(self, stats):
+        total_rentals = stats['total_rentals']
+        total_revenue = stats['total_revenue']
+        avg_rental = stats['avg_rental']
+        payment_data = stats['payment_data']
+        
+        stats_text = f"""
             CUSTOMER STATISTICS SUMMARY
             
             Total Rentals: {total_rentals}
@@ -1194,89 +1127,12 @@ class AdvancedRentalInventory:
             
             PAYMENT METHOD DISTRIBUTION:
             """
-            
-            if payment_data:
-                for method, count in payment_data:
-                    percentage = (count / total_rentals) * 100 if total_rentals > 0 else 0
-                    stats_text += f"\n{method}: {count} ({percentage:.1f}%)"
-            
-            ax.text(0.1, 0.9, stats_text, transform=ax.transAxes, 
-                   fontsize=14, verticalalignment='top', color='white',
-                   bbox=dict(boxstyle="round,pad=0.5", facecolor='#34495e', alpha=0.8))
-            
-            # Style the figure
-            self.fig.patch.set_facecolor('#2c3e50')
-            self.canvas.draw()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate statistics: {str(e)}")
-    
-    def add_customer(self):
-        """Add new customer"""
-        try:
-            if not self.customer_name.get():
-                messagebox.showerror("Error", "Customer name is required")
-                return
-            
-            conn = sqlite3.connect(self.db_manager.db_name)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO customers (customer_name, phone, email, address)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                self.customer_name.get(),
-                self.customer_phone.get(),
-                self.customer_email.get(),
-                self.customer_address.get()
-            ))
-            conn.commit()
-            conn.close()
-            
-            messagebox.showinfo("Success", "Customer added successfully!")
-            self.clear_customer_form()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add customer: {str(e)}")
-    
-    def clear_customer_form(self):
-        """Clear customer form"""
-        self.customer_name.set("")
-        self.customer_phone.set("")
-        self.customer_email.set("")
-        self.customer_address.set("")
-    
-    def update_customer(self):
-        if not hasattr(self, 'customer_id') or not self.customer_id:
-            messagebox.showerror("Error", "Select a customer first")
-            return
-        # Validate email
-        email = self.customer_email.get()
-        if email and ("@" not in email or "." not in email):
-            messagebox.showerror("Error", "Enter a valid email address")
-            return
-        # Validate phone (simple check: must be digits and at least 7 chars)
-        phone = self.customer_phone.get()
-        if phone and (not phone.isdigit() or len(phone) < 7):
-            messagebox.showerror("Error", "Enter a valid phone number")
-            return
-        # Check if any changes were made
-        conn = sqlite3.connect(self.db_manager.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT customer_name, phone, email, address FROM customers WHERE customer_id=?", (self.customer_id,))
-        old = cursor.fetchone()
-        new = (self.customer_name.get(), self.customer_phone.get(), self.customer_email.get(), self.customer_address.get())
-        if old == new:
-            conn.close()
-            messagebox.showinfo("Info", "No changes to update.")
-            return
-        cursor.execute("UPDATE customers SET customer_name=?, phone=?, email=?, address=? WHERE customer_id=?",
-                       (self.customer_name.get(), self.customer_phone.get(),
-                        self.customer_email.get(), self.customer_address.get(), self.customer_id))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Customer updated")
-        self.clear_customer_form()
-        self.load_all_customers()
+        
+        if payment_data:
+            for method, count in payment_data:
+                percentage = (count / total_rentals) * 100 if total_rentals > 0 else 0
+                stats_text += f"\n{method}: {count} ({percentage:.1f}%)"
+        return stats_text
     
     def setup_customer_tab(self):
         outer = ttk.LabelFrame(self.customer_tab, text="Customer Management", style="Card.TLabelframe", padding=10)
@@ -1326,9 +1182,12 @@ class AdvancedRentalInventory:
         self.load_customers_table()
 
     def load_customers_table(self):
+        self.tasks.submit(self.db_manager.get_customers, key="customers", on_done=self.fill_customers_table)
+
+    def fill_customers_table(self, rows):
         for i in self.customer_tree.get_children():
             self.customer_tree.delete(i)
-        for row in self.db_manager.get_customers():
+        for row in rows:
             self.customer_tree.insert("", "end", values=row)
 
     def on_customer_select(self, _event=None):
@@ -1355,13 +1214,17 @@ class AdvancedRentalInventory:
         if not name:
             messagebox.showerror("Error", "Customer name is required.")
             return
-        self.db_manager.add_customer(
+        self.tasks.submit(
+            self.db_manager.add_customer,
             name,
             self.customer_phone.get().strip(),
             self.customer_email.get().strip(),
             self.customer_address.get().strip(),
+            on_done=lambda _: self.customer_saved("Customer added."),
         )
-        messagebox.showinfo("Success", "Customer added.")
+
+    def customer_saved(self, message):
+        messagebox.showinfo("Success", message)
         self.clear_customer_form()
         self.load_customers_table()
 
@@ -1369,16 +1232,15 @@ class AdvancedRentalInventory:
         if not self.customer_id_edit:
             messagebox.showerror("Error", "Select a customer to update.")
             return
-        self.db_manager.update_customer(
+        self.tasks.submit(
+            self.db_manager.update_customer,
             self.customer_id_edit,
             self.customer_name.get().strip(),
             self.customer_phone.get().strip(),
             self.customer_email.get().strip(),
             self.customer_address.get().strip(),
+            on_done=lambda _: self.customer_saved("Customer updated."),
         )
-        messagebox.showinfo("Success", "Customer updated.")
-        self.clear_customer_form()
-        self.load_customers_table()
 
     def delete_customer(self):
         if not self.customer_id_edit:
@@ -1386,10 +1248,8 @@ class AdvancedRentalInventory:
             return
         if not messagebox.askyesno("Confirm", "Delete this customer?"):
             return
-        self.db_manager.delete_customer(self.customer_id_edit)
-        messagebox.showinfo("Success", "Customer deleted.")
-        self.clear_customer_form()
-        self.load_customers_table()
+        self.tasks.submit(self.db_manager.delete_customer, self.customer_id_edit,
+                          on_done=lambda _: self.customer_saved("Customer deleted."))
 
 if __name__ == '__main__':
     root = tk.Tk()
@@ -5,154 +5,180 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter.constants import *
-import sqlite3, random, datetime
-
-# --------- Optional PDF export ----------
-try:
-    from reportlab.pdfgen import canvas as pdf_canvas
-    from reportlab.lib.pagesizes import A4
-    REPORTLAB_OK = True
-except Exception:
-    REPORTLAB_OK = False
+import datetime, os
+
+from rims import aggregates, report, uiprofile
+from rims.availability import OverbookedError
+from rims.charts import ChartPanel, PieChart, BarChart, LineChart
+from rims.forms import FormRegistry
+from rims.metrics import timed
+from rims.paging import KeysetPager
+from rims.picker import CustomerPicker
+from rims.pricing import PricingEngine
+from rims.service import RentalService
+from rims.tasks import TaskExecutor
+from rims.virtual_tree import VirtualTreeview
 
 # --------- Database Layer ----------
 class DB:
-    def __init__(self, name="rental_inventory.db"):
+    # column order of the tuples add_rental() takes (App.save_rental builds them)
+    RENTAL_COLUMNS = ("receipt_ref", "product_type", "product_code", "no_days", "cost_per_day",
+                      "credit_limit", "credit_check", "settlement_due", "payment_due", "discount",
+                      "deposit", "pay_due_day", "payment_method", "check_credit", "term_agreed",
+                      "account_on_hold", "restrict_mailing", "account_opened", "next_credit_review",
+                      "last_credit_review", "date_review", "tax", "subtotal", "total")
+
+    def __init__(self, name="rental_inventory.db", profile=None, write_behind=None):
         self.name = name
-        self.init()
+        # schema setup, search, bookings, catalog and pricing live in the headless
+        # service (rims/service.py), shared with the HTTP API and batch jobs;
+        # write_behind / $RIMS_WRITE_BEHIND group-commits saves (rims/writebehind.py)
+        # $RIMS_METRICS times every statement + the @timed methods below (rims/metrics.py)
+        self.service = RentalService(name, profile, write_behind=write_behind)
+        self.pool = self.service.pool
+        self.storage = self.service.storage
+        self.search = self.service.search
+        self.availability = self.service.availability
+        self.catalog = self.service.catalog
 
     def conn(self):
-        return sqlite3.connect(self.name)
-
-    def init(self):
-        c = self.conn()
-        cur = c.cursor()
-        cur.execute("""CREATE TABLE IF NOT EXISTS customers(
-            customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_name TEXT NOT NULL,
-            phone TEXT, email TEXT, address TEXT,
-            created_date DATETIME DEFAULT CURRENT_TIMESTAMP
-        )""")
-        cur.execute("""CREATE TABLE IF NOT EXISTS products(
-            product_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_type TEXT NOT NULL,
-            product_code TEXT UNIQUE,
-            cost_per_day REAL NOT NULL,
-            available_quantity INTEGER DEFAULT 1,
-            status TEXT DEFAULT 'Available'
-        )""")
-        cur.execute("""CREATE TABLE IF NOT EXISTS rentals(
-            rental_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            receipt_ref TEXT UNIQUE,
-            product_type TEXT, product_code TEXT,
-            no_days TEXT, cost_per_day REAL,
-            credit_limit TEXT, credit_check TEXT,
-            settlement_due TEXT, payment_due TEXT,
-            discount TEXT, deposit TEXT, pay_due_day TEXT,
-            payment_method TEXT,
-            check_credit INTEGER, term_agreed INTEGER,
-            account_on_hold INTEGER, restrict_mailing INTEGER,
-            account_opened TEXT, next_credit_review TEXT,
-            last_credit_review TEXT, date_review TEXT,
-            tax REAL, subtotal REAL, total REAL,
-            created_date DATETIME DEFAULT CURRENT_TIMESTAMP
-        )""")
-        # seed products
-        defaults = [
-            ("Car", "CAR452", 12.00, 5),
-            ("Van", "VAN775", 19.00, 3),
-            ("Minibus", "MIN334", 12.00, 2),
-            ("Truck", "TRK7483", 15.00, 2),
-        ]
-        for pt, code, cpd, qty in defaults:
-            cur.execute("INSERT OR IGNORE INTO products(product_type,product_code,cost_per_day,available_quantity) VALUES(?,?,?,?)",
-                        (pt, code, cpd, qty))
-        c.commit(); c.close()
+        # long-lived per-thread connection; commits on exit, rolls back on error
+        return self.pool.connect()
+
+    def pool_stats(self):
+        return self.service.pool_stats()
+
+    def checkpoint(self, mode="PASSIVE"):
+        return self.service.checkpoint(mode)
+
+    def close(self):
+        # commits anything still in the write-behind queue
+        self.service.close()
 
     # customers
-    def customers(self):
-        c = self.conn(); cur=c.cursor()
-        cur.execute("SELECT customer_id, customer_name, phone, email, address FROM customers ORDER BY created_date DESC")
-        r = cur.fetchall(); c.close(); return r
+    @timed("DB.customers")
+    def customers(self, search=None):
+        return [tuple(r.values()) for r in self.service.customers(search)]
+
+    @timed("DB.find_customers")
+    def find_customers(self, term, limit=10):
+        # type-ahead matches on name / phone / email, via the lookup indexes (rims/lookup.py)
+        return self.service.lookup.find(term, limit)
 
+    @timed("DB.add_customer")
     def add_customer(self, n,p,e,a):
-        c=self.conn(); cur=c.cursor()
-        cur.execute("INSERT INTO customers(customer_name,phone,email,address) VALUES(?,?,?,?)",(n,p,e,a))
-        c.commit(); c.close()
+        return self.service.write(self.service.add_customer, n, p, e, a)
 
+    @timed("DB.update_customer")
     def update_customer(self, cid,n,p,e,a):
-        c=self.conn(); cur=c.cursor()
-        cur.execute("UPDATE customers SET customer_name=?, phone=?, email=?, address=? WHERE customer_id=?",
-                    (n,p,e,a,cid))
-        c.commit(); c.close()
+        self.service.write(self.service.update_customer, cid, n, p, e, a)
 
+    @timed("DB.delete_customer")
     def delete_customer(self, cid):
-        c=self.conn(); cur=c.cursor()
-        cur.execute("DELETE FROM customers WHERE customer_id=?", (cid,))
-        c.commit(); c.close()
+        self.service.write(self.service.delete_customer, cid)
 
-    # products
+    # products (served from the catalog cache, see rims/catalog.py)
+    @timed("DB.products")
     def products(self):
-        c=self.conn(); cur=c.cursor()
-        cur.execute("SELECT product_type, product_code, cost_per_day FROM products ORDER BY product_type, product_code")
-        r=cur.fetchall(); c.close(); return r
+        return [(p.product_type, p.product_code, p.cost_per_day) for p in self.catalog.products()]
 
+    @timed("DB.cost_for_code")
     def cost_for_code(self, code):
-        c=self.conn(); cur=c.cursor()
-        cur.execute("SELECT cost_per_day FROM products WHERE product_code=?", (code,))
-        row=cur.fetchone(); c.close(); return row[0] if row else 0.0
+        return self.catalog.cost(code, 0.0)
 
     # rentals
-    def add_rental(self, data_tuple):
-        c=self.conn(); cur=c.cursor()
-        cur.execute("""INSERT INTO rentals(
-            receipt_ref, product_type, product_code, no_days, cost_per_day,
-            credit_limit, credit_check, settlement_due, payment_due, discount,
-            deposit, pay_due_day, payment_method, check_credit, term_agreed,
-            account_on_hold, restrict_mailing, account_opened, next_credit_review,
-            last_credit_review, date_review, tax, subtotal, total
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", data_tuple)
-        c.commit(); c.close()
-
+    @timed("DB.add_rental")
+    def add_rental(self, data_tuple, start=None, end=None, customer_id=None):
+        # returns the receipt ref; an empty one is allocated from the counter (BILL-000001, ...)
+        # customer_id links the rental to a customer (None: no customer picked)
+        # raises OverbookedError (nothing saved) if no unit is free for [start, end)
+        # with write-behind on, returns once the batch holding it has committed
+        row = dict(zip(self.RENTAL_COLUMNS, data_tuple))
+        row["customer_id"] = customer_id
+        return self.service.write(self.service.insert_rental, row, start, end)[1]
+
+    @timed("DB.available")
+    def available(self, code, start, end):
+        # units of `code` free for the whole of [start, end); None if not a known product
+        return self.service.available(code, start, end)
+
+    def rentals_query(self, search=None):
+        # (select sql, count sql, params) for the history rows, optionally filtered
+        where, params = self.search.rentals_filter(search) if search else ("1", ())
+        return (f"""SELECT rental_id, receipt_ref, product_type, no_days, total, created_date
+                    FROM rentals WHERE {where} ORDER BY created_date DESC""",
+                f"SELECT COUNT(*) FROM rentals WHERE {where}", params)
+
+    @timed("DB.rentals")
     def rentals(self, search=None):
-        c=self.conn(); cur=c.cursor()
+        sql, _, params = self.rentals_query(search)
+        with self.conn() as c:
+            return c.execute(sql, params).fetchall()
+
+    @timed("DB.export_rentals_pdf")
+    def export_rentals_pdf(self, filename, search=None, progress=None, check=None):
+        # streamed from a cursor in batches; returns (rows, pages)
+        sql, count_sql, params = self.rentals_query(search)
+        with self.conn() as c:
+            return report.export(c, filename, sql, params, report.history_layout_v11(), count_sql,
+                                 progress=progress, check=check)
+
+    def rental_pager(self, search=None, page_size=100):
+        # newest-first keyset pages for the history list (see rims/paging.py)
         if search:
-            s=f"%{search}%"
-            cur.execute("""SELECT rental_id, receipt_ref, product_type, no_days, total, created_date
-                           FROM rentals
-                           WHERE receipt_ref LIKE ? OR product_type LIKE ? OR product_code LIKE ?
-                           ORDER BY created_date DESC""",(s,s,s))
-        else:
-            cur.execute("""SELECT rental_id, receipt_ref, product_type, no_days, total, created_date
-                           FROM rentals ORDER BY created_date DESC""")
-        rows=cur.fetchall(); c.close(); return rows
+            where, params = self.search.rentals_filter(search)
+            return KeysetPager(self.pool, where=where, params=params, page_size=page_size)
+        return KeysetPager(self.pool, page_size=page_size)
 
+    @timed("DB.analytics")
     def analytics(self):
-        c=self.conn(); cur=c.cursor()
-        cur.execute("SELECT product_type, COUNT(*), SUM(total) FROM rentals GROUP BY product_type")
-        by_type = cur.fetchall()
-        cur.execute("SELECT date(created_date), COUNT(*) FROM rentals WHERE created_date >= date('now','-30 day') GROUP BY date(created_date)")
-        daily = cur.fetchall()
-        c.close()
+        # trigger-maintained summary tables (rims/aggregates.py), not full-table GROUP BYs
+        with self.conn() as c:
+            by_type = aggregates.by_type(c)
+            daily = [(day, n) for day, n, _ in aggregates.daily(c, 30)]
         return by_type, daily
 
 # --------- App ----------
 class App:
     TAX_RATE = 0.15
+    CATALOG_POLL_MS = 1000   # how often to look for product/price edits (one PRAGMA, no table read)
+    # days range -> its first day: the End Date filled in when a range is picked
+    DAY_RANGES = {"1-3": 1, "4-7": 4, "8-14": 8, "15-30": 15, "31-90": 31}
 
     def __init__(self, root):
+        # $RIMS_UI_PROFILE: handler times + event-loop stalls (rims/uiprofile.py); before any widget
+        self.ui_profile = uiprofile.from_setting(root)
         self.db = DB()
+        self.pricing = PricingEngine(self.TAX_RATE)
         self.root = root
         self.root.title("Advanced Rental Inventory Management System")
         self.root.geometry("1250x780")
         self.root.configure(bg="#2c3e50")
 
+        # DB/PDF work runs off the Tk thread; results come back via root.after
+        self.tasks = TaskExecutor(root, on_busy=self._set_busy, on_error=self._task_error)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        # widgets by bound variable (filled as the tabs are built) + batched var/combobox updates
+        self.form = FormRegistry(root)
+
         self._style()
         self._vars()
         self._title()
+        self._statusbar()
         self._tabs()
+        self._catalog_job = None
         self._fill_combos()
 
+    def close(self):
+        if self._catalog_job is not None:
+            self.root.after_cancel(self._catalog_job)
+        self.form.cancel()
+        self.tasks.shutdown()
+        self.db.close()
+        if self.ui_profile is not None:
+            self.ui_profile.close()
+        self.root.destroy()
+
     # ---------- UI scaffolding ----------
     def _style(self):
         s = ttk.Style()
@@ -176,6 +202,8 @@ class App:
         self.v_prod_code = tk.StringVar()
         self.v_days = tk.StringVar(value="Select")
         self.v_cost = tk.StringVar(value="")
+        self.v_start = tk.StringVar()     # YYYY-MM-DD; the rental is priced for [start, end)
+        self.v_end = tk.StringVar()
         # credit panel
         self.v_credit_limit = tk.StringVar(value="Select")
         self.v_credit_check = tk.StringVar(value="Select")
@@ -199,7 +227,7 @@ class App:
         self.v_subtotal = tk.StringVar(value="")
         self.v_tax = tk.StringVar(value="")
         self.v_total = tk.StringVar(value="")
-        self.v_receipt = tk.StringVar(value=self._new_receipt())
+        self.v_receipt = tk.StringVar(value="")   # allocated by the DB on save
         # receipt text
         self.txt_receipt = None
 
@@ -214,8 +242,35 @@ class App:
         ttk.Label(self.root, text="Advanced Rental Inventory Management System",
                   style="Title.TLabel").pack(fill=X, padx=10, pady=8)
 
+    def _statusbar(self):
+        bar = tk.Frame(self.root, bg="#2c3e50"); bar.pack(side=BOTTOM, fill=X, padx=8, pady=(0,6))
+        self.v_status = tk.StringVar(value="Ready")
+        tk.Label(bar, textvariable=self.v_status, bg="#2c3e50", fg="white", font=("Segoe UI", 9)).pack(side=LEFT)
+        self.btn_cancel = ttk.Button(bar, text="Cancel", command=self.tasks.cancel_all, state="disabled")
+        self.btn_cancel.pack(side=RIGHT, padx=4)
+        self.progress = ttk.Progressbar(bar, mode="indeterminate", length=160)
+        self.progress.pack(side=RIGHT, padx=4)
+
+    def _set_busy(self, n):
+        if n:
+            self.progress.configure(mode="indeterminate"); self.progress.start(12)
+            self.btn_cancel.configure(state="normal")
+            self.v_status.set(f"Working... ({n} task{'s' if n > 1 else ''})")
+        else:
+            self.progress.stop(); self.progress["value"] = 0
+            self.btn_cancel.configure(state="disabled")
+            self.v_status.set("Ready")
+
+    def _task_progress(self, fraction, text=""):
+        if fraction is not None:
+            self.progress.stop(); self.progress.configure(mode="determinate", maximum=1.0, value=fraction)
+        if text: self.v_status.set(text)
+
+    def _task_error(self, exc):
+        messagebox.showerror("Error", str(exc))
+
     def _tabs(self):
-        nb = ttk.Notebook(self.root)
+        nb = self.nb = ttk.Notebook(self.root)
         nb.pack(fill=BOTH, expand=True, padx=8, pady=6)
         self.tab_rental = ttk.Frame(nb)
         self.tab_history = ttk.Frame(nb)
@@ -230,6 +285,8 @@ class App:
         self._build_history_tab()
         self._build_analytics_tab()
         self._build_customers_tab()
+        # charts are only drawn while the Analytics tab is showing
+        nb.bind("<<NotebookTabChanged>>", lambda e: self.charts.show(), add="+")
 
     # ---------- New Rental tab (layout like your screenshot) ----------
     def _build_rental_tab(self):
@@ -243,8 +300,13 @@ class App:
         ps.pack(fill=X, padx=8, pady=(8,6))
         self._form_row(ps, 0, "Product Type:", self._combo(ps, self.v_prod_type, width=22, values=[]))
         self._form_row(ps, 0, "No of Days:", self._combo(ps, self.v_days, width=22, values=["1-3","4-7","8-14","15-30","31-90"]))
-        self._form_row(ps, 1, "Product Code:", self._entry(ps, self.v_prod_code, width=24))
+        self._form_row(ps, 1, "Product Code:", self._combo(ps, self.v_prod_code, width=22, state="normal"))
         self._form_row(ps, 1, "Cost Per Day:", self._entry(ps, self.v_cost, width=24, state="readonly"))
+        # type a name, phone number or email and pick from the list
+        self.customer_picker = CustomerPicker(ps, self.db.find_customers, self.tasks, width=50)
+        self._form_row(ps, 2, "Customer:", self.customer_picker)
+        self._form_row(ps, 3, "Start Date:", self._entry(ps, self.v_start, width=24))
+        self._form_row(ps, 4, "End Date:", self._entry(ps, self.v_end, width=24))
 
         # Credit & Payment Details
         cr = ttk.Labelframe(left, text="Credit & Payment Details", padding=10, style="Panel.TLabelframe")
@@ -279,7 +341,7 @@ class App:
         ttk.Button(btnbar, text="Calculate Total", style="Green.TButton", command=self.calculate, width=18).pack(side=LEFT, padx=6, pady=6)
         ttk.Button(btnbar, text="Save Rental", style="Blue.TButton", command=self.save_rental, width=16).pack(side=LEFT, padx=6, pady=6)
         ttk.Button(btnbar, text="Reset", style="Orange.TButton", command=self.reset_rental, width=12).pack(side=LEFT, padx=6, pady=6)
-        ttk.Button(btnbar, text="Exit", style="Red.TButton", command=self.root.destroy, width=10).pack(side=LEFT, padx=6, pady=6)
+        ttk.Button(btnbar, text="Exit", style="Red.TButton", command=self.close, width=10).pack(side=LEFT, padx=6, pady=6)
 
         # Right side panels
         ai = ttk.Labelframe(right, text="Account Information", padding=10, style="Panel.TLabelframe")
@@ -297,6 +359,7 @@ class App:
         # bindings
         self.v_prod_code.trace_add("write", lambda *_: self._update_cost_from_code())
         self.v_prod_type.trace_add("write", lambda *_: self._filter_codes_by_type())
+        self.v_days.trace_add("write", lambda *_: self._fill_dates())
 
     def _form_row(self, parent, row, label, widget):
         # two columns per row (like screenshot)
@@ -307,11 +370,11 @@ class App:
         widget.grid(row=r, column=1, sticky=W, padx=6, pady=4)
 
     def _entry(self, parent, var, width=24, state="normal"):
-        return ttk.Entry(parent, textvariable=var, width=width, state=state)
+        return self.form.register(var, ttk.Entry(parent, textvariable=var, width=width, state=state))
 
-    def _combo(self, parent, var, width=22, values=()):
-        cb = ttk.Combobox(parent, textvariable=var, width=width, values=values, state="readonly")
-        return cb
+    def _combo(self, parent, var, width=22, values=(), state="readonly"):
+        cb = ttk.Combobox(parent, textvariable=var, width=width, values=values, state=state)
+        return self.form.register(var, cb)
 
     # ---------- History tab ----------
     def _build_history_tab(self):
@@ -322,6 +385,9 @@ class App:
         ttk.Label(sr, text="Search:", font=("Segoe UI", 10, "bold")).pack(side=LEFT, padx=6)
         self.v_hist_q = tk.StringVar()
         ttk.Entry(sr, textvariable=self.v_hist_q, width=40).pack(side=LEFT, padx=6)
+        # search-as-you-type (debounced)
+        self._hist_search_job = None
+        self.v_hist_q.trace_add("write", lambda *_: self._schedule_history_search())
         ttk.Button(sr, text="Search", style="Blue.TButton", command=self.search_history).pack(side=LEFT, padx=4)
         ttk.Button(sr, text="Show All", style="Green.TButton", command=self.load_history).pack(side=LEFT, padx=4)
         ttk.Button(sr, text="Export to PDF", style="Red.TButton", command=self.export_pdf).pack(side=RIGHT)
@@ -335,10 +401,11 @@ class App:
         self.tree_hist.column("No. Days", width=110)
         self.tree_hist.column("Total", width=120)
         self.tree_hist.column("Date", width=160)
-        vs = ttk.Scrollbar(top, orient=VERTICAL, command=self.tree_hist.yview)
-        self.tree_hist.configure(yscrollcommand=vs.set)
+        vs = ttk.Scrollbar(top, orient=VERTICAL)
         self.tree_hist.pack(side=LEFT, fill=BOTH, expand=True)
         vs.pack(side=RIGHT, fill=Y)
+        # virtual list: only the visible rows exist as Tk items
+        self.hist_view = VirtualTreeview(self.tree_hist, vs, tasks=self.tasks)  # pages read on a worker
 
         self.load_history()
 
@@ -360,7 +427,13 @@ class App:
         self.canvas = FigureCanvasTkAgg(self.fig, master=wrap)
         self.canvas.get_tk_widget().pack(fill=BOTH, expand=True)
         ttk.Button(wrap, text="Refresh", style="Blue.TButton", command=self.refresh_analytics).pack(anchor=E, pady=6)
-        self.refresh_analytics()
+        # artists are made once and updated in place; unchanged data is not redrawn (rims/charts.py)
+        self.charts = ChartPanel(self.canvas, [
+            PieChart(self.ax_pie, "Product Distribution by Count"),
+            BarChart(self.ax_bar, "Revenue by Product Type", ylabel="Revenue (£)"),
+            LineChart(self.ax_line, "Daily Rentals (Last 30 Days)", ylabel="Number of Rentals", rotation=45)],
+            split=self._split_analytics, visible=self._analytics_visible,
+            load=lambda done: self.tasks.submit(self.db.analytics, key="analytics", on_done=done))
 
     # ---------- Customer Management tab ----------
     def _build_customers_tab(self):
@@ -397,78 +470,95 @@ class App:
 
     def _lbl_ent(self, parent, row, text, var, col=0):
         ttk.Label(parent, text=text, font=("Segoe UI", 10, "bold")).grid(row=row, column=col*2, sticky=E, padx=6, pady=4)
-        ttk.Entry(parent, textvariable=var, width=28).grid(row=row, column=col*2+1, padx=6, pady=4, sticky=W)
+        self.form.register(var, ttk.Entry(parent, textvariable=var, width=28)).grid(row=row, column=col*2+1, padx=6, pady=4, sticky=W)
 
     # ---------- Data helpers ----------
     def _fill_combos(self):
-        # product type list + code map
-        self.products = self.db.products()
-        self.codes_by_type = {}
-        self.cost_by_code = {}
-        for pt, code, cpd in self.products:
-            self.codes_by_type.setdefault(pt, []).append(code)
-            self.cost_by_code[code] = cpd
-        # set product type combobox values
-        for w in self.tab_rental.winfo_children():
-            pass  # (we already set trace to update fields when value changes)
-        # set default type if exists
-        if self.codes_by_type:
-            types = sorted(self.codes_by_type.keys())
-            self._set_combo_values(self.v_prod_type, types)
-
-    def _set_combo_values(self, var, values):
-        # find the widget bound to this var (combobox) and set its values
-        def find_cb(widget):
-            if isinstance(widget, ttk.Combobox) and widget.cget("textvariable") == str(var):
-                return widget
-            for ch in widget.winfo_children():
-                r = find_cb(ch)
-                if r: return r
-            return None
-        cb = find_cb(self.tab_rental)
-        if cb: cb["values"] = values
+        self.tasks.submit(self.db.catalog.load, key="products", on_done=self._set_products)
+        self._catalog_job = self.root.after(self.CATALOG_POLL_MS, self._watch_products)
+
+    def _watch_products(self):
+        # price/product edits from any terminal show up within a poll; the check
+        # (and the reload when something changed) runs on a worker
+        self.tasks.submit(self.db.catalog.reload_if_changed, key="catalog-poll", quiet=True,
+                          on_done=self._catalog_polled, on_error=lambda e: None)   # the next poll retries
+        self._catalog_job = self.root.after(self.CATALOG_POLL_MS, self._watch_products)
+
+    def _catalog_polled(self, catalog):
+        if catalog is not None:
+            self._set_products(catalog)
+
+    def _set_products(self, catalog):
+        # product type list, codes of the chosen type, cost of the chosen code - one idle update
+        self.form.values(self.v_prod_type, catalog.types())
+        t = self.form.get(self.v_prod_type)
+        if t and t != "Select":
+            self.form.values(self.v_prod_code, catalog.codes(t))
+        if self.form.get(self.v_prod_code).strip():
+            self._update_cost_from_code()
 
     def _filter_codes_by_type(self):
         t = self.v_prod_type.get()
-        codes = self.codes_by_type.get(t, [])
-        self.v_prod_code.set("")
-        self.v_cost.set("")
-        # update combobox for code
-        self._set_combo_values(self.v_prod_code, codes)
+        self.form.values(self.v_prod_code, self.db.catalog.codes(t))
+        self.form.set(self.v_prod_code, "")
+        self.form.set(self.v_cost, "")
 
     def _update_cost_from_code(self):
-        code = self.v_prod_code.get().strip()
-        if not code:
-            self.v_cost.set(""); return
-        cpd = self.cost_by_code.get(code) or self.db.cost_for_code(code)
-        self.v_cost.set(f"£{cpd:.2f}")
+        code = self.form.get(self.v_prod_code).strip()
+        p = self.db.catalog.get(code) if code else None
+        self.form.set(self.v_cost, f"£{p.cost_per_day:.2f}" if p else "")
 
     # ---------- Calculate / Save / Reset ----------
-    def calculate(self):
-        # days range -> an approximate numeric center
-        ranges = {"1-3": 2, "4-7": 6, "8-14": 11, "15-30": 22, "31-90": 60}
-        days = ranges.get(self.v_days.get(), 0)
+    def _fill_dates(self):
+        # picking a range proposes [start, start + its first day); both dates stay editable
+        days = self.DAY_RANGES.get(self.form.get(self.v_days))
+        if days is None:
+            return
         try:
-            cpd = float(self.v_cost.get().replace("£","")) if self.v_cost.get() else 0.0
-        except Exception:
-            cpd = 0.0
-        subtotal = days * cpd
-        tax = subtotal * self.TAX_RATE
-        total = subtotal + tax
-        self.v_subtotal.set(f"£{subtotal:.2f}")
-        self.v_tax.set(f"£{tax:.2f}")
-        self.v_total.set(f"{total:.1f}")
+            start = datetime.date.fromisoformat(self.form.get(self.v_start).strip())
+        except ValueError:
+            start = datetime.date.today()
+        self.form.set(self.v_start, start.isoformat())
+        self.form.set(self.v_end, (start + datetime.timedelta(days=days)).isoformat())
+
+    def _rental_span(self):
+        # [start, end) of the rental being entered, from the date fields
+        # (blank: from today for the first day of the chosen range); None if invalid
+        try:
+            start = datetime.date.fromisoformat(self.v_start.get().strip() or datetime.date.today().isoformat())
+            end = self.v_end.get().strip()
+            end = (datetime.date.fromisoformat(end) if end
+                   else start + datetime.timedelta(days=self.DAY_RANGES.get(self.v_days.get(), 1)))
+        except ValueError:
+            messagebox.showerror("Error", "Enter dates as YYYY-MM-DD"); return None
+        if end <= start:
+            messagebox.showerror("Error", "End Date must be after Start Date"); return None
+        return start, end
+
+    def calculate(self):
+        span = self._rental_span()
+        if span is None:
+            return None
+        start, end = span
+        code = self.v_prod_code.get().strip()
+        cpd = self.db.catalog.cost(code, 0.0)
+        q = self.pricing.quote(cpd, start, end, self.v_discount.get())
+        self.v_subtotal.set(f"£{q.subtotal}")
+        self.v_tax.set(f"£{q.tax}")
+        self.v_total.set(f"{q.total}")
 
         # build receipt text
         self.txt_receipt.delete("1.0", END)
-        self.txt_receipt.insert(END, f"Receipt Ref : {self.v_receipt.get()}\n")
+        self.txt_receipt.insert(END, f"Receipt Ref : {self.v_receipt.get() or '(assigned on save)'}\n")
         self.txt_receipt.insert(END, f"Product Type : {self.v_prod_type.get()}\n")
         self.txt_receipt.insert(END, f"Product Code : {self.v_prod_code.get()}\n")
-        self.txt_receipt.insert(END, f"No. of Days  : {self.v_days.get()} (~{days} days)\n")
-        self.txt_receipt.insert(END, f"Cost / Day   : {self.v_cost.get()}\n")
+        self.txt_receipt.insert(END, f"No. of Days  : {self.v_days.get()} ({q.days} days, {start} to {end})\n")
+        self.txt_receipt.insert(END, f"Cost / Day   : £{q.rate}\n")
+        self.txt_receipt.insert(END, f"Discount     : {q.discount}%\n")
         self.txt_receipt.insert(END, f"Subtotal     : {self.v_subtotal.get()}\n")
         self.txt_receipt.insert(END, f"Tax (15%)    : {self.v_tax.get()}\n")
         self.txt_receipt.insert(END, f"Total        : £{self.v_total.get()}\n")
+        return span
 
     def save_rental(self):
         if not self.v_prod_type.get() or self.v_prod_type.get()=="Select":
@@ -477,8 +567,12 @@ class App:
             messagebox.showerror("Error","Enter/Select Product Code"); return
         if not self.v_days.get() or self.v_days.get()=="Select":
             messagebox.showerror("Error","Select No of Days"); return
+        if self.customer_picker.get().strip() and self.customer_picker.customer_id is None:
+            messagebox.showerror("Error","Pick the customer from the list (or clear the field)"); return
 
-        self.calculate()
+        span = self.calculate()
+        if span is None:
+            return
         receipt = self.v_receipt.get()
         row = (receipt, self.v_prod_type.get(), self.v_prod_code.get(),
                self.v_days.get(), float(self.v_cost.get().replace("£","") or 0),
@@ -494,115 +588,108 @@ class App:
                float(self.v_subtotal.get().replace("£","") or 0),
                float(self.v_total.get() or 0)
                )
-        try:
-            self.db.add_rental(row)
-        except sqlite3.IntegrityError:
-            # duplicate receipt -> regenerate and retry
-            self.v_receipt.set(self._new_receipt())
-            row = (self.v_receipt.get(),) + row[1:]
-            self.db.add_rental(row)
-
-        messagebox.showinfo("Saved","Rental saved.")
+        start, end = span
+        if self.tasks.pending("save-rental"): return   # double click
+        self.tasks.submit(self.db.add_rental, row, start, end, key="save-rental",
+                          customer_id=self.customer_picker.customer_id,
+                          on_done=self._rental_saved, on_error=self._save_failed)
+
+    def _save_failed(self, exc):
+        messagebox.showerror("Not available" if isinstance(exc, OverbookedError) else "Error", str(exc))
+
+    def _rental_saved(self, receipt):
+        messagebox.showinfo("Saved", f"Rental {receipt} saved.")
         self.reset_rental()
         self.load_history()
         self.refresh_analytics()
 
     def reset_rental(self):
-        self.v_prod_type.set("Select"); self.v_days.set("Select")
-        self.v_prod_code.set(""); self.v_cost.set("")
-        self.v_credit_limit.set("Select"); self.v_credit_check.set("Select")
-        self.v_settle_due.set(""); self.v_payment_due.set("Select")
-        self.v_discount.set("Select"); self.v_deposit.set("Select")
-        self.v_pay_due_day.set(""); self.v_payment_method.set("Select")
-        self.v_check_credit.set(0); self.v_term_agreed.set(0)
-        self.v_on_hold.set(0); self.v_restrict_mail.set(0)
-        self.v_account_opened.set("Select an option")
-        self.v_next_review.set(""); self.v_last_review.set(""); self.v_date_review.set("")
-        self.v_subtotal.set(""); self.v_tax.set(""); self.v_total.set("")
-        self.v_receipt.set(self._new_receipt())
+        # queued: the whole form (and the traces it fires) updates in one idle pass
+        f = self.form
+        f.set(self.v_prod_type, "Select"); f.set(self.v_days, "Select")
+        f.set(self.v_prod_code, ""); f.set(self.v_cost, "")
+        f.set(self.v_start, ""); f.set(self.v_end, "")
+        f.set(self.v_credit_limit, "Select"); f.set(self.v_credit_check, "Select")
+        f.set(self.v_settle_due, ""); f.set(self.v_payment_due, "Select")
+        f.set(self.v_discount, "Select"); f.set(self.v_deposit, "Select")
+        f.set(self.v_pay_due_day, ""); f.set(self.v_payment_method, "Select")
+        f.set(self.v_check_credit, 0); f.set(self.v_term_agreed, 0)
+        f.set(self.v_on_hold, 0); f.set(self.v_restrict_mail, 0)
+        f.set(self.v_account_opened, "Select an option")
+        f.set(self.v_next_review, ""); f.set(self.v_last_review, ""); f.set(self.v_date_review, "")
+        f.set(self.v_subtotal, ""); f.set(self.v_tax, ""); f.set(self.v_total, "")
+        f.set(self.v_receipt, "")
+        self.customer_picker.clear()
         self.txt_receipt.delete("1.0", END)
 
-    def _new_receipt(self):
-        return f"BILL{random.randint(100000,999999)}"
-
     # ---------- History ----------
     def load_history(self):
-        for i in self.tree_hist.get_children(): self.tree_hist.delete(i)
-        for r in self.db.rentals():
-            self.tree_hist.insert("", "end", values=r)
+        self._load_pager(None)
 
     def search_history(self):
         q = self.v_hist_q.get().strip()
-        rows = self.db.rentals(q)
-        for i in self.tree_hist.get_children(): self.tree_hist.delete(i)
-        for r in rows: self.tree_hist.insert("", "end", values=r)
+        self._load_pager(q or None)
+
+    def _load_pager(self, q):
+        # count + first page are read in the background; repeated requests coalesce
+        self.tasks.submit(self._warm_pager, q, key="history", on_done=self.hist_view.set_pager)
+
+    def _warm_pager(self, q):
+        p = self.db.rental_pager(q)
+        p.count(); p.page(0)
+        return p
+
+    def _schedule_history_search(self, delay=250):
+        if self._hist_search_job is not None:
+            self.root.after_cancel(self._hist_search_job)
+        self._hist_search_job = self.root.after(delay, self._run_history_search)
+
+    def _run_history_search(self):
+        self._hist_search_job = None
+        self.search_history()
 
     def export_pdf(self):
-        if not REPORTLAB_OK:
-            messagebox.showwarning("PDF", "ReportLab not installed. Run: pip install reportlab")
-            return
-        rows = self.db.rentals(self.v_hist_q.get().strip() or None)
-        if not rows:
-            messagebox.showinfo("PDF", "No data to export."); return
+        if self.tasks.pending("export-pdf"):
+            messagebox.showinfo("PDF", "An export is already running."); return
         filename = f"rentals_{datetime.datetime.now():%Y%m%d_%H%M%S}.pdf"
-        c = pdf_canvas.Canvas(filename, pagesize=A4)
-        w, h = A4
-        y = h - 40
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(40,y, "Rental History"); y -= 24
-        c.setFont("Helvetica", 10)
-        headers = ["ID","Receipt","Product","No.Days","Total","Date"]
-        c.drawString(40,y, " | ".join(headers)); y-=16
-        for r in rows:
-            line = f"{r[0]} | {r[1]} | {r[2]} | {r[3]} | £{r[4]} | {r[5]}"
-            if y < 60:
-                c.showPage(); y=h-40
-            c.drawString(40,y,line); y-=14
-        c.save()
-        messagebox.showinfo("PDF", f"Exported to {filename}")
+        self.tasks.submit(self._write_pdf, self.v_hist_q.get().strip() or None, filename,
+                          key="export-pdf", pass_task=True, on_progress=self._task_progress,
+                          on_done=self._pdf_written)
+
+    def _pdf_written(self, filename):
+        if filename: messagebox.showinfo("PDF", f"Exported to {filename}")
+        else: messagebox.showinfo("PDF", "No data to export.")
+
+    def _write_pdf(self, search, filename, task):
+        # worker thread: rows are streamed, never all in memory
+        def progress(done, total):
+            task.report(done / total if total else None, f"Exporting PDF... {done:,}/{total or 0:,} rows")
+        rows, _pages = self.db.export_rentals_pdf(filename, search, progress, task.check)
+        if not rows:
+            os.remove(filename); return None
+        return filename
 
     # ---------- Analytics ----------
     def refresh_analytics(self):
-        (by_type, daily) = self.db.analytics()
-
-        # pie: distribution by count
-        self.ax_pie.clear()
-        if by_type:
-            labels = [r[0] for r in by_type]
-            counts = [r[1] for r in by_type]
-            self.ax_pie.pie(counts, labels=labels, autopct="%1.1f%%")
-            self.ax_pie.set_title("Product Distribution by Count")
-        else:
-            self.ax_pie.text(0.5,0.5,"No data", ha="center")
-
-        # bar: revenue by product type
-        self.ax_bar.clear()
-        if by_type:
-            labels = [r[0] for r in by_type]
-            revenue = [r[2] or 0 for r in by_type]
-            self.ax_bar.bar(labels, revenue)
-            self.ax_bar.set_title("Revenue by Product Type")
-            self.ax_bar.set_ylabel("Revenue (£)")
-        else:
-            self.ax_bar.text(0.5,0.5,"No data", ha="center")
-
-        # line: daily rentals last 30 days
-        self.ax_line.clear()
-        if daily:
-            xs = [d[0] for d in daily]
-            ys = [d[1] for d in daily]
-            self.ax_line.plot(xs, ys, marker="o")
-            self.ax_line.set_title("Daily Rentals (Last 30 Days)")
-            self.ax_line.set_ylabel("Number of Rentals")
-            self.ax_line.tick_params(axis='x', labelrotation=45)
-        else:
-            self.ax_line.text(0.5,0.5,"No data", ha="center")
-        self.canvas.draw_idle()
+        # queries now if the tab is showing, otherwise the next time it is shown
+        self.charts.refresh()
+
+    def _analytics_visible(self):
+        return self.nb.select() == str(self.tab_analytics)
+
+    @staticmethod
+    def _split_analytics(data):
+        # (pie, bar, line) rows from DB.analytics()
+        by_type, daily = data
+        return ([(t, n) for t, n, _ in by_type], [(t, rev) for t, _, rev in by_type], daily)
 
     # ---------- Customers ----------
     def _reload_customers(self):
+        self.tasks.submit(self.db.customers, key="customers", on_done=self._fill_customers)
+
+    def _fill_customers(self, rows):
         for i in self.tree_cus.get_children(): self.tree_cus.delete(i)
-        for r in self.db.customers():
+        for r in rows:
             self.tree_cus.insert("", "end", values=r)
 
     def _cus_select(self, _e=None):
@@ -621,27 +708,28 @@ class App:
     def cus_add(self):
         if not self.cus_name.get().strip():
             messagebox.showerror("Error","Customer name is required."); return
-        self.db.add_customer(self.cus_name.get().strip(), self.cus_phone.get().strip(),
-                             self.cus_email.get().strip(), self.cus_address.get().strip())
-        messagebox.showinfo("Success","Customer added.")
+        self.tasks.submit(self.db.add_customer, self.cus_name.get().strip(), self.cus_phone.get().strip(),
+                          self.cus_email.get().strip(), self.cus_address.get().strip(),
+                          on_done=lambda _: self._cus_done("Customer added."))
+
+    def _cus_done(self, msg):
+        messagebox.showinfo("Success", msg)
         self.cus_clear(); self._reload_customers()
 
     def cus_update(self):
         if not self.cus_id:
             messagebox.showerror("Error","Select a customer to update."); return
-        self.db.update_customer(self.cus_id, self.cus_name.get().strip(),
-                                self.cus_phone.get().strip(), self.cus_email.get().strip(),
-                                self.cus_address.get().strip())
-        messagebox.showinfo("Success","Customer updated.")
-        self.cus_clear(); self._reload_customers()
+        self.tasks.submit(self.db.update_customer, self.cus_id, self.cus_name.get().strip(),
+                          self.cus_phone.get().strip(), self.cus_email.get().strip(),
+                          self.cus_address.get().strip(),
+                          on_done=lambda _: self._cus_done("Customer updated."))
 
     def cus_delete(self):
         if not self.cus_id:
             messagebox.showerror("Error","Select a customer to delete."); return
         if not messagebox.askyesno("Confirm","Delete this customer?"): return
-        self.db.delete_customer(self.cus_id)
-        messagebox.showinfo("Success","Customer deleted.")
-        self.cus_clear(); self._reload_customers()
+        self.tasks.submit(self.db.delete_customer, self.cus_id,
+                          on_done=lambda _: self._cus_done("Customer deleted."))
 
 # ---------------- Run ----------------
 if __name__ == "__main__":
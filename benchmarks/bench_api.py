@@ -0,0 +1,194 @@
+# benchmarks/bench_api.py
+# Load test for the HTTP JSON API (rims/api.py): keep-alive clients run a
+# weighted mix of quote / book / search / list / analytics / customer calls
+# for a fixed time and report requests/sec and latency percentiles, overall
+# and per endpoint.
+#
+# By default a server is started in a subprocess (so client and server do not
+# share a GIL) on a fresh database seeded with --customers and --rentals rows;
+# --url points the clients at a server that is already running instead.
+#
+#   python benchmarks/bench_api.py --duration 10 --concurrency 32
+#   python benchmarks/bench_api.py --workers 8 --mix quote=1
+#   python benchmarks/bench_api.py --url http://127.0.0.1:8080 --duration 30
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rims.service import RentalService      # noqa: E402
+
+CODES = ("CAR452", "VAN775", "MIN334", "TRK7483")
+MIX = dict(quote=40, list=15, search=15, analytics=10, customer=10, book=5, add_customer=5)
+
+
+def seed(path, customers, rentals):
+    svc = RentalService(path, "batch-import")
+    with svc.pool.connect() as c:
+        # plenty of units, so bookings measure the write path rather than 409s
+        c.execute("UPDATE products SET available_quantity = 100000")
+        c.executemany("INSERT INTO customers(customer_name, phone, email, address) VALUES(?,?,?,?)",
+                      [(f"Customer {i}", f"07{i:09d}", f"c{i}@example.com", f"{i} High Street")
+                       for i in range(customers)])
+    rnd = random.Random(1)
+    for i in range(rentals):
+        svc.book(dict(product_code=rnd.choice(CODES), start=f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                      days=rnd.randint(1, 14), customer_id=rnd.randint(1, customers), payment_method="Cash"))
+    svc.pool.close_all()
+
+
+def request_for(kind, rnd, customers):
+    if kind == "quote":
+        return "GET", f"/quote?product_code={rnd.choice(CODES)}&start=2026-03-01&days={rnd.randint(1, 60)}", None
+    if kind == "list":
+        return "GET", "/rentals?limit=50", None
+    if kind == "search":
+        return "GET", f"/search?q={rnd.choice(('bill', 'van', 'car', 'truck', 'customer'))}&limit=20", None
+    if kind == "analytics":
+        return "GET", "/analytics", None
+    if kind == "customer":
+        return "GET", f"/customers/{rnd.randint(1, customers)}", None
+    if kind == "book":
+        day = (datetime.date(2026, 1, 1) + datetime.timedelta(days=rnd.randint(0, 700))).isoformat()
+        return "POST", "/rentals", dict(product_code=rnd.choice(CODES), start=day, days=rnd.randint(1, 14),
+                                        customer_id=rnd.randint(1, customers), payment_method="Card")
+    return "POST", "/customers", dict(name=f"Walk-in {rnd.random():.6f}", phone="07000000000")
+
+
+async def http(reader, writer, host, method, path, body):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(data)}\r\n\r\n").encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, deadline, kinds, weights, customers, seed_no, results):
+    rnd = random.Random(seed_no)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            kind = rnd.choices(kinds, weights)[0]
+            method, path, body = request_for(kind, rnd, customers)
+            t = time.perf_counter()
+            status = await http(reader, writer, host, method, path, body)
+            results.append((kind, status, time.perf_counter() - t))
+    finally:
+        writer.close()
+
+
+def pct(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+def report(results, seconds):
+    print(f"{'endpoint':>12s} {'requests':>9s} {'req/s':>9s} {'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s} "
+          f"{'max ms':>8s} {'errors':>7s}")
+    groups = {}
+    for kind, status, dt in results:
+        groups.setdefault(kind, []).append((status, dt))
+    groups["ALL"] = [(s, dt) for _, s, dt in results]
+    for kind, rows in groups.items():
+        lat = sorted(dt * 1000 for _, dt in rows)
+        errors = sum(1 for s, _ in rows if s >= 400)
+        print(f"{kind:>12s} {len(rows):>9,d} {len(rows) / seconds:>9,.0f} {pct(lat, 50):>8.2f} {pct(lat, 90):>8.2f} "
+              f"{pct(lat, 99):>8.2f} {lat[-1]:>8.2f} {errors:>7,d}")
+    return groups["ALL"]
+
+
+def start_server(db, workers):
+    proc = subprocess.Popen([sys.executable, "-m", "rims.api", db, "--port", "0", "--workers", str(workers)],
+                            cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    m = re.search(r"http://([\d.]+):(\d+)", line)
+    if not m:
+        proc.kill()
+        raise SystemExit(f"server did not start: {line!r}")
+    return proc, m.group(1), int(m.group(2))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", help="hit this running server instead of starting one")
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--workers", type=int, default=4, help="server reader threads (own server only)")
+    ap.add_argument("--customers", type=int, default=2000)
+    ap.add_argument("--rentals", type=int, default=5000)
+    ap.add_argument("--mix", nargs="*", default=[], help="endpoint=weight overrides, e.g. book=20 quote=0")
+    ap.add_argument("--max-p99-ms", type=float, default=None, help="exit 1 if the overall p99 is above this")
+    args = ap.parse_args(argv)
+
+    mix = dict(MIX)
+    for item in args.mix:
+        k, _, v = item.partition("=")
+        if k not in MIX:
+            ap.error(f"unknown endpoint {k!r} (one of {', '.join(MIX)})")
+        mix[k] = float(v)
+    kinds = [k for k, w in mix.items() if w > 0]
+    weights = [mix[k] for k in kinds]
+
+    proc, tmp = None, None
+    try:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            tmp = tempfile.TemporaryDirectory()
+            db = os.path.join(tmp.name, "bench_api.db")
+            t = time.perf_counter()
+            seed(db, args.customers, args.rentals)
+            print(f"seeded {args.customers:,d} customers, {args.rentals:,d} rentals in {time.perf_counter() - t:.1f}s")
+            proc, host, port = start_server(db, args.workers)
+
+        results = []
+
+        async def run():
+            deadline = time.perf_counter() + args.duration
+            await asyncio.gather(*(client(host, port, deadline, kinds, weights, args.customers, i, results)
+                                   for i in range(args.concurrency)))
+
+        t = time.perf_counter()
+        asyncio.run(run())
+        seconds = time.perf_counter() - t
+        print(f"{args.concurrency} connections, {args.duration:.0f}s, "
+              f"{'server ' + args.url if args.url else str(args.workers) + ' server readers'}")
+        rows = report(results, seconds)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if tmp is not None:
+            tmp.cleanup()
+
+    p99 = pct(sorted(dt * 1000 for _, dt in rows), 99)
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        print(f"FAIL: p99 {p99:.2f} ms over {args.max_p99_ms:.2f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
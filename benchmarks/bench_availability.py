@@ -0,0 +1,120 @@
+# benchmarks/bench_availability.py
+# 10k bookings from several threads at once against rims.availability, then a
+# brute-force check that no product was ever booked beyond available_quantity.
+#
+#   python benchmarks/bench_availability.py --bookings 10000 --threads 8
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims import ConnectionManager, schema, migrations, storage          # noqa: E402
+from rims.availability import AvailabilityEngine, OverbookedError       # noqa: E402
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def setup(path, products):
+    pool = ConnectionManager(path)
+    storage.configure(pool, "desk")
+    with pool.connect() as c:
+        c.execute(schema.CREATE_CUSTOMERS)
+        c.execute(schema.CREATE_PRODUCTS)
+        c.execute(schema.CREATE_RENTALS)
+        c.executemany("INSERT INTO products(product_type, product_code, cost_per_day, available_quantity) "
+                      "VALUES('Car', ?, 12.0, ?)", [(code, cap) for code, cap in products.items()])
+    migrations.migrate(pool.connection())
+    return pool
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bookings", type=int, default=10000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--products", type=int, default=40)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    rnd = random.Random(args.seed)
+    products = {f"P{i:03d}": rnd.randint(2, 12) for i in range(args.products)}
+    day0 = datetime.date(2025, 1, 1)
+    jobs = [(rnd.choice(list(products)), rnd.randint(0, 364), rnd.randint(1, 14)) for _ in range(args.bookings)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = setup(os.path.join(tmp, "bench.db"), products)
+        engine = AvailabilityEngine()
+        lat, results = [], Counter()
+        lock = threading.Lock()
+
+        def worker(chunk):
+            mine, out = [], Counter()
+            for code, off, days in chunk:
+                start = day0 + datetime.timedelta(days=off)
+                end = start + datetime.timedelta(days=days)
+                t = time.perf_counter()
+                try:
+                    with pool.connect(immediate=True) as c:
+                        cur = c.execute("INSERT INTO rentals(product_code, no_days) VALUES(?, ?)", (code, days))
+                        engine.reserve(c, code, start, end, rental_id=cur.lastrowid)
+                    out["booked"] += 1
+                except OverbookedError:
+                    out["rejected"] += 1
+                mine.append(time.perf_counter() - t)
+            with lock:
+                lat.extend(mine)
+                results.update(out)
+
+        chunks = [jobs[i::args.threads] for i in range(args.threads)]
+        threads = [threading.Thread(target=worker, args=(ch,)) for ch in chunks]
+        t0 = time.perf_counter()
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        wall = time.perf_counter() - t0
+
+        # read path: "how many are free between D1 and D2"
+        q = []
+        with pool.connect() as c:
+            for _ in range(2000):
+                code = rnd.choice(list(products))
+                start = day0 + datetime.timedelta(days=rnd.randint(0, 364))
+                t = time.perf_counter()
+                engine.free(c, code, start, start + datetime.timedelta(days=rnd.randint(1, 30)))
+                q.append(time.perf_counter() - t)
+
+            # brute-force invariant: per-day usage never exceeds capacity
+            usage = Counter()
+            for code, s, e, n in c.execute("SELECT product_code, start_date, end_date, quantity FROM reservations"):
+                d, end = datetime.date.fromisoformat(s), datetime.date.fromisoformat(e)
+                while d < end:
+                    usage[(code, d)] += n
+                    d += datetime.timedelta(days=1)
+            over = [(k, v) for k, v in usage.items() if v > products[k[0]]]
+            rentals = c.execute("SELECT COUNT(*) FROM rentals").fetchone()[0]
+        pool.close_all()
+
+    print(f"bookings: {args.bookings:,d} from {args.threads} threads in {wall:.2f}s "
+          f"({args.bookings / wall:,.0f}/s)")
+    print(f"  booked {results['booked']:,d}, rejected {results['rejected']:,d}, rentals rows {rentals:,d}")
+    print(f"  reserve latency  p50 {pct(lat, 50) * 1e3:.2f} ms  p99 {pct(lat, 99) * 1e3:.2f} ms")
+    print(f"  free() query     p50 {pct(q, 50) * 1e3:.3f} ms  p99 {pct(q, 99) * 1e3:.3f} ms")
+    print(f"  overbooked days: {len(over)}")
+    ok = not over and rentals == results["booked"]
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+# benchmarks/bench_bulk.py
+# Throughput of rims.bulk: CSV import (deferred indexes vs. live triggers) and
+# streaming export, on a fresh migrated database. After each import the
+# analytics summaries are checked against a full recount and the migration
+# plan checks are re-run on the recreated indexes.
+#
+#   python benchmarks/bench_bulk.py --rows 100000 1000000
+#   python benchmarks/bench_bulk.py --rows 200000 --table customers --live
+
+import argparse
+import csv
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims import aggregates, bulk, migrations, schema, storage      # noqa: E402
+
+TYPES = {"CAR452": "Car", "VAN775": "Van", "MIN334": "Minibus", "TRK7483": "Truck"}
+
+
+def write_csv(path, table, rows, seed=1):
+    rnd = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        if table == "rentals":
+            w.writerow(("customer_id", "product_type", "product_code", "no_days", "cost_per_day", "app_date",
+                        "next_credit_review", "discount", "payment_method", "check_credit", "term_agreed",
+                        "tax", "subtotal", "total", "created_date"))
+            for i in range(rows):
+                code = rnd.choice(tuple(TYPES))
+                sub = round(rnd.uniform(10, 800), 2)
+                day = f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}"
+                w.writerow((rnd.randint(1, 5000), TYPES[code], code, "4-7", 12.0, day, day, 5.0, "Cash", 1, 0,
+                            round(sub * 0.15, 2), sub, round(sub * 1.15, 2), day + " 09:30:00"))
+        elif table == "customers":
+            w.writerow(("customer_name", "phone", "email", "address", "created_date"))
+            for i in range(rows):
+                w.writerow((f"Customer {i}", f"07{rnd.randint(10 ** 8, 10 ** 9 - 1)}", f"c{i}@example.com",
+                            f"{i} High Street", "2024-03-04 10:00:00"))
+        else:
+            w.writerow(("product_type", "product_code", "cost_per_day", "available_quantity"))
+            for i in range(rows):
+                w.writerow((rnd.choice(tuple(TYPES.values())), f"P{i:08d}", round(rnd.uniform(5, 50), 2), 3))
+
+
+def fresh_db(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    for sql in (schema.CREATE_CUSTOMERS, schema.CREATE_PRODUCTS, schema.CREATE_RENTALS):
+        conn.execute(sql)
+    conn.executemany("INSERT INTO products(product_type, product_code, cost_per_day, available_quantity) "
+                     "VALUES(?, ?, 12.0, 5)", [(t, c) for c, t in TYPES.items()])
+    migrations.migrate(conn)
+    storage.get_profile("batch-import").apply(conn)
+    return conn
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100000])
+    ap.add_argument("--table", default="rentals", choices=tuple(bulk.TABLES))
+    ap.add_argument("--batch", type=int, default=20000)
+    ap.add_argument("--live", action="store_true", help="also time a load with indexes/triggers kept live")
+    args = ap.parse_args(argv)
+
+    modes = (True, False) if args.live else (True,)
+    print(f"{'rows':>10s} {'mode':>8s} {'load/s':>10s} {'total/s':>10s} {'finish s':>9s} {'export/s':>10s}  check")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            src = os.path.join(tmp, f"{args.table}_{n}.csv")
+            write_csv(src, args.table, n)
+            for defer in modes:
+                db = os.path.join(tmp, f"bench_{n}_{defer}.db")
+                conn = fresh_db(db)
+                res = bulk.import_csv(conn, args.table, src, batch=args.batch, defer_indexes=defer)
+                t = time.perf_counter()
+                out = bulk.export_csv(conn, args.table, os.path.join(tmp, "out.csv"))
+                export_rate = out / (time.perf_counter() - t)
+                migrations.verify(conn)          # raises if a recreated index is not used
+                ok = not aggregates.check(conn)
+                conn.close()
+                print(f"{n:>10,d} {'deferred' if defer else 'live':>8s} {res['rows'] / res['load_seconds']:>10,.0f} "
+                      f"{res['rows_per_sec']:>10,.0f} {res['seconds'] - res['load_seconds']:>9.2f} "
+                      f"{export_rate:>10,.0f}  {'OK' if ok else 'MISMATCH'}", flush=True)
+                os.remove(db)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
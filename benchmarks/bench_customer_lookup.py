@@ -0,0 +1,101 @@
+# benchmarks/bench_customer_lookup.py
+# Type-ahead customer lookup (rims/lookup.py) on a rims.datagen database with
+# --customers customers: every prefix of a few real names, phone numbers and
+# emails, as typed one key at a time, plus substring and no-match terms.
+# Prints p50/p99/max per kind of term and exits 1 when any p99 is over --max-ms.
+#
+# The old way to find a customer for a rental (service.customers(search),
+# a customers_fts word-prefix match over name/phone/email/address) is timed
+# on the same terms for comparison.
+#
+#   python benchmarks/bench_customer_lookup.py                       # 1M customers, cached in the temp dir
+#   python benchmarks/bench_customer_lookup.py --customers 100000 --max-ms 5
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims import datagen                        # noqa: E402
+from rims.lookup import CustomerLookup, LIMIT   # noqa: E402
+from rims.service import RentalService          # noqa: E402
+
+
+def dataset(path, customers):
+    if not os.path.exists(path):
+        t = time.perf_counter()
+        datagen.generate(path + ".part", scale=customers / datagen.SCALE["customers"], rentals=10000,
+                         customers=customers, seed=5)
+        os.replace(path + ".part", path)
+        print(f"built {path}: {customers:,d} customers in {time.perf_counter() - t:.1f}s", flush=True)
+    return path
+
+
+def terms(db, rnd, n):
+    conn = sqlite3.connect(db)
+    try:
+        top = conn.execute("SELECT MAX(customer_id) FROM customers").fetchone()[0]
+        picks = [conn.execute("SELECT customer_name, phone, email FROM customers WHERE customer_id=?",
+                              (rnd.randint(1, top),)).fetchone() for _ in range(n)]
+    finally:
+        conn.close()
+    out = {"name (typed)": [], "phone (typed)": [], "email (typed)": [], "substring": [], "no match": []}
+    for name, phone, email in picks:
+        out["name (typed)"] += [name[:i] for i in range(1, len(name) + 1)]
+        out["phone (typed)"] += [f"{phone[:5]} {phone[5:]}"[:i] for i in range(2, len(phone) + 2)]
+        out["email (typed)"] += [email[:i] for i in range(1, len(email) + 1)]
+        out["substring"] += [phone[-4:], phone[3:9], email.split("@")[0][-6:], email.split("@")[0][-5:] + "@ex",
+                             name.split()[-1][1:].lower()]
+        out["no match"] += [name[::-1], "zq" + phone[-5:] + "x", email.replace("@", "#")]
+    return out
+
+
+def timed(fn, items):
+    lat = []
+    for term in items:
+        t = time.perf_counter()
+        fn(term)
+        lat.append((time.perf_counter() - t) * 1000)
+    lat.sort()
+    return lat[len(lat) // 2], lat[min(len(lat) - 1, int(len(lat) * 0.99))], lat[-1]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--customers", type=int, default=1000000)
+    ap.add_argument("--picks", type=int, default=20, help="customers whose name/phone/email are typed")
+    ap.add_argument("--max-ms", type=float, default=10.0, help="allowed p99 per kind of term")
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "rims_bench_lookup"))
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    db = dataset(os.path.join(args.data_dir, f"customers_{args.customers}.db"), args.customers)
+    svc = RentalService(db)         # migrates: builds the lookup indexes on first use
+    lookup = CustomerLookup(svc.pool)
+    groups = terms(db, random.Random(11), args.picks)
+    for items in groups.values():   # warm the page cache
+        for term in items:
+            lookup.find(term)
+
+    print(f"{args.customers:,d} customers, limit {LIMIT}")
+    print(f"{'terms':<16s} {'n':>5s} {'p50 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}   {'old p50':>8s} {'old p99':>8s}")
+    failures = []
+    for kind, items in groups.items():
+        p50, p99, worst = timed(lookup.find, items)
+        o50, o99, _ = timed(lambda term: svc.customers(term, LIMIT), items)
+        print(f"{kind:<16s} {len(items):>5d} {p50:>8.2f} {p99:>8.2f} {worst:>8.2f}   {o50:>8.2f} {o99:>8.2f}", flush=True)
+        if p99 > args.max_ms:
+            failures.append(f"{kind}: p99 {p99:.2f} ms is over {args.max_ms:g} ms")
+    svc.close()
+    for msg in failures:
+        print("FAIL:", msg)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
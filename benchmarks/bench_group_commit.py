@@ -0,0 +1,160 @@
+# benchmarks/bench_group_commit.py
+# Bursty bookings from many concurrent clients: every client committing its
+# own BEGIN IMMEDIATE transaction on its own connection ("direct", what the
+# desktop apps do by default) against the same clients awaiting
+# rims.asyncdb.AsyncDB ("group") and threads going through the opt-in
+# write-behind queue, rims/writebehind.py ("behind"); both group-commit.
+#
+# Reports bookings/s, latency percentiles, SQLITE_BUSY failures and the
+# number of transactions and average batch size. Every run books into a
+# fresh copy of the same seeded database and the row counts are checked.
+# --durable runs every mode at synchronous=FULL (fsync per commit).
+#
+#   python benchmarks/bench_group_commit.py --clients 32 --bookings 4000
+#   python benchmarks/bench_group_commit.py --profile desk --linger-ms 0 5 --flush-ms 20
+#   python benchmarks/bench_group_commit.py --durable --clients 8
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims import close_all_managers                      # noqa: E402
+from rims.asyncdb import AsyncDB                         # noqa: E402
+from rims.service import RentalService                   # noqa: E402
+from rims.storage import get_profile                     # noqa: E402
+from rims.writebehind import WriteBehind                 # noqa: E402
+
+CODES = ("CAR452", "VAN775", "MIN334", "TRK7483")
+
+
+def requests(n, seed=1):
+    rnd = random.Random(seed)
+    return [dict(product_code=rnd.choice(CODES), start=f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                 days=rnd.randint(1, 14), payment_method="Card") for i in range(n)]
+
+
+def fresh(path, profile):
+    svc = RentalService(path, profile, write_behind=False)     # "behind" runs attach their own
+    with svc.pool.connect() as c:
+        c.execute("UPDATE products SET available_quantity = 1000000")
+    return svc
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] * 1000
+
+
+def run_threads(svc, reqs, clients):
+    # svc.write() books directly, or through svc.writes when write-behind is on
+    lat, busy = [], []
+    chunks = [reqs[i::clients] for i in range(clients)]
+
+    def worker(chunk):
+        for r in chunk:
+            t = time.perf_counter()
+            try:
+                svc.write(svc.book, r)
+            except sqlite3.OperationalError:        # database is locked (busy_timeout ran out)
+                busy.append(1)
+                continue
+            lat.append(time.perf_counter() - t)
+        svc.pool.close_thread()
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return time.perf_counter() - t, lat, len(busy)
+
+
+def run_direct(svc, reqs, clients):
+    return run_threads(svc, reqs, clients) + (None,)
+
+
+def run_behind(svc, reqs, clients, flush_ms, durable):
+    svc.writes = WriteBehind(svc.pool, flush_ms=flush_ms, max_rows=256, durable=durable)
+    try:
+        result = run_threads(svc, reqs, clients)
+    finally:
+        svc.close()
+    return result + (svc.writes.stats,)
+
+
+def run_group(svc, reqs, clients, linger_ms, durable):
+    lat, busy = [], []
+
+    async def main():
+        db = AsyncDB(svc, linger_ms=linger_ms, durable=durable)
+
+        async def client(chunk):
+            for r in chunk:
+                t = time.perf_counter()
+                try:
+                    await db.book(r)
+                except sqlite3.OperationalError:
+                    busy.append(1)
+                    continue
+                lat.append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        await asyncio.gather(*(client(reqs[i::clients]) for i in range(clients)))
+        elapsed = time.perf_counter() - t
+        await db.close()
+        return elapsed, db.stats
+
+    elapsed, stats = asyncio.run(main())
+    return elapsed, lat, len(busy), stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--bookings", type=int, default=4000)
+    ap.add_argument("--profile", default="desk", help="storage profile (synchronous level etc.)")
+    ap.add_argument("--linger-ms", type=float, nargs="*", default=[0.0, 2.0], help="AsyncDB runs")
+    ap.add_argument("--flush-ms", type=float, nargs="*", default=[20.0], help="write-behind runs")
+    ap.add_argument("--durable", action="store_true", help="synchronous=FULL in every mode")
+    args = ap.parse_args(argv)
+
+    reqs = requests(args.bookings)
+    profile = get_profile(args.profile, synchronous="FULL") if args.durable else args.profile
+    runs = ([("direct", None)] + [("group", linger) for linger in args.linger_ms]
+            + [("behind", flush) for flush in args.flush_ms])
+    print(f"{args.bookings:,d} bookings from {args.clients} clients, profile {args.profile}"
+          f"{', synchronous=FULL' if args.durable else ''}")
+    print(f"{'mode':>14s} {'bookings/s':>11s} {'p50 ms':>8s} {'p99 ms':>8s} {'busy':>6s} {'txns':>7s} {'avg batch':>10s}  check")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, linger in runs:
+            path = os.path.join(tmp, f"{mode}_{linger}.db")
+            svc = fresh(path, profile)
+            if mode == "direct":
+                elapsed, lat, busy, stats = run_direct(svc, reqs, args.clients)
+            elif mode == "group":
+                elapsed, lat, busy, stats = run_group(svc, reqs, args.clients, linger, args.durable)
+            else:
+                elapsed, lat, busy, stats = run_behind(svc, reqs, args.clients, linger, args.durable)
+            with svc.pool.connect() as c:
+                rows = c.execute("SELECT COUNT(*) FROM rentals").fetchone()[0]
+                held = c.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+            ok = rows == held == len(lat)
+            txns = stats["batches"] if stats else len(lat)
+            label = mode if linger is None else f"{mode} {linger:g}ms"
+            print(f"{label:>14s} {len(lat) / elapsed:>11,.0f} {pct(lat, 50):>8.2f} {pct(lat, 99):>8.2f} "
+                  f"{busy:>6,d} {txns:>7,d} {len(lat) / max(txns, 1):>10.1f}  {'OK' if ok else 'MISMATCH'}", flush=True)
+            close_all_managers()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
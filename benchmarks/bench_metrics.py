@@ -0,0 +1,78 @@
+# benchmarks/bench_metrics.py
+# What query instrumentation (rims/metrics.py) costs: the bench_suite hot paths
+# with $RIMS_METRICS unset and set, alternated over --rounds so drift in the
+# machine hits both sides alike. Each side of each round is a fresh child
+# process (see bench_suite.py); an operation's figure is the median over
+# rounds of its per-child p50.
+#
+# The headline number is the overhead on the whole mix (sum of the medians),
+# which must stay under --max-overhead or the run exits 1. Per-operation
+# figures are printed too; on sub-millisecond operations a few microseconds of
+# noise reads as several percent, so they are informational.
+#
+#   python benchmarks/bench_metrics.py                       # 100k rentals, all suite ops but the PDF export
+#   python benchmarks/bench_metrics.py --size 1m --rounds 5 --ops v11.rentals v11.analytics
+#   python benchmarks/bench_metrics.py --setting "slow_ms=1"  # cost with EXPLAIN capture on every slow statement
+
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_suite     # noqa: E402
+
+OPS = tuple(op for op in bench_suite.OPS if op != "v11.export_pdf")
+
+
+def run(db, op, runs, budget, setting):
+    saved = os.environ.pop("RIMS_METRICS", None)
+    if setting is not None:
+        os.environ["RIMS_METRICS"] = setting
+    try:
+        return bench_suite.measure(db, op, runs, budget)["p50_ms"]
+    finally:
+        os.environ.pop("RIMS_METRICS", None)
+        if saved is not None:
+            os.environ["RIMS_METRICS"] = saved
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", default="100k", help="rental count: 10k 100k 1m 10m or a number")
+    ap.add_argument("--ops", nargs="+", default=list(OPS), choices=bench_suite.OPS, metavar="OP")
+    ap.add_argument("--rounds", type=int, default=3, help="off/on child pairs per operation")
+    ap.add_argument("--runs", type=int, default=20, help="timed runs per child")
+    ap.add_argument("--budget", type=float, default=10.0, help="stop a child's runs after this many seconds")
+    ap.add_argument("--setting", default="slow_ms=100", help="$RIMS_METRICS for the instrumented side")
+    ap.add_argument("--max-overhead", type=float, default=0.02, help="allowed slowdown of the mix (0.02 = 2%%)")
+    ap.add_argument("--data-dir", default=bench_suite.DATA_DIR)
+    args = ap.parse_args(argv)
+
+    n = bench_suite.size_arg(args.size)
+    db = bench_suite.dataset(args.data_dir, n)
+    print(f"{bench_suite.size_name(n)} rentals, RIMS_METRICS={args.setting!r}, median p50 of {args.rounds} rounds")
+    print(f"{'operation':<26s} {'off ms':>10s} {'on ms':>10s} {'overhead':>9s}")
+    off_total = on_total = 0.0
+    for op in args.ops:
+        off, on = [], []
+        for i in range(args.rounds):
+            # alternate which side goes first
+            for setting in ((None, args.setting) if i % 2 == 0 else (args.setting, None)):
+                (off if setting is None else on).append(run(db, op, args.runs, args.budget, setting))
+        off_ms, on_ms = statistics.median(off), statistics.median(on)
+        off_total += off_ms
+        on_total += on_ms
+        print(f"{op:<26s} {off_ms:>10.3f} {on_ms:>10.3f} {on_ms / off_ms - 1:>+9.1%}", flush=True)
+
+    overhead = on_total / off_total - 1
+    print(f"{'mix':<26s} {off_total:>10.3f} {on_total:>10.3f} {overhead:>+9.1%}")
+    if overhead > args.max_overhead:
+        print(f"FAIL: instrumentation overhead {overhead:.1%} is over {args.max_overhead:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+# benchmarks/bench_pdf_export.py
+# Throughput and peak memory of the streaming rental-history PDF export.
+#
+# Each measurement runs in a fresh child process so ru_maxrss (peak RSS) is
+# that of the export alone. "fetchall" loads the same rows the old way, for
+# comparison; "reportlab" is skipped when ReportLab is not installed.
+#
+#   python benchmarks/bench_pdf_export.py --rows 200000 1000000
+
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rims import schema, report     # noqa: E402
+
+SQL = ("SELECT receipt_ref, product_type, no_days, total, created_date "
+       "FROM rentals ORDER BY created_date DESC")
+
+
+def build(path, rows, seed=1):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute(schema.CREATE_RENTALS)
+    conn.execute("CREATE INDEX idx_rentals_created ON rentals(created_date, rental_id)")
+    types = ("Car", "Van", "Minibus", "Truck")
+    conn.executemany("INSERT INTO rentals(receipt_ref, product_type, no_days, total, created_date) "
+                     "VALUES(?,?,?,?,datetime('2020-01-01', ?))",
+                     ((f"BILL-{i:06d}", rnd.choice(types), rnd.choice(("1-3", "4-7", "8-14")),
+                       round(rnd.uniform(10, 900), 2), f"+{i} minutes") for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def check_pdf(path):
+    """Every xref entry must point at its 'n 0 obj' header."""
+    data = open(path, "rb").read()
+    start = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    m = re.match(rb"xref\n0 (\d+)\n", data[start:])
+    entries = data[start + m.end():].split(b"\n")[1:int(m.group(1))]
+    for n, line in enumerate(entries, 1):
+        off = int(line[:10])
+        if not data.startswith(b"%d 0 obj" % n, off):
+            raise AssertionError(f"bad xref entry for object {n}")
+    return len(entries)
+
+
+def child(db, mode, out):
+    conn = sqlite3.connect(db)
+    t = time.perf_counter()
+    if mode == "idle":
+        n = pages = 0
+    elif mode == "fetchall":
+        rows = conn.execute(SQL).fetchall()
+        n, pages = len(rows), 0
+    else:
+        n, pages = report.export(conn, out, SQL, layout=report.history_layout_v10(),
+                                 count_sql="SELECT COUNT(*) FROM rentals", writer=mode)
+    secs = time.perf_counter() - t
+    print(json.dumps(dict(rows=n, pages=pages, secs=secs,
+                          maxrss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)))
+
+
+def measure(db, mode, out):
+    r = subprocess.run([sys.executable, __file__, "--child", db, mode, out],
+                       capture_output=True, text=True)
+    if r.returncode:
+        return None, r.stderr.strip().splitlines()[-1]
+    return json.loads(r.stdout), None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    ap.add_argument("--child", nargs=3, metavar=("DB", "MODE", "OUT"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        return child(*args.child)
+
+    # interpreter + sqlite baseline, to read the RSS numbers against
+    base, _ = measure(":memory:", "idle", "")
+    print(f"idle child process: {base['maxrss_mb']:.1f} MB peak RSS")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            db = os.path.join(tmp, f"r{n}.db")
+            build(db, n)
+            print(f"\n{n:,d} rentals")
+            for mode in ("stream", "reportlab", "fetchall"):
+                out = os.path.join(tmp, f"{mode}.pdf")
+                res, err = measure(db, mode, out)
+                if res is None:
+                    print(f"  {mode:<9}  skipped ({err})")
+                    continue
+                line = (f"  {mode:<9}  {res['rows'] / res['secs']:>10,.0f} rows/s  "
+                        f"{res['secs']:6.2f}s  peak RSS {res['maxrss_mb']:7.1f} MB")
+                if mode != "fetchall":
+                    line += f"  {res['pages']:,d} pages, {os.path.getsize(out) / 2**20:.1f} MB file"
+                    if mode == "stream":
+                        check_pdf(out)
+                print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+# benchmarks/bench_pricing.py
+# rims.pricing: time PricingEngine.quote_many on N random quotes, on the pure
+# Python path and (when NumPy is installed) the NumPy path, and check that both
+# give the same pence. Both paths are forced at every size; the engine's own
+# default switches to NumPy at pricing.NUMPY_MIN quotes.
+#
+#   python benchmarks/bench_pricing.py --quotes 1000 10000 100000
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims import pricing        # noqa: E402
+
+
+def make(n, seed=5):
+    rnd = random.Random(seed)
+    day0 = datetime.date(2025, 1, 1)
+    rates = [rnd.choice((1200, 1500, 1900)) + rnd.randint(0, 99) for _ in range(n)]
+    starts = [day0 + datetime.timedelta(days=rnd.randint(0, 364)) for _ in range(n)]
+    ends = [s + datetime.timedelta(days=rnd.randint(1, 365)) for s in starts]
+    discounts = [rnd.choice((None, 0, 5, 10, "15%", 7.5)) for _ in range(n)]
+    return rates, [s.isoformat() for s in starts], [e.isoformat() for e in ends], discounts
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t)
+    return min(times) * 1000, out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--quotes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = ap.parse_args(argv)
+
+    engines = [("python", pricing.PricingEngine(tiers=pricing.DISCOUNT_TIERS, use_numpy=False))]
+    if pricing.numpy_available():
+        engines.append(("numpy", pricing.PricingEngine(tiers=pricing.DISCOUNT_TIERS, use_numpy=True)))
+    else:
+        print("numpy not installed: python path only")
+    print(f"{'quotes':>10s} " + " ".join(f"{name + ' ms':>12s}" for name, _ in engines) + "  check")
+    for n in args.quotes:
+        data = make(n)
+        results = [best_of(lambda e=e: e.quote_many(*data)) for _, e in engines]
+        totals = [list(map(int, out["total"])) for _, out in results]
+        ok = all(t == totals[0] for t in totals)
+        print(f"{n:>10,d} " + " ".join(f"{ms:>12.1f}" for ms, _ in results) + f"  {'OK' if ok else 'MISMATCH'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
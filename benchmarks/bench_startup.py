@@ -0,0 +1,117 @@
+# benchmarks/bench_startup.py
+# Cold-start import cost of a UI script, measured with `python -X importtime`
+# in fresh interpreters. Prints the median time to import the script (without
+# creating a window) and its slowest top-level imports, and exits 1 when:
+#   - a deferred stack (matplotlib, pandas, tkcalendar, reportlab, numpy) was loaded
+#     at startup, or
+#   - the median exceeds --max-ms, or the saved baseline by more than
+#     --tolerance (and --slack-ms, so timer noise on tiny numbers does not fail).
+#
+#   python benchmarks/bench_startup.py --save         # record this machine's baseline
+#   python benchmarks/bench_startup.py                # check against it (CI / before a release)
+#   python benchmarks/bench_startup.py --app V1.1.py --runs 9
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "startup_baseline.json")
+DEFERRED = ("matplotlib", "pandas", "tkcalendar", "reportlab", "numpy")
+MARKER = "--- app imports ---"
+
+CHILD = """
+import importlib.util, sys, time
+sys.path.insert(0, {root!r})
+print({marker!r}, file=sys.stderr, flush=True)
+t = time.perf_counter()
+spec = importlib.util.spec_from_file_location("rims_startup_probe", {path!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print((time.perf_counter() - t) * 1000)
+"""
+
+
+def parse_importtime(stderr):
+    """-X importtime lines -> {top-level module: cumulative us} and the set of all modules."""
+    top, seen = {}, set()
+    # only what the app imports, not the interpreter start-up or the probe itself
+    stderr = stderr.split(MARKER, 1)[-1]
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        name = name[1:]
+        module = name.strip()
+        seen.add(module)
+        if not name.startswith(" "):
+            top[module] = top.get(module, 0) + int(cumulative)
+    return top, seen
+
+
+def run_once(path):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD.format(root=ROOT, path=path, marker=MARKER)],
+                          capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode:
+        raise SystemExit(f"importing {path} failed:\n{proc.stderr[-2000:]}")
+    top, seen = parse_importtime(proc.stderr)
+    return float(proc.stdout.strip().splitlines()[-1]), top, seen
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app", default="V1.0.py")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save", action="store_true", help="write the measured median as the baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs. baseline (0.25 = 25%%)")
+    ap.add_argument("--slack-ms", type=float, default=15.0)
+    ap.add_argument("--max-ms", type=float, default=None, help="absolute budget for the median")
+    args = ap.parse_args(argv)
+
+    path = os.path.join(ROOT, args.app)
+    times, tops, loaded = [], [], set()
+    for _ in range(args.runs):
+        ms, top, seen = run_once(path)
+        times.append(ms)
+        tops.append(top)
+        loaded |= seen
+    median = statistics.median(times)
+
+    print(f"{args.app}: import median {median:.1f} ms (min {min(times):.1f}, max {max(times):.1f}, {args.runs} runs)")
+    last = tops[-1]
+    for name in sorted(last, key=last.get, reverse=True)[:args.top]:
+        print(f"  {last[name] / 1000:8.1f} ms  {name}")
+
+    failures = []
+    early = sorted(m for m in loaded if m.split(".")[0] in DEFERRED)
+    if early:
+        failures.append(f"deferred modules imported at startup: {', '.join(early[:8])}")
+    if args.max_ms is not None and median > args.max_ms:
+        failures.append(f"median {median:.1f} ms over the {args.max_ms:.1f} ms budget")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"app": args.app, "median_ms": round(median, 2), "python": sys.version.split()[0]}, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            base = json.load(f)
+        if base.get("app") == args.app:
+            limit = max(base["median_ms"] * (1 + args.tolerance), base["median_ms"] + args.slack_ms)
+            print(f"baseline {base['median_ms']:.1f} ms -> limit {limit:.1f} ms")
+            if median > limit:
+                failures.append(f"median {median:.1f} ms regressed past {limit:.1f} ms")
+    else:
+        print("no baseline yet (run with --save to record one)")
+
+    for msg in failures:
+        print("FAIL:", msg)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
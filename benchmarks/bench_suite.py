@@ -0,0 +1,283 @@
+# benchmarks/bench_suite.py
+# Latency and memory of every database hot path the two apps hit, on
+# rims.datagen databases of 10k / 100k / 1M / 10M rentals:
+#   V1.1 DB: rentals(), rentals(search) (a broad term and a receipt ref),
+#            analytics(), customers(), add_rental(), export_rentals_pdf()
+#   V1.0 DatabaseManager: the show_* chart queries (product_distribution,
+#            monthly_revenue, customer_stats)
+#
+# Each operation runs in a fresh child process: one run under tracemalloc
+# (peak Python allocation, also the warm-up), then up to --runs timed runs
+# within --budget seconds, reported as p50/p90/p99/max; the child's peak RSS
+# is reported too. Writes run on a scratch copy, so the cached databases in
+# --data-dir stay as built (delete them, or --rebuild, to regenerate).
+#
+# Results go to --out as JSON. With a baseline saved (--save), the run exits 1
+# when an operation's --metric latency or its allocation peak grows past
+# --tolerance (and --slack-ms / --slack-mb, so noise on tiny numbers does not
+# fail). $RIMS_PROFILE and $RIMS_WRITE_BEHIND apply as in the apps and are
+# recorded with the results.
+#
+#   python benchmarks/bench_suite.py --save                    # 10k + 100k, record the baseline
+#   python benchmarks/bench_suite.py                           # check against it
+#   python benchmarks/bench_suite.py --sizes 1m 10m --runs 5 --ops v11.rentals v11.export_pdf
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rims import datagen     # noqa: E402
+
+BASELINE = os.path.join(ROOT, "benchmarks", "suite_baseline.json")
+RESULTS = os.path.join(ROOT, "benchmarks", "suite_results.json")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "rims_bench_suite")
+DATA_VERSION = 2            # bump when build() changes, so cached databases are rebuilt
+SIZES = dict(zip(("10k", "100k", "1m", "10m"), (10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)))
+TYPES = {"CAR452": "Car", "VAN775": "Van", "MIN334": "Minibus", "TRK7483": "Truck"}
+OPS = ("v11.rentals", "v11.rentals_search", "v11.rentals_ref", "v11.analytics", "v11.customers",
+       "v11.add_rental", "v11.export_pdf",
+       "v10.product_distribution", "v10.monthly_revenue", "v10.customer_stats")
+WRITES = ("v11.add_rental",)
+
+
+def size_arg(text):
+    text = text.lower()
+    if text in SIZES:
+        return SIZES[text]
+    return int(float(text[:-1]) * {"k": 10 ** 3, "m": 10 ** 6}[text[-1]]) if text[-1] in "km" else int(text)
+
+
+def size_name(n):
+    return next((k for k, v in SIZES.items() if v == n), str(n))
+
+
+def pct(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+# ---------- data ----------
+def build(path, rentals, seed=1):
+    """A migrated database with ``rentals`` rentals from rims.datagen (V1.1 values)."""
+    part = path + ".part"
+    for p in (part, part + "-wal", part + "-shm"):
+        if os.path.exists(p):
+            os.remove(p)
+    res = datagen.generate(part, scale=rentals / datagen.SCALE["rentals"], rentals=rentals, seed=seed)
+    conn = sqlite3.connect(part)
+    try:
+        # enough units that add_rental always books rather than hitting OverbookedError
+        conn.execute("UPDATE products SET available_quantity = 1000000")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    os.replace(part, path)
+    return res["customers"]
+
+
+def dataset(data_dir, rentals, rebuild=False):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"rentals_{size_name(rentals)}_v{DATA_VERSION}.db")
+    if rebuild or not os.path.exists(path):
+        t = time.perf_counter()
+        customers = build(path, rentals)
+        print(f"built {path}: {rentals:,d} rentals, {customers:,d} customers in {time.perf_counter() - t:.1f}s",
+              flush=True)
+    return path
+
+
+# ---------- child: one operation ----------
+def peak_rss_mb():
+    # VmHWM starts over at exec; ru_maxrss on Linux carries the forking parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_app(script):
+    spec = importlib.util.spec_from_file_location(f"rims_bench_{script[:4].replace('.', '_')}",
+                                                  os.path.join(ROOT, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def operation(op, db, out):
+    """``op`` as a zero-argument callable against ``db``."""
+    if op.startswith("v10."):
+        dm = load_app("V1.0.py").DatabaseManager(db)
+        return getattr(dm, op[4:])
+    app_db = load_app("V1.1.py").DB(db)
+    if op == "v11.rentals":
+        return app_db.rentals
+    if op == "v11.rentals_search":
+        return lambda: app_db.rentals("van")
+    if op == "v11.rentals_ref":
+        with app_db.conn() as c:
+            ref = c.execute("SELECT receipt_ref FROM rentals WHERE rental_id = "
+                            "(SELECT MAX(rental_id) / 2 FROM rentals)").fetchone()[0]
+        return lambda: app_db.rentals(ref)
+    if op == "v11.analytics":
+        return app_db.analytics
+    if op == "v11.customers":
+        return app_db.customers
+    if op == "v11.export_pdf":
+        return lambda: app_db.export_rentals_pdf(out)
+    if op == "v11.add_rental":
+        rnd = random.Random(7)
+
+        def add():
+            code = rnd.choice(tuple(TYPES))
+            start = datetime.date(2027, 1, 1) + datetime.timedelta(days=rnd.randint(0, 365))
+            row = dict(product_type=TYPES[code], product_code=code, no_days="4-7", cost_per_day=12.0,
+                       discount="5%", payment_method="Cash", tax=7.2, subtotal=48.0, total=55.2)
+            app_db.add_rental(tuple(row.get(k, "") for k in app_db.RENTAL_COLUMNS),
+                              start, start + datetime.timedelta(days=5))
+        return add
+    raise SystemExit(f"unknown operation {op!r}")
+
+
+def child(db, op, runs, budget):
+    out = os.path.join(tempfile.gettempdir(), f"rims_bench_{os.getpid()}.pdf")
+    fn = operation(op, db, out)
+    try:
+        tracemalloc.start()
+        fn()                            # also warms the page cache and the statement cache
+        alloc_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        times = []
+        spent = 0.0
+        while len(times) < runs and (not times or spent < budget):
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+            spent += times[-1]
+    finally:
+        if os.path.exists(out):
+            os.remove(out)
+    print(json.dumps(dict(times=times, alloc_peak_mb=alloc_peak / 2 ** 20,
+                          peak_rss_mb=peak_rss_mb())))
+
+
+def measure(db, op, runs, budget):
+    work = db
+    if op in WRITES:
+        work = db + ".scratch"
+        shutil.copyfile(db, work)
+    try:
+        r = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", work, op,
+                            "--runs", str(runs), "--budget", str(budget)], capture_output=True, text=True, cwd=ROOT)
+    finally:
+        if work != db:
+            for p in (work, work + "-wal", work + "-shm"):
+                if os.path.exists(p):
+                    os.remove(p)
+    if r.returncode:
+        raise SystemExit(f"{op} failed:\n{r.stderr[-2000:]}")
+    res = json.loads(r.stdout.strip().splitlines()[-1])
+    lat = sorted(t * 1000 for t in res.pop("times"))
+    return dict(runs=len(lat), p50_ms=pct(lat, 50), p90_ms=pct(lat, 90), p99_ms=pct(lat, 99), max_ms=lat[-1],
+                mean_ms=sum(lat) / len(lat), **res)
+
+
+# ---------- baseline ----------
+def compare(results, base, args):
+    failures = []
+    metric = f"{args.metric}_ms"
+    for size, ops in results.items():
+        for op, r in ops.items():
+            b = base.get("results", {}).get(size, {}).get(op)
+            if b is None:
+                continue
+            limit = max(b[metric] * (1 + args.tolerance), b[metric] + args.slack_ms)
+            if r[metric] > limit:
+                failures.append(f"{size} {op}: {args.metric} {r[metric]:.2f} ms regressed past {limit:.2f} ms "
+                                f"(baseline {b[metric]:.2f})")
+            limit = max(b["alloc_peak_mb"] * (1 + args.tolerance), b["alloc_peak_mb"] + args.slack_mb)
+            if r["alloc_peak_mb"] > limit:
+                failures.append(f"{size} {op}: allocation peak {r['alloc_peak_mb']:.1f} MB grew past "
+                                f"{limit:.1f} MB (baseline {b['alloc_peak_mb']:.1f})")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", nargs="+", default=["10k", "100k"], help="rental counts: 10k 100k 1m 10m or a number")
+    ap.add_argument("--ops", nargs="+", default=list(OPS), choices=OPS, metavar="OP")
+    ap.add_argument("--runs", type=int, default=20, help="timed runs per operation")
+    ap.add_argument("--budget", type=float, default=30.0, help="stop an operation's runs after this many seconds")
+    ap.add_argument("--data-dir", default=DATA_DIR, help="where the generated databases are cached")
+    ap.add_argument("--rebuild", action="store_true", help="regenerate the databases")
+    ap.add_argument("--out", default=RESULTS)
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save", action="store_true", help="write these results as the baseline")
+    ap.add_argument("--metric", default="p50", choices=("p50", "p90", "p99"), help="latency compared with the baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / growth (0.25 = 25%%)")
+    ap.add_argument("--slack-ms", type=float, default=2.0)
+    ap.add_argument("--slack-mb", type=float, default=2.0)
+    ap.add_argument("--child", nargs=2, metavar=("DB", "OP"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        return child(args.child[0], args.child[1], args.runs, args.budget)
+
+    env = {k: os.environ.get(k) for k in ("RIMS_PROFILE", "RIMS_WRITE_BEHIND")}
+    results = {}
+    print(f"{'size':>6s} {'operation':<26s} {'runs':>5s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} "
+          f"{'max ms':>9s} {'alloc MB':>9s} {'RSS MB':>8s}")
+    for text in args.sizes:
+        n = size_arg(text)
+        db = dataset(args.data_dir, n, args.rebuild)
+        ops = results[size_name(n)] = {}
+        for op in args.ops:
+            r = ops[op] = measure(db, op, args.runs, args.budget)
+            print(f"{size_name(n):>6s} {op:<26s} {r['runs']:>5d} {r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} "
+                  f"{r['p99_ms']:>9.2f} {r['max_ms']:>9.2f} {r['alloc_peak_mb']:>9.1f} {r['peak_rss_mb']:>8.1f}",
+                  flush=True)
+
+    doc = dict(created=datetime.datetime.now().isoformat(timespec="seconds"), python=sys.version.split()[0],
+               sqlite=sqlite3.sqlite_version, machine=platform.machine(), env=env, results=results)
+    with open(args.out, "w") as f:
+        json.dump(doc, f, indent=2)
+    print(f"results written to {args.out}")
+
+    failures = []
+    if args.save:
+        shutil.copyfile(args.out, args.baseline)
+        print(f"baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            base = json.load(f)
+        if base.get("env") != env:
+            print(f"note: baseline was recorded with {base.get('env')}, this run with {env}")
+        failures = compare(results, base, args)
+        print(f"compared with {args.baseline} ({args.metric}, tolerance {args.tolerance:.0%})")
+    else:
+        print("no baseline yet (run with --save to record one)")
+
+    for msg in failures:
+        print("FAIL:", msg)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
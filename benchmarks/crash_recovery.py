@@ -0,0 +1,139 @@
+# benchmarks/crash_recovery.py
+# Crash-recovery check for write-behind saves (rims/writebehind.py): no
+# acknowledged rental may be lost.
+#
+# A child process saves rentals from several threads through
+# RentalService.write() with write-behind on, printing each receipt ref the
+# moment its ack comes back. The parent SIGKILLs it at a random point - often
+# mid-batch or mid-COMMIT - then reopens the database and checks that
+#   * PRAGMA integrity_check is "ok",
+#   * every acknowledged receipt ref is in rentals,
+#   * every rental has its reservation and the receipt counter matches the
+#     rental count (whole batches committed or vanished, nothing half-done).
+# Every round reuses the same database, so each one also recovers the WAL
+# the previous kill left behind. Exits 1 on any loss.
+#
+# kill -9 covers a crashed or killed app; a power cut cannot be staged here,
+# that is what durable=True (synchronous=FULL on the writer) is for.
+#
+#   python benchmarks/crash_recovery.py --rounds 20 --threads 8
+#   python benchmarks/crash_recovery.py --flush-ms 50 --max-rows 500 --max-seconds 3
+
+import argparse
+import datetime
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rims.service import RentalService      # noqa: E402
+from rims.writebehind import FLUSH_MS, MAX_ROWS     # noqa: E402
+
+CODES = ("CAR452", "VAN775", "MIN334", "TRK7483")
+
+
+# ---------- child: save until killed ----------
+def child(args):
+    svc = RentalService(args.child, write_behind=dict(flush_ms=args.flush_ms, max_rows=args.max_rows,
+                                                      durable=not args.no_durable))
+    out = threading.Lock()
+
+    def saver(n):
+        rnd = random.Random(os.getpid() * 100 + n)
+        while True:
+            start = datetime.date(2026, 1, 1) + datetime.timedelta(days=rnd.randint(0, 700))
+            days = rnd.randint(1, 14)
+            row = dict(product_code=rnd.choice(CODES), no_days=str(days), payment_method="Card",
+                       total=round(rnd.uniform(10, 500), 2))
+            ref = svc.write(svc.insert_rental, row, start, start + datetime.timedelta(days=days))[1]
+            with out:
+                sys.stdout.write(ref + "\n")
+                sys.stdout.flush()
+
+    for n in range(args.threads):
+        threading.Thread(target=saver, args=(n,), daemon=True).start()
+    threading.Event().wait()
+
+
+# ---------- parent: kill, reopen, check ----------
+def run_round(args, db, rnd):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", db, "--threads", str(args.threads),
+           "--flush-ms", str(args.flush_ms), "--max-rows", str(args.max_rows)]
+    if args.no_durable:
+        cmd.append("--no-durable")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    lines = []
+    reader = threading.Thread(target=lambda: lines.extend(proc.stdout))
+    reader.start()
+    time.sleep(rnd.uniform(args.min_seconds, args.max_seconds))
+    proc.send_signal(signal.SIGKILL)
+    proc.wait()
+    reader.join()
+    acked = {line.strip() for line in lines if line.endswith("\n")}
+
+    conn = sqlite3.connect(db)          # the first connection replays / discards the WAL
+    try:
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        have = {r for (r,) in conn.execute("SELECT receipt_ref FROM rentals")}
+        unbooked = conn.execute("SELECT COUNT(*) FROM rentals r WHERE NOT EXISTS "
+                                "(SELECT 1 FROM reservations v WHERE v.rental_id = r.rental_id)").fetchone()[0]
+        counter = conn.execute("SELECT value FROM sequences WHERE name='receipt'").fetchone()
+    finally:
+        conn.close()
+    lost = acked - have
+    counter = counter[0] if counter else 0
+    ok = integrity == "ok" and not lost and not unbooked and counter == len(have)
+    return dict(acked=len(acked), rows=len(have), lost=sorted(lost), unbooked=unbooked,
+                counter=counter, integrity=integrity, ok=ok)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=10)
+    ap.add_argument("--threads", type=int, default=8, help="saving threads in the child")
+    ap.add_argument("--flush-ms", type=float, default=FLUSH_MS)
+    ap.add_argument("--max-rows", type=int, default=MAX_ROWS)
+    ap.add_argument("--no-durable", action="store_true", help="leave the profile's synchronous level")
+    ap.add_argument("--min-seconds", type=float, default=0.5, help="earliest kill after start")
+    ap.add_argument("--max-seconds", type=float, default=2.0, help="latest kill after start")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--db", help="database to use (default: a scratch copy)")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        return child(args)
+
+    rnd = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = args.db or os.path.join(tmp, "crash.db")
+        svc = RentalService(db, write_behind=False)
+        with svc.pool.connect() as c:
+            # plenty of units, so every save is a real insert rather than OverbookedError
+            c.execute("UPDATE products SET available_quantity = 1000000")
+        svc.pool.close_all()
+
+        print(f"{args.rounds} kill -9 rounds, {args.threads} threads, flush every {args.flush_ms:g} ms "
+              f"or {args.max_rows} rows, {'not ' if args.no_durable else ''}durable")
+        print(f"{'round':>5s} {'acked':>7s} {'rows':>7s} {'lost':>5s} {'unbooked':>9s} {'counter':>8s}  integrity")
+        failures = 0
+        for i in range(1, args.rounds + 1):
+            r = run_round(args, db, rnd)
+            failures += not r["ok"]
+            print(f"{i:>5d} {r['acked']:>7,d} {r['rows']:>7,d} {len(r['lost']):>5d} {r['unbooked']:>9d} "
+                  f"{r['counter']:>8,d}  {r['integrity']}{'' if r['ok'] else '  FAIL'}", flush=True)
+            if r["lost"]:
+                print(f"      lost: {', '.join(r['lost'][:10])}")
+    print("OK: no acknowledged rental lost" if not failures else f"FAIL: {failures} round(s) lost or broke data")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,9 @@
+# rims - shared data layer for the Advanced Rental Inventory Management System.
+# Imported by both V1.0.py and V1.1.py.
+#
+# Submodules with a command line (``python -m rims.<name>``) are not imported
+# here; use ``from rims import storage`` etc.
+
+from .pool import ConnectionManager, get_manager, close_all_managers
+
+__all__ = ["ConnectionManager", "get_manager", "close_all_managers"]
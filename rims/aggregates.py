@@ -0,0 +1,153 @@
+# rims/aggregates.py
+# Materialized analytics totals, kept current by triggers on `rentals`.
+#
+#   rentals_daily       day            -> rentals, revenue
+#   rentals_by_type     product_type   -> rentals, revenue
+#   rentals_by_payment  payment_method -> rentals, revenue
+#
+# Every insert/update/delete on rentals adjusts one row per table, so the
+# dashboards read a few dozen summary rows instead of GROUP BY-ing the whole
+# rentals table. NULL keys are stored as '' (primary keys must compare equal).
+#
+#   python -m rims.aggregates check rental_inventory.db
+#   python -m rims.aggregates rebuild rental_inventory.db
+
+import argparse
+import sqlite3
+
+# (table, key column, key expression over a rentals row aliased as X)
+TABLES = (
+    ("rentals_daily", "day", "COALESCE(date(X.created_date), '')"),
+    ("rentals_by_type", "product_type", "COALESCE(X.product_type, '')"),
+    ("rentals_by_payment", "payment_method", "COALESCE(X.payment_method, '')"),
+)
+TRIGGER_PREFIX = "rentals_agg_"
+WATCHED_COLUMNS = ("total", "created_date", "product_type", "payment_method")
+
+
+def _add_sql(table, key, expr, row):
+    k = expr.replace("X.", row + ".")
+    return (f"INSERT INTO {table}({key}, rentals, revenue) VALUES({k}, 1, COALESCE({row}.total, 0)) "
+            f"ON CONFLICT({key}) DO UPDATE SET rentals = rentals + 1, revenue = revenue + excluded.revenue;")
+
+
+def _sub_sql(table, key, expr, row):
+    k = expr.replace("X.", row + ".")
+    return (f"UPDATE {table} SET rentals = rentals - 1, revenue = revenue - COALESCE({row}.total, 0) "
+            f"WHERE {key} = {k}; DELETE FROM {table} WHERE {key} = {k} AND rentals <= 0;")
+
+
+def _trigger_sql():
+    add = " ".join(_add_sql(t, k, e, "NEW") for t, k, e in TABLES)
+    sub = " ".join(_sub_sql(t, k, e, "OLD") for t, k, e in TABLES)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}ai AFTER INSERT ON rentals BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}ad AFTER DELETE ON rentals BEGIN {sub} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}au AFTER UPDATE OF {', '.join(WATCHED_COLUMNS)} "
+        f"ON rentals BEGIN {sub} {add} END",
+    ]
+
+
+def install(conn):
+    """Create the summary tables + triggers and fill them from existing rentals."""
+    for table, key, _ in TABLES:
+        conn.execute(f"""CREATE TABLE IF NOT EXISTS {table}(
+            {key} TEXT PRIMARY KEY,
+            rentals INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID""")
+    for sql in _trigger_sql():
+        conn.execute(sql)
+    rebuild(conn)
+
+
+def rebuild(conn):
+    """Recompute every summary table from rentals (one scan each)."""
+    for table, key, expr in TABLES:
+        k = expr.replace("X.", "")
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table}({key}, rentals, revenue) "
+                     f"SELECT {k}, COUNT(*), COALESCE(SUM(total), 0) FROM rentals GROUP BY 1")
+
+
+def add_since(conn, rental_id):
+    """Fold the rentals with rental_id > ``rental_id`` into the summaries (after
+    a bulk load that ran with the triggers dropped)."""
+    for table, key, expr in TABLES:
+        k = expr.replace("X.", "")
+        conn.execute(f"INSERT INTO {table}({key}, rentals, revenue) "
+                     f"SELECT {k}, COUNT(*), COALESCE(SUM(total), 0) FROM rentals WHERE rental_id > ? GROUP BY 1 "
+                     f"ON CONFLICT({key}) DO UPDATE SET rentals = rentals + excluded.rentals, "
+                     f"revenue = revenue + excluded.revenue", (rental_id,))
+
+
+def check(conn, tolerance=0.005):
+    """Compare the summaries with a fresh GROUP BY; returns a list of mismatches."""
+    problems = []
+    for table, key, expr in TABLES:
+        k = expr.replace("X.", "")
+        fresh = {r[0]: (r[1], r[2]) for r in conn.execute(
+            f"SELECT {k}, COUNT(*), COALESCE(SUM(total), 0) FROM rentals GROUP BY 1")}
+        stored = {r[0]: (r[1], r[2]) for r in conn.execute(f"SELECT {key}, rentals, revenue FROM {table}")}
+        for name in fresh.keys() | stored.keys():
+            a, b = fresh.get(name, (0, 0.0)), stored.get(name, (0, 0.0))
+            if a[0] != b[0] or abs(a[1] - b[1]) > tolerance:
+                problems.append((table, name, a, b))
+    return problems
+
+
+# ---------- readers (cost ~ number of summary rows) ----------
+def by_type(conn):
+    """(product_type, rentals, revenue) ordered by product_type."""
+    return conn.execute("SELECT NULLIF(product_type, ''), rentals, revenue "
+                        "FROM rentals_by_type ORDER BY product_type").fetchall()
+
+
+def daily(conn, days=30):
+    """(day, rentals, revenue) for the last ``days`` days, oldest first."""
+    return conn.execute("SELECT day, rentals, revenue FROM rentals_daily "
+                        "WHERE day >= date('now', ?) ORDER BY day", (f"-{int(days)} day",)).fetchall()
+
+
+def monthly(conn):
+    """(YYYY-MM, revenue, rentals) ordered by month."""
+    return conn.execute("SELECT substr(day, 1, 7) AS month, SUM(revenue), SUM(rentals) "
+                        "FROM rentals_daily WHERE day <> '' GROUP BY month ORDER BY month").fetchall()
+
+
+def by_payment(conn):
+    """(payment_method, rentals, revenue), ignoring unset methods."""
+    return conn.execute("SELECT payment_method, rentals, revenue FROM rentals_by_payment "
+                        "WHERE payment_method NOT IN ('', 'Select') ORDER BY payment_method").fetchall()
+
+
+def totals(conn):
+    """(rentals, revenue, average rental value) over all rentals."""
+    n, revenue = conn.execute("SELECT COALESCE(SUM(rentals), 0), COALESCE(SUM(revenue), 0) "
+                              "FROM rentals_by_type").fetchone()
+    return n, revenue, (revenue / n if n else 0.0)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.aggregates")
+    ap.add_argument("command", choices=("check", "rebuild"))
+    ap.add_argument("db", nargs="?", default="rental_inventory.db")
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "rebuild":
+            with conn:
+                rebuild(conn)
+            print("rebuilt")
+        problems = check(conn)
+        for table, key, fresh, stored in problems:
+            print(f"  {table}[{key!r}]: rentals has {fresh}, summary has {stored}")
+        print("ok" if not problems else f"{len(problems)} mismatches (run: python -m rims.aggregates rebuild)")
+    finally:
+        conn.close()
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,263 @@
+# rims/api.py
+# Local HTTP JSON API over the headless rental service (rims/service.py), for
+# web/kiosk front-ends and scripts.
+#
+# An asyncio server parses HTTP/1.1 (keep-alive, Content-Length bodies) on the
+# event loop; SQLite - which blocks - never runs on it. Reads go to a pool of
+# read-only worker connections and every write (bookings, customer edits) to
+# the single group-committing writer of rims/asyncdb.py, so concurrent
+# bookings share a transaction instead of queueing on the write lock.
+#
+#   GET    /health                      GET    /products
+#   GET    /quote?product_code=VAN775&start=2025-01-01&days=7&discount=5
+#   POST   /quote      {"product_code": ..., "start": ..., "end" | "days": ..., "discount": ...}
+#   POST   /rentals    {"product_code": ..., "start": ..., "days": ..., "customer_id": ..., ...}
+#   GET    /rentals?q=van&limit=50&before=<next>     GET /rentals/<id>
+#   GET    /search?q=bill&kind=rentals|customers&limit=20
+#   GET    /analytics?days=30
+#   GET    /customers?q=smith&limit=100             POST /customers {"name", "phone", "email", "address"}
+#   GET    /customers/lookup?q=0771&limit=10        (type-ahead: name / phone / email prefixes, then substrings)
+#   GET|PUT|PATCH|DELETE /customers/<id>
+#   GET    /stats                       (pool + request counters)
+#   GET    /metrics                     (query timings, with RIMS_METRICS set - see rims/metrics.py)
+#
+#   python -m rims.api rental_inventory.db --port 8080 --workers 4 --linger-ms 2
+
+import argparse
+import asyncio
+import datetime
+import decimal
+import functools
+import json
+import re
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from .asyncdb import AsyncDB
+from .availability import OverbookedError
+from .service import RentalService, ServiceError
+
+MAX_BODY = 1 << 20
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(o):
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, (datetime.date, datetime.datetime)):
+        return o.isoformat()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+def _customer_fields(body):
+    return dict(name=body.get("name", body.get("customer_name")), phone=body.get("phone"),
+                email=body.get("email"), address=body.get("address"))
+
+
+class ApiServer:
+    """Routes HTTP requests to a RentalService: reads on ``workers`` threads,
+    writes through one group-committing writer (see rims/asyncdb.py)."""
+
+    def __init__(self, service, workers=4, linger_ms=0.0):
+        self.service = service
+        self.db = AsyncDB(service, readers=workers, linger_ms=linger_ms)
+        self.server = None
+        self.stats = dict(requests=0, errors=0, connections=0)
+        s = service
+        # (method, path regex, fn(params, body, *groups) -> (status, payload)), run on a worker
+        self.routes = [
+            ("GET", r"/health", lambda q, b: (200, dict(ok=True))),
+            ("GET", r"/stats", lambda q, b: (200, dict(pool=s.pool_stats(), api=dict(self.stats),
+                                                        db=dict(self.db.stats)))),
+            ("GET", r"/metrics", lambda q, b: (200, self._metrics())),
+            ("GET", r"/products", lambda q, b: (200, s.products())),
+            ("GET", r"/quote", lambda q, b: (200, self._quote(q))),
+            ("POST", r"/quote", lambda q, b: (200, self._quote(b))),
+            ("POST", r"/rentals", lambda q, b: (201, s.book(b))),
+            ("GET", r"/rentals", lambda q, b: (200, s.rentals(q.get("q"), q.get("limit", 50), q.get("before")))),
+            ("GET", r"/rentals/(\d+)", lambda q, b, rid: (200, s.rental(rid))),
+            ("GET", r"/search", lambda q, b: (200, s.search_ranked(q.get("q", ""), q.get("kind", "rentals"),
+                                                                   int(q.get("limit", 20))))),
+            ("GET", r"/analytics", lambda q, b: (200, s.analytics(int(q.get("days", 30))))),
+            ("GET", r"/customers", lambda q, b: (200, s.customers(q.get("q"), q.get("limit")))),
+            ("POST", r"/customers", lambda q, b: (201, s.customer(s.add_customer(**_customer_fields(b))))),
+            ("GET", r"/customers/lookup", lambda q, b: (200, s.find_customers(q.get("q", ""), int(q.get("limit", 10))))),
+            ("GET", r"/customers/(\d+)", lambda q, b, cid: (200, s.customer(cid))),
+            ("PUT", r"/customers/(\d+)", lambda q, b, cid: (200, s.update_customer(cid, **_customer_fields(b)))),
+            ("PATCH", r"/customers/(\d+)", lambda q, b, cid: (200, s.update_customer(cid, **_customer_fields(b)))),
+            ("DELETE", r"/customers/(\d+)", lambda q, b, cid: (204, s.delete_customer(cid))),
+        ]
+        self.routes = [(m, re.compile(p + r"/?\Z"), fn) for m, p, fn in self.routes]
+
+    def _quote(self, args):
+        if not args.get("product_code"):
+            raise ServiceError("product_code is required")
+        return self.service.quote(args["product_code"], args.get("start"), args.get("end"),
+                                  args.get("days"), args.get("discount"))
+
+    def _metrics(self):
+        if self.service.metrics is None:
+            raise HttpError(404, "metrics are off (set RIMS_METRICS)")
+        return self.service.metrics.snapshot()
+
+    # ---------- dispatch ----------
+    def route(self, method, path):
+        """(fn, groups) for a request, or raise HttpError 404/405."""
+        allowed = []
+        for m, rx, fn in self.routes:
+            match = rx.match(path)
+            if match:
+                if m == method:
+                    return fn, match.groups()
+                allowed.append(m)
+        if allowed:
+            raise HttpError(405, f"{method} not allowed on {path} (use {', '.join(allowed)})")
+        raise HttpError(404, f"no route for {path}")
+
+    def prepare(self, method, target, body=b""):
+        """Route and parse a request: a no-argument callable doing the work.
+        Raises HttpError for a bad route or body."""
+        url = urlsplit(target)
+        fn, groups = self.route(method, url.path)
+        params = dict(parse_qsl(url.query))
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError as e:
+            raise HttpError(400, f"request body is not JSON: {e}") from None
+        if not isinstance(data, dict):
+            raise HttpError(400, "request body must be a JSON object")
+        return functools.partial(fn, params, data, *groups)
+
+    @staticmethod
+    def is_write(method, target):
+        return method not in ("GET", "HEAD") and urlsplit(target).path.rstrip("/") != "/quote"
+
+    @staticmethod
+    def error(exc):
+        """(status, payload) for an exception raised while handling a request."""
+        if isinstance(exc, HttpError):
+            return exc.status, dict(error=str(exc))
+        if isinstance(exc, OverbookedError):
+            return 409, dict(error=str(exc), free=exc.free)
+        if isinstance(exc, ServiceError):
+            return exc.status, dict(error=str(exc))
+        if isinstance(exc, (TypeError, ValueError)):      # bad ints / argument shapes in the request
+            return 400, dict(error=str(exc))
+        return 500, dict(error=f"{type(exc).__name__}: {exc}")
+
+    def call(self, method, target, body=b""):
+        """Handle one request synchronously on the calling thread: (status, payload)."""
+        try:
+            return self.prepare(method, target, body)()
+        except Exception as e:
+            return self.error(e)
+
+    async def dispatch(self, method, target, body=b""):
+        """Handle one request: writes via the writer, reads on a reader thread."""
+        try:
+            work = self.prepare(method, target, body)
+            if self.is_write(method, target):
+                return await self.db.write(work)
+            return await self.db.read(work)
+        except Exception as e:
+            return self.error(e)
+
+    # ---------- HTTP ----------
+    async def _handle(self, reader, writer):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, 400, dict(error="bad request line"), False)
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                keep = (headers.get("connection", "").lower() != "close" if version == "HTTP/1.1"
+                        else headers.get("connection", "").lower() == "keep-alive")
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    await self._send(writer, 413, dict(error="request body too large"), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self.stats["requests"] += 1
+                status, payload = await self.dispatch(method.upper(), target, body)
+                if status >= 400:
+                    self.stats["errors"] += 1
+                await self._send(writer, status, payload, keep)
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, status, payload, keep):
+        body = b"" if status == 204 else json.dumps(payload, default=_json_default).encode()
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.server = await asyncio.start_server(self._handle, host, port, backlog=512)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.db.close()
+
+
+async def serve(service, host="127.0.0.1", port=8080, workers=4, linger_ms=0.0, ready=None):
+    """Run an ApiServer until cancelled; ``ready(host, port)`` is called once listening."""
+    api = ApiServer(service, workers, linger_ms)
+    addr = await api.start(host, port)
+    if ready is not None:
+        ready(*addr)
+    try:
+        await api.server.serve_forever()
+    finally:
+        await api.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.api", description="Serve the rental service over HTTP/JSON")
+    ap.add_argument("db", nargs="?", default="rental_inventory.db")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--workers", type=int, default=4, help="reader threads")
+    ap.add_argument("--linger-ms", type=float, default=0.0, help="how long the writer waits to grow a batch")
+    ap.add_argument("--profile", default=None, help="storage profile (see rims/storage.py)")
+    args = ap.parse_args(argv)
+
+    t = time.perf_counter()
+    service = RentalService(args.db, args.profile)
+    ready = lambda host, port: print(f"serving {args.db} on http://{host}:{port} "
+                                     f"({args.workers} readers, ready in {time.perf_counter() - t:.2f}s)", flush=True)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.workers, args.linger_ms, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+# rims/asyncdb.py
+# Asyncio facade over the rental service with one SQLite writer.
+#
+# Reads run on a small pool of reader threads, each with its own read-only
+# (PRAGMA query_only) connection, so they proceed in parallel under WAL.
+# Writes never take the lock themselves: they are queued to a single writer
+# thread (rims/writebehind.py) which drains the queue - waiting up to
+# ``linger_ms`` for stragglers - and runs the whole batch in one
+# BEGIN IMMEDIATE ... COMMIT (group commit).
+# Each write gets its own SAVEPOINT, so one failing write (a full booking, a
+# missing customer) is rolled back alone; its awaiter gets the exception and
+# the rest of the batch still commits. Awaiters are woken only after COMMIT.
+#
+# A burst of bookings from many front-ends therefore becomes a few larger
+# transactions on one connection instead of writers queueing on
+# SQLITE_BUSY / busy_timeout.
+#
+#   db = AsyncDB(RentalService("rental_inventory.db"))
+#   ref = (await db.book({"product_code": "VAN775", "days": 3}))["receipt_ref"]
+#   rows = await db.customers("smith")
+#   await db.close()
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .writebehind import WriteBehind
+
+
+class AsyncDB:
+    """Awaitable versions of the DB methods, over a RentalService.
+
+    ``readers`` threads serve reads; one writer thread (a WriteBehind)
+    group-commits writes, at most ``max_batch`` per transaction.
+    ``durable=True`` makes the writer run synchronous=FULL.
+    """
+
+    def __init__(self, service, readers=4, linger_ms=0.0, max_batch=256, durable=False):
+        self.service = service
+        self.pool = service.pool
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="rims-read",
+                                           initializer=self._reader_init)
+        self.writer = WriteBehind(self.pool, flush_ms=linger_ms, max_rows=max_batch, durable=durable)
+        self._reads = 0
+        self._closed = False
+
+    def _reader_init(self):
+        # reader connections refuse writes, so nothing can bypass the writer
+        self.pool.connection().execute("PRAGMA query_only = ON")
+
+    @property
+    def stats(self):
+        return dict(self.writer.stats, reads=self._reads)
+
+    # ---------- generic ----------
+    async def read(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on a reader thread."""
+        self._reads += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, lambda: fn(*args, **kwargs))
+
+    async def write(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` for the writer; returns its result once
+        the batch it ran in has committed."""
+        if self._closed:
+            raise RuntimeError("AsyncDB is closed")
+        return await asyncio.wrap_future(self.writer.submit(fn, *args, **kwargs))
+
+    async def close(self):
+        """Finish queued writes, then stop the writer and the readers."""
+        if self._closed:
+            return
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.writer.close)
+        self._readers.shutdown(wait=True)
+
+    # ---------- reads (same shapes as V1.1's DB) ----------
+    async def customers(self, search=None):
+        return [tuple(r.values()) for r in await self.read(self.service.customers, search)]
+
+    async def products(self):
+        return [(p["product_type"], p["product_code"], p["cost_per_day"]) for p in await self.read(self.service.products)]
+
+    async def cost_for_code(self, code):
+        return await self.read(self.service.catalog.cost, code, 0.0)
+
+    async def available(self, code, start, end):
+        return await self.read(self.service.available, code, start, end)
+
+    async def rentals(self, search=None, limit=50, before=None):
+        return await self.read(self.service.rentals, search, limit, before)
+
+    async def analytics(self):
+        a = await self.read(self.service.analytics, 30)
+        return ([(r["product_type"], r["rentals"], r["revenue"]) for r in a["by_type"]],
+                [(r["day"], r["rentals"]) for r in a["daily"]])
+
+    async def quote(self, product_code, start=None, end=None, days=None, discount=None):
+        return await self.read(self.service.quote, product_code, start, end, days, discount)
+
+    # ---------- writes (group-committed) ----------
+    async def add_customer(self, n, p=None, e=None, a=None):
+        return await self.write(self.service.add_customer, n, p, e, a)
+
+    async def update_customer(self, cid, n=None, p=None, e=None, a=None):
+        return await self.write(self.service.update_customer, cid, n, p, e, a)
+
+    async def delete_customer(self, cid):
+        return await self.write(self.service.delete_customer, cid)
+
+    async def add_rental(self, row, start=None, end=None):
+        """``row`` is a dict of rentals columns; returns the receipt ref."""
+        return (await self.write(self.service.insert_rental, row, start, end))[1]
+
+    async def book(self, request):
+        return await self.write(self.service.book, request)
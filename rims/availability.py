@@ -0,0 +1,226 @@
+# rims/availability.py
+# Date-interval reservations per product_code, checked against
+# products.available_quantity (the number of units of that code).
+#
+# Each rental books [start, end) for its product code in `reservations`. An
+# R*Tree (`reservation_index`, product_id x day) finds the reservations that
+# overlap a window in O(log n + k); a sweep over those k intervals gives the
+# peak number of units in use, so "how many are free between D1 and D2" never
+# scans the whole table. Without the R*Tree module a B-tree index on
+# (product_code, start_date) is used instead.
+#
+# `reserve()` must run inside the same BEGIN IMMEDIATE transaction as the
+# rental insert: the write lock is held from the check to the commit, so two
+# terminals cannot both take the last unit.
+#
+#   python -m rims.availability rental_inventory.db CAR452 2025-01-01 2025-01-08
+
+import argparse
+import datetime
+import re
+import sqlite3
+
+
+class OverbookedError(Exception):
+    def __init__(self, product_code, start, end, free, wanted):
+        self.product_code, self.start, self.end = product_code, start, end
+        self.free, self.wanted = free, wanted
+        super().__init__(f"{product_code} is fully booked from {start} to {end} "
+                         f"({free} free, {wanted} requested)")
+
+
+def _day(d):
+    """date / datetime / 'YYYY-MM-DD...' -> date"""
+    if isinstance(d, datetime.datetime):
+        return d.date()
+    if isinstance(d, datetime.date):
+        return d
+    return datetime.date.fromisoformat(str(d)[:10])
+
+
+def rtree_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._rtree_probe USING rtree_i32(id, a, b)")
+        conn.execute("DROP TABLE temp._rtree_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def has_rtree(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name='reservation_index'").fetchone() is not None
+
+
+# R*Tree boxes are closed, reservations are half-open [start, end): store end - 1
+_RTREE_ROW = ("SELECT NEW.reservation_id, p.product_id, p.product_id, "
+              "CAST(julianday(NEW.start_date) AS INTEGER), CAST(julianday(NEW.end_date) AS INTEGER) - 1 "
+              "FROM products p WHERE p.product_code = NEW.product_code")
+
+
+def install(conn):
+    """Create `reservations` (+ R*Tree index and sync triggers) and book the
+    rentals that are still running."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS reservations(
+        reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rental_id INTEGER REFERENCES rentals(rental_id),
+        product_code TEXT NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 1,
+        created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        CHECK (end_date > start_date AND quantity > 0)
+    )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_code_start ON reservations(product_code, start_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_rental ON reservations(rental_id)")
+    if rtree_available(conn) and not has_rtree(conn):
+        conn.execute("CREATE VIRTUAL TABLE reservation_index USING rtree_i32(id, product_min, product_max, day_min, day_max)")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS reservations_ai AFTER INSERT ON reservations BEGIN "
+                     f"INSERT INTO reservation_index {_RTREE_ROW}; END")
+        conn.execute("CREATE TRIGGER IF NOT EXISTS reservations_ad AFTER DELETE ON reservations BEGIN "
+                     "DELETE FROM reservation_index WHERE id = OLD.reservation_id; END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS reservations_au AFTER UPDATE ON reservations BEGIN "
+                     f"DELETE FROM reservation_index WHERE id = OLD.reservation_id; "
+                     f"INSERT INTO reservation_index {_RTREE_ROW}; END")
+    # deleting a rental frees its units
+    conn.execute("CREATE TRIGGER IF NOT EXISTS rentals_release_ad AFTER DELETE ON rentals BEGIN "
+                 "DELETE FROM reservations WHERE rental_id = OLD.rental_id; END")
+    backfill(conn)
+
+
+def rental_period(app_date, no_days, until=None):
+    """Best-effort (start, end) of an existing rental row, or None.
+    V1.0 stores the end in next_credit_review; otherwise the upper bound of
+    the no_days range ("4-7" -> 7 days) is used."""
+    try:
+        start = _day(app_date)
+    except (TypeError, ValueError):
+        return None
+    try:
+        end = _day(until)
+    except (TypeError, ValueError):
+        nums = [int(n) for n in re.findall(r"\d+", str(no_days or ""))]
+        if not nums:
+            return None
+        end = start + datetime.timedelta(days=max(nums))
+    return (start, end) if end > start else None
+
+
+def backfill(conn, after=0):
+    """Book every rental (with rental_id > ``after``) that has not ended yet
+    and has no reservation."""
+    today = datetime.date.today()
+    rows = conn.execute("""SELECT r.rental_id, r.product_code, r.app_date, r.no_days, r.next_credit_review
+                           FROM rentals r JOIN products p ON p.product_code = r.product_code
+                           WHERE r.rental_id > ?
+                             AND NOT EXISTS (SELECT 1 FROM reservations v WHERE v.rental_id = r.rental_id)""",
+                        (after,))
+    for rental_id, code, app_date, no_days, until in rows.fetchall():
+        period = rental_period(app_date, no_days, until)
+        if period and period[1] > today:
+            conn.execute("INSERT INTO reservations(rental_id, product_code, start_date, end_date) VALUES(?,?,?,?)",
+                         (rental_id, code, period[0].isoformat(), period[1].isoformat()))
+
+
+class AvailabilityEngine:
+    """Free-unit queries and overbooking-safe reservations.
+
+    Every method takes an open connection so it can run inside the caller's
+    transaction (``reserve`` needs BEGIN IMMEDIATE: ``pool.connect(immediate=True)``).
+    """
+
+    def __init__(self):
+        self._rtree = None
+
+    def capacity(self, conn, product_code):
+        """(product_id, units) for a code, or None when the code is not a known product."""
+        return conn.execute("SELECT product_id, COALESCE(available_quantity, 1) FROM products "
+                            "WHERE product_code=?", (product_code,)).fetchone()
+
+    def overlapping(self, conn, product_code, start, end, product_id=None):
+        """(start_day, end_day, quantity) of reservations overlapping [start, end),
+        as integer day numbers (CAST(julianday(...) AS INTEGER))."""
+        j0, j1 = _jd(_day(start)), _jd(_day(end))
+        if self._rtree is None:
+            self._rtree = has_rtree(conn)
+        if self._rtree:
+            if product_id is None:
+                cap = self.capacity(conn, product_code)
+                if cap is None:
+                    return []
+                product_id = cap[0]
+            return conn.execute("""SELECT i.day_min, i.day_max + 1, v.quantity
+                                   FROM reservation_index i JOIN reservations v ON v.reservation_id = i.id
+                                   WHERE i.product_min <= ? AND i.product_max >= ?
+                                     AND i.day_min < ? AND i.day_max >= ?""",
+                                (product_id, product_id, j1, j0)).fetchall()
+        return conn.execute("""SELECT CAST(julianday(start_date) AS INTEGER), CAST(julianday(end_date) AS INTEGER), quantity
+                               FROM reservations
+                               WHERE product_code = ? AND start_date < ? AND end_date > ?""",
+                            (product_code, _day(end).isoformat(), _day(start).isoformat())).fetchall()
+
+    def peak(self, conn, product_code, start, end, product_id=None):
+        """Most units of ``product_code`` in use on any day of [start, end)."""
+        lo, hi = _jd(_day(start)), _jd(_day(end))
+        events = []
+        for s, e, q in self.overlapping(conn, product_code, start, end, product_id):
+            events.append((max(s, lo), q))
+            events.append((min(e, hi), -q))
+        events.sort()       # ends (-q) sort before starts on the same day
+        level = best = 0
+        for _, q in events:
+            level += q
+            best = max(best, level)
+        return best
+
+    def free(self, conn, product_code, start, end):
+        """Units free for the whole of [start, end); None for an untracked code."""
+        cap = self.capacity(conn, product_code)
+        if cap is None:
+            return None
+        product_id, units = cap
+        return max(0, units - self.peak(conn, product_code, start, end, product_id))
+
+    def reserve(self, conn, product_code, start, end, quantity=1, rental_id=None):
+        """Book ``quantity`` units or raise OverbookedError. Codes that are not in
+        `products` are not tracked (returns None). Call inside BEGIN IMMEDIATE."""
+        start, end = _day(start), _day(end)
+        if end <= start:
+            end = start + datetime.timedelta(days=1)
+        free = self.free(conn, product_code, start, end)
+        if free is None:
+            return None
+        if free < quantity:
+            raise OverbookedError(product_code, start, end, free, quantity)
+        cur = conn.execute("INSERT INTO reservations(rental_id, product_code, start_date, end_date, quantity) "
+                           "VALUES(?,?,?,?,?)", (rental_id, product_code, start.isoformat(), end.isoformat(), quantity))
+        return cur.lastrowid
+
+    def release(self, conn, rental_id):
+        conn.execute("DELETE FROM reservations WHERE rental_id=?", (rental_id,))
+
+
+def _jd(d):
+    # same day number as CAST(julianday('YYYY-MM-DD') AS INTEGER)
+    return d.toordinal() + 1721424
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.availability",
+                                 description="Units of a product free between two dates")
+    ap.add_argument("db")
+    ap.add_argument("product_code")
+    ap.add_argument("start")
+    ap.add_argument("end")
+    args = ap.parse_args(argv)
+    conn = sqlite3.connect(args.db)
+    try:
+        free = AvailabilityEngine().free(conn, args.product_code, args.start, args.end)
+        print(f"{args.product_code}: " + ("not a tracked product" if free is None else f"{free} free")
+              + f" from {args.start} to {args.end}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
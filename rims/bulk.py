@@ -0,0 +1,391 @@
+# rims/bulk.py
+# Bulk CSV import/export of rentals, customers and products (nightly branch loads).
+#
+# Import reads the file in batches of ``batch`` rows, validates each batch a
+# column at a time (one conversion pass per column instead of per-field checks
+# per row) and inserts it with a single executemany; the whole load is one
+# BEGIN IMMEDIATE transaction, so a bad file leaves the database untouched.
+# While it runs, the table's secondary indexes and triggers (FTS sync,
+# analytics totals, reservation release) are dropped; afterwards they are
+# recreated from their saved SQL and the derived data is brought up to date in
+# a few set-based statements. Rentals without a receipt_ref get a block of
+# refs from the receipt counter. Empty fields are NULL (columns with a default,
+# e.g. created_date, get the default).
+#
+# Another branch's file carries that branch's BILL-n refs. The receipt counter
+# is moved past every ref loaded, so later bookings do not collide. An incoming
+# ref that is already taken (or repeated in the file) gets a fresh one from the
+# counter. It is reported per row, not treated as an --on-conflict duplicate,
+# unless renumber_refs=False (--no-renumber) or on_conflict="replace".
+#
+# Export streams ``SELECT *`` through fetchmany into csv.writer, so memory
+# stays flat. ``.gz`` file names are (de)compressed on the fly.
+#
+#   python -m rims.bulk import rental_inventory.db rentals branch_rentals.csv
+#   python -m rims.bulk export rental_inventory.db rentals all_rentals.csv.gz
+
+import argparse
+import csv
+import datetime
+import gzip
+import itertools
+import sqlite3
+import time
+
+from . import aggregates, availability, catalog, lookup, receipts, schema, search, storage
+from .report import iter_batches
+
+TABLES = {"rentals": "rental_id", "customers": "customer_id", "products": "product_id"}
+ON_CONFLICT = {"abort": "INSERT", "ignore": "INSERT OR IGNORE", "replace": "INSERT OR REPLACE"}
+MAX_PROBLEMS = 100
+
+
+class BulkError(ValueError):
+    """Invalid input; ``problems`` is a list of (line, column, value, reason)."""
+
+    def __init__(self, message, problems=()):
+        self.problems = list(problems)
+        if self.problems:
+            message += "\n" + "\n".join(f"  line {line}: {col}={value!r}: {reason}"
+                                        for line, col, value, reason in self.problems[:10])
+        super().__init__(message)
+
+
+def _open(filename, mode):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", newline="", encoding="utf-8")
+    return open(filename, mode, newline="", encoding="utf-8")
+
+
+# ---------- column validation ----------
+def _discount(v):
+    try:
+        return float(v)
+    except ValueError:
+        return schema.discount_pct(v)      # the old "5%"
+
+
+def _converter(table, name, decl):
+    """(function, check_only) for a column; check_only keeps the text and only
+    uses the function to reject bad values. (None, False): plain TEXT."""
+    decl = (decl or "").upper()
+    if table == "rentals" and name == "discount":
+        return _discount, False
+    if "INT" in decl:
+        return int, False
+    if "REAL" in decl or "FLOA" in decl or "DOUB" in decl:
+        return float, False
+    if "DATE" in decl:
+        return datetime.datetime.fromisoformat, True
+    return None, False
+
+
+def _convert(values, conv):
+    """Convert one column; returns (values, {index: reason}). The common case
+    (no blanks, all valid) is a single C-level map over the column."""
+    fn, check_only = conv
+    if "" not in values:
+        if fn is None:
+            return values, {}
+        try:
+            out = list(map(fn, values))
+            return (values if check_only else out), {}
+        except (TypeError, ValueError):
+            pass
+    elif fn is None:
+        return [v if v != "" else None for v in values], {}
+    else:
+        try:
+            out = [fn(v) if v != "" else None for v in values]
+            return ([v if v != "" else None for v in values] if check_only else out), {}
+        except (TypeError, ValueError):
+            pass
+    out, bad = [], {}
+    for i, v in enumerate(values):
+        if v == "":
+            out.append(None)
+            continue
+        try:
+            x = fn(v)
+            out.append(v if check_only else x)
+        except (TypeError, ValueError) as e:
+            out.append(None)
+            bad[i] = str(e) or type(e).__name__
+    return out, bad
+
+
+class _Columns:
+    """The target columns of one import, read from PRAGMA table_info."""
+
+    def __init__(self, conn, table, header, keep_ids):
+        info = {r[1]: r for r in conn.execute(f"PRAGMA table_info({table})")}
+        unknown = [h for h in header if h not in info]
+        if unknown:
+            raise BulkError(f"{table} has no column(s): {', '.join(unknown)}")
+        if len(set(header)) != len(header):
+            raise BulkError("duplicate column names in the header")
+        self.keep = [i for i, h in enumerate(header) if keep_ids or h != TABLES[table]]
+        self.names = [header[i] for i in self.keep]
+        self.convs = [_converter(table, n, info[n][2]) for n in self.names]
+        self.required = [j for j, n in enumerate(self.names) if info[n][3] and info[n][4] is None]
+        missing = [n for n, r in info.items() if r[3] and r[4] is None and n not in self.names and not r[5]]
+        if not self.keep:
+            raise BulkError("no columns to import")
+        if missing:
+            raise BulkError(f"required column(s) missing from the file: {', '.join(missing)}")
+        self.add_receipts = table == "rentals"
+        if self.add_receipts and "receipt_ref" not in self.names:
+            self.names.append("receipt_ref")
+        # NULL -> the column default (e.g. created_date -> CURRENT_TIMESTAMP)
+        self.placeholders = [f"COALESCE(?, {info[n][4]})" if info[n][4] is not None else "?" for n in self.names]
+
+
+def _validate(cols, rows, first_line):
+    """Validate one batch column by column; returns (columns, bad row indexes,
+    problems)."""
+    ncols = max(cols.keep) + 1
+    problems, bad = [], set()
+    for i, r in enumerate(rows):
+        if len(r) < ncols:
+            bad.add(i)
+            problems.append((first_line + i, "*", len(r), f"expected {ncols} fields"))
+    if bad:
+        rows = [r if i not in bad else [""] * ncols for i, r in enumerate(rows)]
+    raw = list(zip(*rows))
+    columns = []
+    for j, src in enumerate(cols.keep):
+        values, errors = _convert(raw[src], cols.convs[j])
+        for i, reason in errors.items():
+            bad.add(i)
+            problems.append((first_line + i, cols.names[j], raw[src][i], reason))
+        columns.append(values)
+    for j in cols.required:
+        if None in columns[j]:
+            for i, v in enumerate(columns[j]):
+                if v is None and i not in bad:
+                    bad.add(i)
+                    problems.append((first_line + i, cols.names[j], "", "required"))
+    if len(columns) < len(cols.names):
+        columns.append([None] * len(rows))      # receipt_ref, filled in later
+    problems.sort()
+    return columns, bad, problems
+
+
+def _taken_refs(conn, refs, chunk=500):
+    taken = set()
+    for i in range(0, len(refs), chunk):
+        part = refs[i:i + chunk]
+        taken.update(r for (r,) in conn.execute(
+            f"SELECT receipt_ref FROM rentals WHERE receipt_ref IN ({', '.join('?' * len(part))})", part))
+    return taken
+
+
+def _fill_receipts(conn, cols, columns, lines, renumber):
+    """Give rows without a receipt_ref (and, with ``renumber``, rows whose ref
+    is taken) refs from the counter; returns [(line, old ref, new ref), ...]."""
+    j = cols.names.index("receipt_ref")
+    old = columns[j]
+    refs = list(old)
+    # the counter moves past the file's own BILL-n refs
+    top = max((n for n in map(receipts.parse_ref, refs) if n is not None), default=0)
+    if top:
+        receipts.raise_to(conn, top)
+    if renumber:
+        taken = _taken_refs(conn, [r for r in refs if r is not None])
+        for i, r in enumerate(refs):
+            if r is not None:
+                if r in taken:
+                    refs[i] = None
+                taken.add(r)        # a second row with the same ref is renumbered too
+    missing = [i for i, v in enumerate(refs) if v is None]
+    if missing:
+        n = receipts.reserve_block(conn, len(missing))
+        for i, k in zip(missing, range(n, n + len(missing))):
+            refs[i] = receipts.format_ref(k)
+    columns[j] = refs
+    return [(lines[i], old[i], refs[i]) for i in missing if old[i] is not None]
+
+
+# ---------- deferred indexes / triggers ----------
+def _deferred_objects(conn, table):
+    """(kind, name, sql) of the indexes and triggers on ``table`` that can be
+    dropped for the load (UNIQUE/PRIMARY KEY autoindexes cannot)."""
+    return conn.execute("SELECT type, name, sql FROM sqlite_master WHERE tbl_name=? AND sql IS NOT NULL "
+                        "AND type IN ('index', 'trigger') ORDER BY type", (table,)).fetchall()
+
+
+def _refresh_derived(conn, table, since):
+    """Catch the trigger-maintained data up with the rows just loaded.
+    ``since`` is the max rowid before the load, or None for a full rebuild."""
+    if since is None:
+        search.rebuild_table(conn, table)
+    else:
+        search.index_since(conn, table, since)
+    if table == "customers":
+        lookup.refresh(conn, since)     # the picker's trigram indexes (its prefix indexes are plain ones)
+    if table == "products" and catalog.counter(conn) is not None:
+        catalog.touch(conn)         # open product catalogs reload
+    if table == "rentals":
+        if since is None:
+            aggregates.rebuild(conn)
+        else:
+            aggregates.add_since(conn, since)
+        if schema.table_columns(conn, "reservations"):
+            # book the still-running rentals that came in
+            availability.backfill(conn, since or 0)
+
+
+# ---------- import ----------
+def import_csv(conn, table, filename, batch=20000, on_conflict="abort", keep_ids=False,
+               defer_indexes=True, skip_invalid=False, progress=None, renumber_refs=True):
+    """Load ``filename`` (CSV with a header row of column names) into ``table``.
+
+    ``on_conflict``: abort | ignore | replace (duplicate ids, and receipt_refs
+    when ``renumber_refs`` is off).
+    ``keep_ids``: keep the file's primary-key column instead of numbering anew.
+    ``skip_invalid``: skip rows that fail validation instead of rolling back.
+    ``renumber_refs``: give rentals whose receipt_ref is taken a new one (not
+    with on_conflict="replace", where a taken ref names the row to replace).
+    ``progress(rows_written)`` is called after every batch.
+    Returns dict(rows, skipped, renumbered, seconds, load_seconds, rows_per_sec,
+    problems, renumbered_refs); rows counts rows written (not those ignored),
+    renumbered_refs lists (line, old ref, new ref). load_seconds excludes
+    recreating the indexes and catching up derived data.
+    """
+    if table not in TABLES:
+        raise BulkError(f"unknown table {table!r}; choose from {', '.join(TABLES)}")
+    if on_conflict not in ON_CONFLICT:
+        raise BulkError(f"on_conflict must be one of {', '.join(ON_CONFLICT)}")
+    if table == "rentals" and not schema.is_canonical(conn):
+        raise BulkError("rentals is not in the canonical layout; run python -m rims.unify first")
+    if conn.in_transaction:
+        raise BulkError("import_csv() needs a connection with no open transaction")
+
+    t0 = time.perf_counter()
+    done = skipped = renumbered = 0
+    all_problems, all_renumbered = [], []
+    key = TABLES[table]
+    with _open(filename, "r") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        if not header:
+            raise BulkError(f"{filename} is empty")
+        cols = _Columns(conn, table, header, keep_ids)
+        sql = (f"{ON_CONFLICT[on_conflict]} INTO {table}({', '.join(cols.names)}) "
+               f"VALUES({', '.join(cols.placeholders)})")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            since = conn.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}").fetchone()[0]
+            if keep_ids or on_conflict == "replace":
+                since = None            # rows may land below the old maximum / replace old ones
+            deferred = _deferred_objects(conn, table) if defer_indexes else []
+            for kind, name, _ in deferred:
+                conn.execute(f"DROP {kind.upper()} {name}")
+            if cols.add_receipts:
+                receipts.sync(conn)     # past the refs already here
+            line = 2
+            while True:
+                rows = list(itertools.islice(reader, batch))
+                if not rows:
+                    break
+                columns, bad, problems = _validate(cols, rows, line)
+                lines = [line + i for i in range(len(rows)) if i not in bad]
+                line += len(rows)
+                if problems:
+                    if not skip_invalid:
+                        raise BulkError(f"{len(problems)} invalid value(s) in {filename}", problems)
+                    skipped += len(bad)
+                    all_problems.extend(problems[:MAX_PROBLEMS - len(all_problems)])
+                    columns = [[v for i, v in enumerate(col) if i not in bad] for col in columns]
+                if cols.add_receipts:
+                    moved = _fill_receipts(conn, cols, columns, lines, renumber_refs and on_conflict != "replace")
+                    renumbered += len(moved)
+                    all_renumbered.extend(moved[:MAX_PROBLEMS - len(all_renumbered)])
+                # rowcount: rows written, so OR IGNORE'd duplicates are not counted
+                done += conn.executemany(sql, zip(*columns)).rowcount
+                if progress:
+                    progress(done)
+            loaded = time.perf_counter()
+            for _, _, create in deferred:
+                conn.execute(create)
+            if deferred:
+                _refresh_derived(conn, table, since)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    conn.execute("PRAGMA optimize")
+    seconds = time.perf_counter() - t0
+    return dict(rows=done, skipped=skipped, renumbered=renumbered, seconds=seconds, load_seconds=loaded - t0,
+                rows_per_sec=done / seconds if seconds else 0.0, problems=all_problems,
+                renumbered_refs=all_renumbered)
+
+
+# ---------- export ----------
+def export_csv(conn, table, filename, batch=5000, where=None, params=(), progress=None):
+    """Stream ``table`` (optionally filtered by ``where``) to ``filename`` in
+    primary-key order; returns the number of rows written."""
+    if table not in TABLES:
+        raise BulkError(f"unknown table {table!r}; choose from {', '.join(TABLES)}")
+    names = schema.table_columns(conn, table)
+    sql = f"SELECT * FROM {table}" + (f" WHERE {where}" if where else "") + f" ORDER BY {TABLES[table]}"
+    done = 0
+    with _open(filename, "w") as f:
+        w = csv.writer(f)
+        w.writerow(names)
+        for rows in iter_batches(conn, sql, params, batch):
+            w.writerows(rows)
+            done += len(rows)
+            if progress:
+                progress(done)
+    return done
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.bulk",
+                                 description="Bulk CSV import/export of rentals, customers and products")
+    ap.add_argument("command", choices=("import", "export"))
+    ap.add_argument("db")
+    ap.add_argument("table", choices=tuple(TABLES))
+    ap.add_argument("file", help="CSV file with a header row (.gz is compressed)")
+    ap.add_argument("--batch", type=int, default=20000, help="rows per executemany")
+    ap.add_argument("--on-conflict", default="abort", choices=tuple(ON_CONFLICT),
+                    help="what to do with rows whose id (or, with --no-renumber, receipt_ref) already exists")
+    ap.add_argument("--no-renumber", action="store_true",
+                    help="treat a receipt_ref that is already taken as a conflict instead of giving the row a new one")
+    ap.add_argument("--keep-ids", action="store_true", help="keep the file's primary keys")
+    ap.add_argument("--skip-invalid", action="store_true", help="skip bad rows instead of aborting")
+    ap.add_argument("--no-defer", action="store_true", help="keep indexes/triggers live during the load")
+    ap.add_argument("--profile", default="batch-import", help="storage profile for this connection")
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, timeout=30, isolation_level=None)
+    try:
+        storage.get_profile(args.profile).apply(conn)
+        if args.command == "export":
+            n = export_csv(conn, args.table, args.file)
+            print(f"exported {n:,d} {args.table} rows to {args.file}")
+            return 0
+        try:
+            res = import_csv(conn, args.table, args.file, batch=args.batch, on_conflict=args.on_conflict,
+                             keep_ids=args.keep_ids, defer_indexes=not args.no_defer,
+                             skip_invalid=args.skip_invalid, renumber_refs=not args.no_renumber,
+                             progress=lambda n: print(f"  {n:>12,d} rows", flush=True))
+        except (BulkError, sqlite3.IntegrityError) as e:
+            print(f"import failed, nothing written: {e}")
+            return 1
+        for line, col, value, reason in res["problems"]:
+            print(f"  skipped line {line}: {col}={value!r}: {reason}")
+        for line, old, new in res["renumbered_refs"]:
+            print(f"  line {line}: receipt_ref {old} is taken, saved as {new}")
+        if res["renumbered"]:
+            print(f"{res['renumbered']:,d} rental(s) got a new receipt_ref")
+        print(f"imported {res['rows']:,d} {args.table} rows ({res['skipped']:,d} skipped) in "
+              f"{res['seconds']:.2f}s - {res['rows_per_sec']:,.0f} rows/s")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+# rims/catalog.py
+# In-memory product catalog (the `products` table, indexed by code and by
+# type) that reloads itself only when products actually change.
+#
+# Triggers on `products` bump the 'products' counter in `sequences`, so any
+# writer - another terminal, a bulk import, the sqlite3 shell - is noticed.
+# ``changed()`` is the cheap poll: PRAGMA data_version (no table read; it moves
+# when another connection commits anything) and, only when that moved, one
+# primary-key read of the counter. Writes made on the polling connection
+# itself do not move data_version; code that edits products through it calls
+# ``invalidate()``.
+
+import sqlite3
+import threading
+from collections import namedtuple
+
+Product = namedtuple("Product", "product_id product_type product_code cost_per_day available_quantity status")
+
+COUNTER = "products"
+
+
+def _counter_sql(event):
+    return (f"CREATE TRIGGER IF NOT EXISTS products_version_a{event[0].lower()} AFTER {event} ON products BEGIN "
+            f"INSERT INTO sequences(name, value) VALUES('{COUNTER}', 1) "
+            f"ON CONFLICT(name) DO UPDATE SET value = value + 1; END")
+
+
+def install(conn):
+    """Change-counter triggers on products (needs `sequences`, see rims/receipts.py)."""
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(_counter_sql(event))
+
+
+def touch(conn):
+    """Bump the counter by hand (e.g. after a bulk load that ran without the triggers)."""
+    conn.execute(f"INSERT INTO sequences(name, value) VALUES('{COUNTER}', 1) "
+                 f"ON CONFLICT(name) DO UPDATE SET value = value + 1")
+
+
+def counter(conn):
+    """Current products change counter (0 before the first change, None
+    when the counter table is not there)."""
+    try:
+        row = conn.execute("SELECT value FROM sequences WHERE name=?", (COUNTER,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else 0
+
+
+class ProductCatalog:
+    """Products cached by code and by type; safe to read from any thread.
+
+    ``load()`` swaps in a fresh snapshot, ``changed()`` says whether one is
+    due, ``refresh()`` does both. Lookups never query unless nothing has been
+    loaded yet.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._snapshot = None           # (by_code, by_type, types)
+        self._counter = None            # products counter at the last load
+        self._latest = None             # newest counter any check has seen
+        self._seen = {}                 # thread id -> data_version last seen
+        self._dirty = True
+        self.generation = 0
+        self.stats = dict(loads=0, checks=0, counter_reads=0)
+
+    # ---------- loading ----------
+    def load(self):
+        """Read products into a new snapshot; returns the catalog (for on_done)."""
+        with self.pool.connect() as c:
+            # counter first: a change landing in between is caught by the next check
+            version = counter(c)
+            rows = c.execute("SELECT product_id, product_type, product_code, cost_per_day, "
+                             "COALESCE(available_quantity, 1), status FROM products "
+                             "ORDER BY product_type, product_code").fetchall()
+        by_code, by_type = {}, {}
+        for row in rows:
+            p = Product(*row)
+            if p.product_code:
+                by_code[p.product_code] = p
+            by_type.setdefault(p.product_type, []).append(p)
+        with self._lock:
+            self._snapshot = (by_code, by_type, sorted(by_type))
+            self._counter = version
+            # still dirty if a check already saw a newer counter than this load read
+            self._dirty = version is not None and (self._latest or 0) > version
+            self.generation += 1
+            self.stats["loads"] += 1
+        return self
+
+    def invalidate(self):
+        """Force the next ``changed()`` / ``refresh()`` to reload."""
+        with self._lock:
+            self._dirty = True
+
+    def reload_if_changed(self):
+        """load() when changed(), else None: the whole poll in one call, for a worker."""
+        return self.load() if self.changed() else None
+
+    def changed(self):
+        """True when products changed since the last load (cheap; see top)."""
+        with self.pool.connect() as c:
+            data_version = c.execute("PRAGMA data_version").fetchone()[0]
+            key = threading.get_ident()
+            with self._lock:
+                self.stats["checks"] += 1
+                moved = self._seen.get(key) != data_version
+                self._seen[key] = data_version
+            if moved:
+                now = counter(c)
+                with self._lock:
+                    self.stats["counter_reads"] += 1
+                    if now is None:
+                        # no counter table (not migrated yet): any commit elsewhere counts
+                        self._dirty = True
+                    else:
+                        self._latest = max(self._latest or 0, now)
+                        if now != self._counter:
+                            self._dirty = True
+        with self._lock:
+            return self._dirty or self._snapshot is None
+
+    def refresh(self):
+        """Reload if changed; returns True when it did."""
+        if self.changed():
+            self.load()
+            return True
+        return False
+
+    # ---------- lookups ----------
+    def _snap(self):
+        if self._snapshot is None:
+            self.load()
+        return self._snapshot
+
+    def get(self, code):
+        """Product for ``code``, or None."""
+        return self._snap()[0].get((code or "").strip())
+
+    def cost(self, code, default=None):
+        p = self.get(code)
+        return p.cost_per_day if p else default
+
+    def types(self):
+        return list(self._snap()[2])
+
+    def products(self, product_type=None):
+        """Products of one type (or all), ordered by type then code."""
+        by_type = self._snap()[1]
+        if product_type is not None:
+            return list(by_type.get(product_type, ()))
+        return [p for t in self._snap()[2] for p in by_type[t]]
+
+    def codes(self, product_type):
+        return [p.product_code for p in self.products(product_type) if p.product_code]
+
+    def first(self, product_type):
+        """First product of a type (by code), or None."""
+        items = self._snap()[1].get(product_type)
+        return items[0] if items else None
@@ -0,0 +1,301 @@
+# rims/charts.py
+# Analytics charts that are updated in place instead of rebuilt.
+#
+# Each chart creates its artists once (pie wedges, bars, a line, a text box)
+# and later refreshes only their data: wedge angles, bar heights, line
+# y-values. A ChartPanel groups the charts drawn on one figure canvas and
+#   * skips a refresh whose query result hashes the same as the one drawn,
+#   * keeps a refresh for a panel that is not on screen (another tab or view)
+#     and renders it when the panel is shown,
+#   * blits (restores the cached background and redraws only the data
+#     artists) when the axes, ticks and labels can stay as they are, and asks
+#     for a full draw_idle() - with tight_layout - only when they cannot.
+#
+# Nothing here imports matplotlib: the caller builds the Figure, axes and
+# canvas (V1.0 lazily on first use) and hands them over.
+#
+#   panel = ChartPanel(canvas, [PieChart(ax1, "By count"), BarChart(ax2, "Revenue")],
+#                      split=lambda d: (d["count"], d["revenue"]), visible=tab_is_selected,
+#                      load=lambda done: tasks.submit(db.analytics, on_done=done))
+#   panel.refresh()          # after a save: loads and redraws if visible, else marks stale
+#   panel.show()             # on <<NotebookTabChanged>>: catches up on anything stale
+
+import math
+
+
+def digest(data):
+    """Hash of a query result (tuples/lists/dicts of plain values); only
+    compared within one process, so the builtin string hash will do."""
+    return hash(repr(data))
+
+
+def _ceiling(v):
+    # a round axis top (1, 2, 2.5, 5 x 10^n) at or above v
+    if v <= 0:
+        return 1.0
+    step = 10 ** math.floor(math.log10(v))
+    for m in (1, 2, 2.5, 5, 10):
+        if v <= m * step:
+            return m * step
+    return 10 * step
+
+
+# ---------- charts ----------
+class Chart:
+    """One axes. ``update(rows)`` applies new data and returns True when the
+    axes decorations changed too (so a blit is not enough)."""
+
+    def __init__(self, ax, title=None, ylabel=None, color=None, text_color=None):
+        self.ax = ax
+        self.color = color
+        self.text_color = text_color
+        self.labels = None               # labels currently drawn; () = "No data"
+        tc = {} if text_color is None else dict(color=text_color)
+        if title:
+            ax.set_title(title, **tc)
+        if ylabel:
+            ax.set_ylabel(ylabel, **tc)
+        self.empty = ax.text(0.5, 0.5, "No data", ha="center", va="center", transform=ax.transAxes,
+                             visible=False, **tc)
+
+    def artists(self):
+        """The data artists (animated: drawn by the panel, not by draw())."""
+        return []
+
+    def _animate(self, artists):
+        for a in artists:
+            a.set_animated(True)
+        return artists
+
+    def update(self, rows):
+        rows = list(rows or ())
+        if not rows:
+            if self.labels == ():
+                return False
+            for a in self.artists():
+                a.set_visible(False)
+            self.empty.set_visible(True)
+            self.labels = ()
+            return True
+        self.empty.set_visible(False)
+        labels = tuple(str(r[0]) for r in rows)
+        values = [float(r[1] or 0) for r in rows]
+        if labels != self.labels:
+            self._build(labels, values)
+            self.labels = labels
+            return True
+        return self._set(values)
+
+    def _build(self, labels, values):
+        raise NotImplementedError
+
+    def _set(self, values):
+        raise NotImplementedError
+
+
+class PieChart(Chart):
+    def __init__(self, ax, title=None, autopct="%1.1f%%", startangle=90, **kw):
+        super().__init__(ax, title, **kw)
+        self.autopct = autopct
+        self.startangle = startangle
+        self.wedges, self.texts, self.autotexts = [], [], []
+
+    def artists(self):
+        return self.wedges + self.texts + self.autotexts
+
+    def update(self, rows):
+        # an all-zero pie cannot be drawn
+        rows = [r for r in rows or () if float(r[1] or 0) > 0]
+        return super().update(rows)
+
+    def _build(self, labels, values):
+        for a in self.artists():
+            a.remove()
+        self.wedges, self.texts, self.autotexts = self.ax.pie(
+            values, labels=labels, autopct=self.autopct, startangle=self.startangle, colors=self.color)
+        if self.text_color is not None:
+            for t in self.texts:
+                t.set_color(self.text_color)
+        self._animate(self.artists())
+
+    def _set(self, values):
+        # same slices: move the wedge edges and their label/percentage texts
+        total = sum(values)
+        theta = self.startangle
+        for w, t, at, v in zip(self.wedges, self.texts, self.autotexts, values):
+            span = 360.0 * v / total
+            w.set_theta1(theta)
+            w.set_theta2(theta + span)
+            mid = math.radians(theta + span / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            t.set_position((1.1 * x, 1.1 * y))
+            t.set_horizontalalignment("left" if x > 0 else "right")
+            at.set_position((0.6 * x, 0.6 * y))
+            at.set_text(self.autopct % (100.0 * v / total))
+            theta += span
+        return False
+
+
+class BarChart(Chart):
+    def __init__(self, ax, title=None, rotation=0, **kw):
+        super().__init__(ax, title, **kw)
+        self.rotation = rotation
+        self.bars = []
+
+    def artists(self):
+        return list(self.bars)
+
+    def _build(self, labels, values):
+        for b in self.bars:
+            b.remove()
+        xs = range(len(labels))
+        self.bars = self._animate(list(self.ax.bar(xs, values, color=self.color)))
+        self.ax.set_xticks(list(xs))
+        self.ax.set_xticklabels(labels, rotation=self.rotation)
+        self.ax.set_xlim(-0.6, len(labels) - 0.4)
+        self.ax.set_ylim(0, _ceiling(max(values) * 1.1))
+
+    def _set(self, values):
+        for b, v in zip(self.bars, values):
+            b.set_height(v)
+        top = self.ax.get_ylim()[1]
+        if max(values) <= top and max(values) * 4 >= top:
+            return False
+        self.ax.set_ylim(0, _ceiling(max(values) * 1.1))     # rescale only when it doesn't fit
+        return True
+
+
+class LineChart(Chart):
+    def __init__(self, ax, title=None, rotation=0, max_ticks=10, marker="o", **kw):
+        super().__init__(ax, title, **kw)
+        self.rotation = rotation
+        self.max_ticks = max_ticks
+        self.line, = ax.plot([], [], marker=marker, color=self.color)
+        self._animate([self.line])
+
+    def artists(self):
+        return [self.line]
+
+    def _build(self, labels, values):
+        n = len(labels)
+        self.line.set_data(range(n), values)
+        self.line.set_visible(True)
+        step = max(1, math.ceil(n / self.max_ticks))
+        self.ax.set_xticks(list(range(0, n, step)))
+        self.ax.set_xticklabels(labels[::step], rotation=self.rotation)
+        self.ax.set_xlim(-0.5, max(n - 0.5, 0.5))
+        self.ax.set_ylim(0, _ceiling(max(values) * 1.1))
+
+    def _set(self, values):
+        self.line.set_ydata(values)
+        top = self.ax.get_ylim()[1]
+        if max(values) <= top and max(values) * 4 >= top:
+            return False
+        self.ax.set_ylim(0, _ceiling(max(values) * 1.1))
+        return True
+
+
+class TextChart(Chart):
+    """A text box; ``update(text)``."""
+
+    def __init__(self, ax, x=0.1, y=0.9, **text_kw):
+        ax.axis("off")
+        super().__init__(ax)
+        self.text = ax.text(x, y, "", transform=ax.transAxes, va="top", **text_kw)
+        self._animate([self.text])
+
+    def artists(self):
+        return [self.text]
+
+    def update(self, text):
+        self.text.set_text(text)
+        return False
+
+
+# ---------- panel ----------
+class ChartPanel:
+    """The charts on one canvas, refreshed from one query.
+
+    ``split(data)`` turns the query result into one input per chart;
+    ``visible()`` says whether the canvas is on screen; ``load(done)`` starts
+    the query and calls ``done(data)`` on the Tk thread.
+    """
+
+    def __init__(self, canvas, charts, split, visible=None, load=None, tight=True):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.charts = list(charts)
+        self.split = split
+        self.visible = visible or (lambda: True)
+        self.load = load
+        self.tight = tight
+        self.stale = load is not None    # never loaded yet
+        self._drawn = None               # digest of the data on screen
+        self._pending = None             # (digest, data) waiting for the panel to be shown
+        self._background = None
+        self.stats = dict(renders=0, unchanged=0, deferred=0, blits=0, full_draws=0)
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def refresh(self):
+        """Reload the data now if the panel is on screen, else when it is shown."""
+        if self.load is None:
+            return
+        if not self.visible():
+            self.stale = True
+            return
+        self.stale = False
+        self.load(self.render)
+
+    def show(self):
+        """Call when the panel may have come on screen."""
+        if not self.visible():
+            return
+        if self.stale:
+            self.refresh()
+        elif self._pending is not None:
+            key, data = self._pending
+            self._pending = None
+            self._apply(key, data)
+
+    def render(self, data):
+        """Draw ``data`` unless it is what is already drawn (or the panel is hidden)."""
+        key = digest(data)
+        if key == self._drawn:
+            self._pending = None
+            self.stats["unchanged"] += 1
+            return False
+        if not self.visible():
+            self._pending = key, data
+            self.stats["deferred"] += 1
+            return False
+        self._apply(key, data)
+        return True
+
+    def _apply(self, key, data):
+        full = False
+        for chart, part in zip(self.charts, self.split(data)):
+            full = chart.update(part) or full
+        self._drawn = key
+        self.stats["renders"] += 1
+        if full or self._background is None:
+            self._background = None      # until the next draw_event recaptures it
+            if self.tight:
+                self.figure.tight_layout()
+            self.stats["full_draws"] += 1
+            self.canvas.draw_idle()
+        else:
+            self.stats["blits"] += 1
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.canvas.blit(self.figure.bbox)
+
+    def _draw_artists(self):
+        for chart in self.charts:
+            for a in chart.artists():
+                self.figure.draw_artist(a)
+
+    def _on_draw(self, event):
+        # a full draw leaves the animated artists out: keep that as the
+        # background, then put them on top
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
@@ -0,0 +1,351 @@
+# rims/datagen.py
+# Deterministic synthetic customers, products and rentals at a scale factor,
+# for reproducing production-size problems (benchmarks/bench_suite.py uses it).
+#
+# Scale factor 1 is 100,000 rentals, 10,000 customers and 100 products. The
+# data follows the shapes that matter to the queries:
+#   * product popularity is Zipf (--zipf): a few codes take most rentals,
+#   * bookings follow a seasonal curve (summer peak, busy Fri/Sat, quiet
+#     Sunday) with steady growth over the --days ending at --end,
+#   * most rentals come from repeat customers (Zipf over a shuffled customer
+#     list, --repeat),
+#   * day ranges, payment methods, discounts and credit fields are the ones
+#     the chosen app's form fills in (--app v1.0 / v1.1), and totals are
+#     priced by rims.pricing the way that app prices them.
+# Both apps share the canonical table layout (rims/schema.py), so --app
+# decides the values written, not the columns.
+#
+# Rows are generated in fixed-size chunks by a process pool; each chunk is
+# written to its own scratch SQLite file in one transaction. The parent merges
+# the chunks in order into the database inside one BEGIN IMMEDIATE, with the
+# rentals/customers indexes and triggers dropped and rebuilt afterwards (as
+# rims.bulk does), so a failed run leaves the database untouched. Each chunk
+# seeds its own RNG from (seed, table, chunk) and chunk boundaries do not
+# depend on --workers: the same --seed and --end give the same rows, and the
+# same digest, however many processes ran.
+#
+#   python -m rims.datagen bench.db --scale 10 --seed 42 --workers 8
+#   python -m rims.datagen bench.db --app v1.0 --rentals 2000000 --end 2026-06-30
+
+import argparse
+import bisect
+import datetime
+import hashlib
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from functools import lru_cache
+
+from . import receipts, schema, storage
+from .bulk import TABLES, _deferred_objects, _refresh_derived
+from .pricing import DISCOUNT_TIERS, PricingEngine, to_pence
+from .service import DEFAULT_PRODUCTS, RentalService
+
+SCALE = dict(rentals=100000, customers=10000, products=100)
+CHUNK = 50000
+PRODUCT_TYPES = (("Car", "CAR", 12.0), ("Van", "VAN", 19.0), ("Minibus", "MIN", 12.0), ("Truck", "TRK", 15.0))
+# weekday factor (Mon..Sun) and the day of year the season peaks on
+WEEKDAYS = (0.9, 0.85, 0.9, 1.0, 1.25, 1.35, 0.75)
+PEAK_DAY, SEASON, GROWTH = 200, 0.35, 0.3
+FIRST_NAMES = ("James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Susan", "Richard", "Jessica", "Joseph", "Sarah", "Thomas", "Karen")
+LAST_NAMES = ("Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Johnson", "Davies", "Patel",
+              "Wright", "Robinson", "Thompson", "Evans", "Walker", "White", "Roberts", "Green", "Hall")
+STREETS = ("High Street", "Station Road", "Church Lane", "Victoria Road", "Park Avenue", "Mill Lane")
+
+# what each app's rental form offers, with how often it is picked
+APPS = {
+    "v1.0": dict(days=(("1-30", 70), ("31-90", 20), ("91-270", 7), ("271-365", 3)),
+                 payments=(("Cash", 40), ("Visa Card", 30), ("Master Card", 20), ("Debit Card", 10)),
+                 credit_limits={"1-30": "£150", "31-90": "£200", "91-270": "£250", "271-365": "£300"},
+                 deposits=(("Yes", 1), ("No", 3))),
+    "v1.1": dict(days=(("1-3", 35), ("4-7", 30), ("8-14", 18), ("15-30", 12), ("31-90", 5)),
+                 payments=(("Cash", 35), ("Card", 55), ("Bank Transfer", 10)),
+                 credit_limits=(("£500", 4), ("£1000", 3), ("£2000", 2), ("£5000", 1)),
+                 deposits=(("£0", 4), ("£50", 3), ("£100", 2), ("£200", 1)),
+                 discounts=((0, 70), (5, 15), (10, 10), (15, 5))),
+}
+V11_DAY_RANGES = {"1-3": 2, "4-7": 6, "8-14": 11, "15-30": 22, "31-90": 60}    # typical days booked per V1.1 range
+RENTAL_COLUMNS = ("customer_id", "receipt_ref", "product_type", "product_code", "no_days", "cost_per_day",
+                  "account_opened", "app_date", "next_credit_review", "last_credit_review", "date_review",
+                  "credit_limit", "settlement_due", "discount", "deposit", "payment_method", "check_credit",
+                  "term_agreed", "tax", "subtotal", "total", "created_date")
+CUSTOMER_COLUMNS = ("customer_id", "customer_name", "phone", "email", "address", "created_date")
+# a multiplier coprime with any customer count below it, to shuffle popularity ranks onto ids
+SHUFFLE = 1000003
+
+
+def sizes(scale=1.0, rentals=None, customers=None, products=None):
+    return dict(rentals=int(rentals if rentals is not None else SCALE["rentals"] * scale),
+                customers=max(1, int(customers if customers is not None else SCALE["customers"] * scale)),
+                products=max(len(DEFAULT_PRODUCTS),
+                             int(products if products is not None else SCALE["products"] * scale)))
+
+
+# ---------- distributions ----------
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def _pick(cum, rnd):
+    return bisect.bisect_right(cum, rnd.random() * cum[-1], hi=len(cum) - 1)
+
+
+def _choices(options):
+    values, weights = zip(*options)
+    return values, _cumulative(weights)
+
+
+@lru_cache(maxsize=4)
+def _zipf(n, s):
+    return _cumulative(1.0 / (k + 1) ** s for k in range(n))
+
+
+@lru_cache(maxsize=4)
+def _calendar(first, days):
+    """Cumulative booking weight per day from ``first``: season x weekday x growth."""
+    weights = []
+    for d in range(days):
+        day = first + datetime.timedelta(days=d)
+        season = 1 + SEASON * math.cos(2 * math.pi * (day.timetuple().tm_yday - PEAK_DAY) / 365.25)
+        weights.append(season * WEEKDAYS[day.weekday()] * (1 + GROWTH * d / max(days - 1, 1)))
+    return _cumulative(weights)
+
+
+def _mean_length(app):
+    """Average days booked per rental on ``app``'s form."""
+    labels, weights = zip(*APPS[app]["days"])
+    lengths = [int(label.split("-")[1]) if app == "v1.0" else V11_DAY_RANGES[label] for label in labels]
+    return sum(n * w for n, w in zip(lengths, weights)) / sum(weights)
+
+
+def catalog(n, seed):
+    """(product_type, product_code, cost_per_day) in popularity order: the
+    app's default products first, then generated codes."""
+    rnd = random.Random(f"{seed}:products")
+    products = [(t, code, cost) for t, code, cost, _ in DEFAULT_PRODUCTS]
+    for i in range(len(products), n):
+        ptype, prefix, base = PRODUCT_TYPES[rnd.randrange(len(PRODUCT_TYPES))]
+        products.append((ptype, f"{prefix}{i:05d}", round(base * rnd.uniform(0.8, 1.6) * 2) / 2))
+    return products
+
+
+# ---------- chunk generation (worker processes) ----------
+def _customer_rows(spec, lo, hi, rnd):
+    first = datetime.date.fromisoformat(spec["first_day"]) - datetime.timedelta(days=365)
+    span = spec["days"] + 365
+    for i in range(lo, hi):
+        cid = spec["first_customer"] + i
+        name = f"{FIRST_NAMES[rnd.randrange(len(FIRST_NAMES))]} {LAST_NAMES[rnd.randrange(len(LAST_NAMES))]}"
+        # joined somewhere between a year before the first rental and the end
+        joined = first + datetime.timedelta(days=i * span // spec["customers"])
+        yield (cid, name, f"07{rnd.randrange(10 ** 8, 10 ** 9)}",
+               f"{name.lower().replace(' ', '.')}{cid}@example.com",
+               f"{rnd.randint(1, 250)} {STREETS[rnd.randrange(len(STREETS))]}",
+               f"{joined.isoformat()} {rnd.randint(8, 19):02d}:{rnd.randrange(60):02d}:00")
+
+
+def _rental_rows(spec, lo, hi, rnd):
+    app = APPS[spec["app"]]
+    v10 = spec["app"] == "v1.0"
+    first_day = datetime.date.fromisoformat(spec["first_day"])
+    days_cum = _calendar(first_day, spec["days"])
+    product_cum = _zipf(len(spec["products"]), spec["zipf"])
+    customer_cum = _zipf(spec["customers"], spec["repeat"])
+    labels, label_cum = _choices(app["days"])
+    payments, payment_cum = _choices(app["payments"])
+    deposits, deposit_cum = _choices(app["deposits"])
+    if not v10:
+        limits, limit_cum = _choices(app["credit_limits"])
+        discounts, discount_cum = _choices(app["discounts"])
+    n, total = spec["rentals"], days_cum[-1]
+
+    rows, rates, starts, ends, disc = [], [], [], [], []
+    for i in range(lo, hi):
+        # the i-th of n bookings along the calendar: created dates rise with rental_id
+        x = (i + rnd.random()) / n * total
+        d = min(bisect.bisect_right(days_cum, x), spec["days"] - 1)
+        prev = days_cum[d - 1] if d else 0.0
+        # opening hours, 08:00-20:00, in the same order
+        second = 8 * 3600 + int(min(max((x - prev) / (days_cum[d] - prev), 0.0), 0.9999) * 12 * 3600)
+        start = first_day + datetime.timedelta(days=d)
+        ptype, code, cost = spec["products"][_pick(product_cum, rnd)]
+        label = labels[_pick(label_cum, rnd)]
+        row = dict(customer_id=spec["first_customer"] + _pick(customer_cum, rnd) * SHUFFLE % spec["customers"],
+                   receipt_ref=receipts.format_ref(spec["first_receipt"] + i), product_type=ptype,
+                   product_code=code, no_days=label, cost_per_day=cost, app_date=start.isoformat(),
+                   deposit=deposits[_pick(deposit_cum, rnd)], payment_method=payments[_pick(payment_cum, rnd)],
+                   check_credit=int(rnd.random() < 0.6), term_agreed=int(rnd.random() < 0.8),
+                   created_date=f"{start.isoformat()} {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}")
+        if v10:
+            # V1.0 books the top of the range, reviews credit when it ends, tiers the discount
+            length = int(label.split("-")[1])
+            end = start + datetime.timedelta(days=length)
+            row.update(account_opened="Yes", next_credit_review=end.isoformat(), last_credit_review=str(length),
+                       date_review=end.isoformat(), credit_limit=app["credit_limits"][label],
+                       settlement_due=f"{cost:g}")
+            disc.append(None)
+        else:
+            end = start + datetime.timedelta(days=V11_DAY_RANGES[label])
+            row.update(credit_limit=limits[_pick(limit_cum, rnd)])
+            disc.append(discounts[_pick(discount_cum, rnd)])
+        rows.append(row)
+        rates.append(to_pence(cost))
+        starts.append(start)
+        ends.append(end)
+
+    # plain Python maths: the same pence either way, and ints rather than int64s
+    q = PricingEngine(tiers=DISCOUNT_TIERS if v10 else None, use_numpy=False).quote_many(
+        rates, starts, ends, None if v10 else disc)
+    for row, bp, sub, tax, tot in zip(rows, q["discount_bp"], q["subtotal"], q["tax"], q["total"]):
+        row.update(discount=bp / 100, subtotal=sub / 100, tax=tax / 100, total=tot / 100)
+        yield tuple(map(row.get, RENTAL_COLUMNS))
+
+
+def _write_chunk(task):
+    """Generate one chunk into its own scratch database: (path, rows, digest)."""
+    spec, table, chunk, lo, hi = task
+    rnd = random.Random(f"{spec['seed']}:{table}:{chunk}")
+    if table == "customers":
+        columns, rows, create = CUSTOMER_COLUMNS, _customer_rows(spec, lo, hi, rnd), schema.CREATE_CUSTOMERS
+    else:
+        columns, rows, create = RENTAL_COLUMNS, _rental_rows(spec, lo, hi, rnd), schema.CREATE_RENTALS
+    rows = list(rows)
+    path = os.path.join(spec["scratch"], f"{table}_{chunk:06d}.db")
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(create)
+        conn.execute("BEGIN")
+        conn.executemany(f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join('?' * len(columns))})", rows)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return path, len(rows), hashlib.sha256(repr(rows).encode()).hexdigest()
+
+
+def _tasks(spec, table, count, chunk):
+    for k, lo in enumerate(range(0, count, chunk)):
+        yield spec, table, k, lo, min(lo + chunk, count)
+
+
+# ---------- merge ----------
+def _merge(conn, table, columns, path):
+    src = sqlite3.connect(path)
+    try:
+        cur = src.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+        conn.executemany(f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join('?' * len(columns))})", cur)
+    finally:
+        src.close()
+    os.remove(path)
+
+
+def generate(db, scale=1.0, rentals=None, customers=None, products=None, app="v1.1", seed=1, end=None,
+             days=730, zipf=1.1, repeat=0.9, workers=None, chunk=CHUNK, progress=None):
+    """Generate into ``db`` (created and migrated if needed; existing rows are
+    kept and the new ones appended). ``progress(table, rows_done)`` is called
+    after every merged chunk. Returns dict(rentals, customers, products,
+    seconds, rows_per_sec, digest)."""
+    if app not in APPS:
+        raise ValueError(f"app must be one of {', '.join(APPS)}")
+    t0 = time.perf_counter()
+    n = sizes(scale, rentals, customers, products)
+    end = datetime.date.fromisoformat(str(end)) if end else datetime.date.today()
+    workers = max(1, workers or os.cpu_count() or 1)
+    svc = RentalService(db, "batch-import", write_behind=False)
+    svc.pool.close_all()
+
+    conn = sqlite3.connect(db, timeout=30, isolation_level=None)
+    scratch = tempfile.mkdtemp(prefix="rims_datagen_", dir=os.path.dirname(os.path.abspath(db)))
+    digest = hashlib.sha256()
+    pool = None
+    try:
+        storage.get_profile("batch-import").apply(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            products_list = catalog(n["products"], seed)
+            # popular products get more units: their share of the rentals running at once, plus a margin
+            weights = [1.0 / (k + 1) ** zipf for k in range(len(products_list))]
+            running = n["rentals"] / days * _mean_length(app)
+            conn.executemany("INSERT OR IGNORE INTO products(product_type, product_code, cost_per_day, "
+                             "available_quantity) VALUES(?,?,?,?)",
+                             [(t, code, cost, max(1, math.ceil(1.2 * running * w / sum(weights))))
+                              for (t, code, cost), w in zip(products_list, weights)])
+            spec = dict(seed=seed, app=app, rentals=n["rentals"], customers=n["customers"], products=products_list,
+                        first_day=(end - datetime.timedelta(days=days - 1)).isoformat(), days=days, zipf=zipf,
+                        repeat=repeat, scratch=scratch,
+                        first_customer=conn.execute("SELECT COALESCE(MAX(customer_id), 0) + 1 "
+                                                    "FROM customers").fetchone()[0],
+                        first_receipt=receipts.reserve_block(conn, n["rentals"]) if n["rentals"] else 1)
+            if workers > 1:
+                pool = multiprocessing.get_context("spawn").Pool(workers)
+            for table, columns in (("customers", CUSTOMER_COLUMNS), ("rentals", RENTAL_COLUMNS)):
+                since = conn.execute(f"SELECT COALESCE(MAX({TABLES[table]}), 0) FROM {table}").fetchone()[0]
+                deferred = _deferred_objects(conn, table)
+                for kind, name, _ in deferred:
+                    conn.execute(f"DROP {kind.upper()} {name}")
+                tasks = _tasks(spec, table, n[table], chunk)
+                done = 0
+                # chunks come back in order, merged while later ones are still being generated
+                for path, rows, chunk_digest in (pool.imap(_write_chunk, tasks) if pool else map(_write_chunk, tasks)):
+                    _merge(conn, table, columns, path)
+                    digest.update(chunk_digest.encode())
+                    done += rows
+                    if progress:
+                        progress(table, done)
+                for _, _, create in deferred:
+                    conn.execute(create)
+                _refresh_derived(conn, table, since)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.execute("PRAGMA optimize")
+    finally:
+        if pool is not None:
+            pool.terminate()
+        conn.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+    seconds = time.perf_counter() - t0
+    rows = n["rentals"] + n["customers"]
+    return dict(n, seconds=seconds, rows_per_sec=rows / seconds if seconds else 0.0, digest=digest.hexdigest())
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.datagen",
+                                 description="Deterministic synthetic rental data at a scale factor")
+    ap.add_argument("db")
+    ap.add_argument("--scale", type=float, default=1.0,
+                    help="x %(r)s rentals, %(c)s customers, %(p)s products" % dict(
+                        r=f"{SCALE['rentals']:,d}", c=f"{SCALE['customers']:,d}", p=SCALE["products"]))
+    ap.add_argument("--rentals", type=int, help="override the scaled rental count")
+    ap.add_argument("--customers", type=int, help="override the scaled customer count")
+    ap.add_argument("--products", type=int, help="override the scaled product count")
+    ap.add_argument("--app", default="v1.1", choices=tuple(APPS), help="whose form values to write")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--end", help="last booking day, YYYY-MM-DD (default today; fix it for identical data)")
+    ap.add_argument("--days", type=int, default=730, help="booking history length")
+    ap.add_argument("--zipf", type=float, default=1.1, help="product popularity skew")
+    ap.add_argument("--repeat", type=float, default=0.9, help="customer repeat skew (0 = uniform)")
+    ap.add_argument("--workers", type=int, default=None, help="generator processes (default: CPU count)")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="rows per chunk (changes the data)")
+    args = ap.parse_args(argv)
+
+    res = generate(args.db, args.scale, args.rentals, args.customers, args.products, args.app, args.seed,
+                   args.end, args.days, args.zipf, args.repeat, args.workers, args.chunk,
+                   progress=lambda table, n: print(f"  {table:<10s} {n:>12,d}", flush=True))
+    print(f"generated {res['rentals']:,d} rentals, {res['customers']:,d} customers, {res['products']:,d} products "
+          f"({args.app}, seed {args.seed}) in {res['seconds']:.1f}s - {res['rows_per_sec']:,.0f} rows/s")
+    print(f"digest {res['digest']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,100 @@
+# rims/forms.py
+# Widget/variable registry for a Tk form, with batched updates.
+#
+# Widgets are registered against the Tk variable they are bound to while the
+# form is built, so finding "the combobox for v_prod_code" is a dict lookup
+# instead of a walk over the widget tree comparing cget("textvariable").
+#
+# ``set()`` / ``values()`` / ``configure()`` only queue a change; everything
+# queued before Tk goes idle is applied in one ``after_idle`` callback (the
+# last value per variable / option wins). Changes queued by variable traces
+# while a flush is running are applied in the same callback.
+#
+#   form = FormRegistry(root)
+#   form.register(v_prod_code, combobox)
+#   form.values(v_prod_code, codes); form.set(v_prod_code, ""); form.set(v_cost, "")
+
+
+class FormRegistry:
+    """Widgets keyed by their bound variable, plus a per-idle update batch."""
+
+    MAX_ROUNDS = 8      # trace -> set -> trace chains applied within one flush
+
+    def __init__(self, root):
+        self.root = root
+        self._widgets = {}          # Tcl variable name -> widget
+        self._vars = {}             # Tcl variable name -> (var, value)
+        self._options = {}          # widget path -> (widget, {option: value})
+        self._job = None
+        self._flushing = False
+        self.stats = dict(queued=0, flushes=0)
+
+    # ---------- registry ----------
+    def register(self, var, widget):
+        """Bind ``widget`` to ``var`` (one widget per variable; returns widget)."""
+        self._widgets[str(var)] = widget
+        return widget
+
+    def widget(self, var):
+        """The widget registered for ``var``, or None."""
+        return self._widgets.get(str(var))
+
+    def __len__(self):
+        return len(self._widgets)
+
+    # ---------- batched updates ----------
+    def set(self, var, value):
+        self._vars[str(var)] = (var, value)
+        self._queued()
+
+    def values(self, var, values):
+        """Set the drop-down values of the combobox bound to ``var`` (no-op if none)."""
+        self.configure(var, values=tuple(values))
+
+    def configure(self, var, **options):
+        widget = self.widget(var)
+        if widget is None:
+            return
+        self._options.setdefault(str(widget), (widget, {}))[1].update(options)
+        self._queued()
+
+    def get(self, var):
+        """Value ``var`` will have after the next flush."""
+        pending = self._vars.get(str(var))
+        return pending[1] if pending is not None else var.get()
+
+    def _queued(self):
+        self.stats["queued"] += 1
+        if self._job is None and not self._flushing:
+            self._job = self.root.after_idle(self.flush)
+
+    def flush(self):
+        """Apply everything queued now (normally run by after_idle)."""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self._flushing = True
+        try:
+            for _ in range(self.MAX_ROUNDS):
+                if not (self._vars or self._options):
+                    break
+                options, variables = self._options, self._vars
+                self._options, self._vars = {}, {}
+                # widget options first, so a combobox has its values before its text is set
+                for widget, opts in options.values():
+                    widget.configure(**opts)
+                for var, value in variables.values():
+                    var.set(value)
+        finally:
+            self._flushing = False
+        self.stats["flushes"] += 1
+        if self._vars or self._options:
+            self._job = self.root.after_idle(self.flush)
+
+    def cancel(self):
+        """Drop anything queued (on close)."""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self._vars.clear()
+        self._options.clear()
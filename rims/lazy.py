@@ -0,0 +1,66 @@
+# rims/lazy.py
+# Deferred imports for the heavy optional stacks (matplotlib, reportlab, ...).
+#
+# ``lazy_import(name)`` returns a stand-in that imports the real module the
+# first time one of its attributes is used, so a UI can name its chart or PDF
+# modules at the top of the file and still start without loading them.
+# Unlike importlib.util.LazyLoader, nothing is resolved up front: finding the
+# spec of "matplotlib.figure" would already import the matplotlib package.
+#
+#   figure = lazy_import("matplotlib.figure")
+#   ...
+#   fig = figure.Figure(figsize=(12, 8))      # matplotlib is imported here
+
+import importlib
+import sys
+import threading
+import time
+
+_lock = threading.Lock()
+# module name -> seconds its first (deferred) import took
+load_times = {}
+
+
+class LazyModule:
+    """Imports ``name`` on first attribute access; ``setup(module)`` (if given)
+    runs once right after, before the module is handed out."""
+
+    def __init__(self, name, setup=None):
+        self.__dict__["_name"] = name
+        self.__dict__["_setup"] = setup
+        self.__dict__["_module"] = None
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        module = self._module
+        if module is None:
+            with _lock:
+                module = self._module
+                if module is None:
+                    t = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if self._setup is not None:
+                        self._setup(module)
+                    load_times.setdefault(self._name, time.perf_counter() - t)
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.load(), attr, value)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def lazy_import(name, setup=None):
+    """The module itself if already imported, else a LazyModule for it."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name, setup)
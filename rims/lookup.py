@@ -0,0 +1,245 @@
+# rims/lookup.py
+# Customer lookup for the type-ahead picker on the rental forms.
+#
+# Prefix matching runs on expression indexes over normalized customer fields:
+# name and surname lower-cased, phone reduced to its digits ("077-123 4567" ->
+# "0771234567"), email lower-cased. They are plain indexes on `customers`, so
+# every writer keeps them current. Matching is a range scan of one index
+# ("smi" -> ['smi', 'smj')) that stops at the limit.
+#
+# Substring matching ("4567", "jones12@") uses FTS5 trigram indexes over the
+# same normalized values, kept in sync by triggers, and needs 3+ characters.
+# There are two of them, `customers_tri` (name, email) and
+# `customers_tri_phone`, so that phone digits do not crowd the doclists of
+# digit trigrams in emails. When FTS5 or its trigram tokenizer is not
+# compiled in, substrings fall back to a scan of the table.
+#
+#   python -m rims.lookup find rental_inventory.db "smi"
+#   python -m rims.lookup rebuild rental_inventory.db
+
+import argparse
+import re
+import sqlite3
+import time
+
+from . import search
+
+COLUMNS = ("customer_id", "customer_name", "phone", "email", "address")
+LIMIT = 10
+
+# normalized fields as SQL over a row prefix ("" for the table, "new."/"old." in triggers)
+_SEPARATORS = " -()+./"
+NAME = "lower(trim({p}customer_name))"
+SURNAME = "lower(trim(substr(trim({p}customer_name), instr(trim({p}customer_name), ' ') + 1)))"
+EMAIL = "lower(trim({p}email))"
+PHONE = "{p}phone"
+for _c in _SEPARATORS:
+    PHONE = f"replace({PHONE}, '{_c}', '')"
+
+# (index, expression)
+INDEXES = (
+    ("idx_customers_name_norm", NAME),
+    ("idx_customers_surname_norm", SURNAME),
+    ("idx_customers_phone_norm", PHONE),
+    ("idx_customers_email_norm", EMAIL),
+)
+# (field, source column, expression)
+FIELDS = (("name", "customer_name", NAME), ("phone", "phone", PHONE), ("email", "email", EMAIL))
+# (fts table, fields)
+TRIGRAMS = (("customers_tri", ("name", "email")), ("customers_tri_phone", ("phone",)))
+
+_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")    # SQLite lower() is ASCII-only
+_STRIP_PHONE = str.maketrans("", "", _SEPARATORS)
+_PHONE_LIKE = re.compile(r"[\d" + re.escape(_SEPARATORS) + r"]*\d[\d" + re.escape(_SEPARATORS) + r"]*\Z")
+
+
+def expr(template, prefix=""):
+    return template.format(p=prefix)
+
+
+def normalize(term):
+    """User text -> (kind, value): ("phone", digits) for phone-looking input,
+    else ("text", lower-cased text)."""
+    term = (term or "").strip()
+    if _PHONE_LIKE.match(term):
+        return "phone", term.translate(_STRIP_PHONE)
+    return "text", " ".join(term.translate(_LOWER).split())
+
+
+def _upper(prefix):
+    # smallest string above every string starting with ``prefix``
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+# ---------- schema ----------
+def trigram_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._tri_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp._tri_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _trigger_sql(fts, fields):
+    fields = [(f, col, e) for f, col, e in FIELDS if f in fields]
+    cols = ", ".join(f for f, _, _ in fields)
+    new = ", ".join(expr(e, "new.") for _, _, e in fields)
+    old = ", ".join(expr(e, "old.") for _, _, e in fields)
+    source = ", ".join(col for _, col, _ in fields)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES('delete', old.customer_id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES(new.customer_id, {new});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON customers BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON customers BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {source} ON customers BEGIN {delete} {insert} END",
+    ]
+
+
+def install(conn):
+    """The normalized-field indexes and, when FTS5 has the trigram tokenizer,
+    the substring indexes with their sync triggers (filled from existing rows)."""
+    for name, e in INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON customers({expr(e)})")
+    if not trigram_available(conn):
+        return
+    fields = ", ".join(f"{expr(e)} AS {f}" for f, _, e in FIELDS)
+    conn.execute(f"CREATE VIEW IF NOT EXISTS customers_norm AS SELECT customer_id, {fields} FROM customers")
+    for fts, cols in TRIGRAMS:
+        if search.has_index(conn, fts):
+            continue
+        conn.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(cols)}, content='customers_norm', "
+                     f"content_rowid='customer_id', tokenize='trigram')")
+        for sql in _trigger_sql(fts, cols):
+            conn.execute(sql)
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES('optimize')")
+
+
+def refresh(conn, since=None):
+    """Catch the substring indexes up after a load that ran without their
+    triggers: customers above rowid ``since``, or everything when ``since`` is None."""
+    for fts, cols in TRIGRAMS:
+        if not search.has_index(conn, fts):
+            continue
+        if since is None:
+            search._bulk_insert(conn, fts, f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES('optimize')")
+        else:
+            cols = ", ".join(cols)
+            search._bulk_insert(conn, fts, f"INSERT INTO {fts}(rowid, {cols}) SELECT customer_id, {cols} "
+                                           f"FROM customers_norm WHERE customer_id > ?", (since,))
+
+
+# ---------- lookups ----------
+def _trigram_query(fields, value, size=5):
+    """FTS5 query for rows holding ``value`` in one of ``fields`` - or at least
+    all of its pieces (callers check the substring). The pieces are short
+    overlapping phrases that between them cover every trigram: FTS5 intersects
+    separate phrases by seeking, while one long phrase containing a trigram
+    that is in nearly every row ("@ex") reads that trigram's whole doclist."""
+    pieces = []
+    for i in range(0, max(len(value) - 2, 1), size - 2):
+        piece = '"' + value[i:i + size].replace('"', '""') + '"'
+        if piece not in pieces:
+            pieces.append(piece)
+    return "{" + " ".join(fields) + "} : (" + " AND ".join(pieces) + ")"
+
+
+class CustomerLookup:
+    """Type-ahead matches: (customer_id, customer_name, phone, email, address)
+    tuples, prefix matches first, then substring matches."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._trigram = None
+
+    def trigram(self):
+        if self._trigram is None:
+            with self.pool.connect() as c:
+                self._trigram = all(search.has_index(c, fts) for fts, _ in TRIGRAMS)
+        return self._trigram
+
+    def find(self, term, limit=LIMIT):
+        kind, value = normalize(term)
+        limit = int(limit)
+        if not value or limit <= 0:
+            return []
+        # an exact phone number or email is the customer: no substring search after it
+        if kind == "phone":
+            prefixes, fts, fields, unique = (PHONE,), "customers_tri_phone", ("phone",), True
+        elif "@" in value:
+            prefixes, fts, fields, unique = (EMAIL,), "customers_tri", ("email",), True
+        else:
+            prefixes, fts, fields, unique = (NAME, SURNAME, EMAIL), "customers_tri", ("name", "email"), False
+        rows, seen, exact = [], set(), False
+        cols = ", ".join(COLUMNS)
+        with self.pool.connect() as c:
+            for template in prefixes:
+                e = expr(template)
+                for key, *row in c.execute(f"SELECT {e}, {cols} FROM customers WHERE {e} >= ? AND {e} < ? "
+                                           f"ORDER BY {e} LIMIT ?", (value, _upper(value), limit - len(rows))):
+                    exact = exact or key == value
+                    if row[0] not in seen:
+                        seen.add(row[0])
+                        rows.append(tuple(row))
+                if len(rows) >= limit:
+                    return rows
+            if len(value) < 3 or (exact and unique):
+                return rows
+            # substrings, oldest customer first; ``limit`` of them still fill up after dropping those found above
+            exprs = [expr(e, "c.") for f, _, e in FIELDS if f in fields]
+            contains = " OR ".join(f"instr({e}, ?) > 0" for e in exprs)
+            ccols = ", ".join("c." + col for col in COLUMNS)
+            if self.trigram():
+                cur = c.execute(f"SELECT {ccols} FROM {fts} JOIN customers c ON c.customer_id = {fts}.rowid "
+                                f"WHERE {fts} MATCH ? AND ({contains}) LIMIT ?",
+                                (_trigram_query(fields, value),) + (value,) * len(exprs) + (limit,))
+            else:
+                cur = c.execute(f"SELECT {ccols} FROM customers c WHERE {contains} ORDER BY c.customer_id LIMIT ?",
+                                (value,) * len(exprs) + (limit,))
+            for row in cur:
+                if row[0] not in seen and len(rows) < limit:
+                    seen.add(row[0])
+                    rows.append(row)
+        return rows
+
+
+def label(row):
+    """Picker text for a (customer_id, name, phone, email, ...) row."""
+    cid, name, phone, email = row[:4]
+    return " | ".join(str(v) for v in (name, phone, email) if v) + f"  #{cid}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.lookup")
+    ap.add_argument("command", choices=("find", "rebuild"))
+    ap.add_argument("db", nargs="?", default="rental_inventory.db")
+    ap.add_argument("term", nargs="?", default="")
+    ap.add_argument("--limit", type=int, default=LIMIT)
+    args = ap.parse_args(argv)
+
+    if args.command == "rebuild":
+        conn = sqlite3.connect(args.db)
+        try:
+            with conn:
+                install(conn)
+                refresh(conn)
+            trigram = all(search.has_index(conn, fts) for fts, _ in TRIGRAMS)
+        finally:
+            conn.close()
+        print("rebuilt" if trigram else "rebuilt (no FTS5 trigram tokenizer: substring matches scan the table)")
+        return 0
+    from .pool import ConnectionManager
+    with ConnectionManager(args.db) as pool:
+        t = time.perf_counter()
+        rows = CustomerLookup(pool).find(args.term, args.limit)
+        ms = (time.perf_counter() - t) * 1000
+        for row in rows:
+            print(label(row))
+    print(f"{len(rows)} match(es) in {ms:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
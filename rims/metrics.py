@@ -0,0 +1,408 @@
+# rims/metrics.py
+# Statement timing for the data layer: per-query histograms, a slow-query log
+# with EXPLAIN QUERY PLAN, and export to a metrics file or HTTP endpoint.
+#
+# With metrics on, the connection manager (rims/pool.py) opens its connections
+# as InstrumentedConnection, so every statement the apps, the service, the API
+# and the writer run is timed - execute/executemany/executescript on the
+# connection and its cursors, plus COMMIT and ROLLBACK. A statement's time runs
+# from execute() through the fetchone/fetchmany/fetchall calls that read its
+# rows; rows pulled by iterating the cursor directly are not timed (a per-row
+# hook would cost more than the statement). Methods decorated with @timed
+# (V1.0's DatabaseManager, V1.1's DB) get their own histograms, and slow
+# statements are tagged with the method they ran under.
+#
+# Histograms have power-of-two buckets (1 ns .. ~9 min). A statement slower
+# than ``slow_ms`` goes into the slow log (the last ``slow_max``) with its
+# query plan, captured on the same connection the first time that statement
+# text is slow. ``file`` / ``url`` receive a JSON snapshot every ``interval``
+# seconds (0: only on close and at exit); a url gets it as a POST.
+# benchmarks/bench_metrics.py measures the overhead against the same hot paths
+# with metrics off.
+#
+#   RIMS_METRICS="slow_ms=50,file=rims_metrics.json,interval=60" python V1.1.py
+#   RIMS_METRICS="url=http://127.0.0.1:9100/rims" python -m rims.api rental_inventory.db
+#   python -m rims.metrics show rims_metrics.json --top 15
+
+import argparse
+import atexit
+import collections
+import datetime
+import functools
+import json
+import os
+import sqlite3
+import threading
+from time import perf_counter_ns
+
+from .storage import _parse_overrides
+
+SLOW_MS = 100.0
+SLOW_MAX = 200
+BUCKETS = 40                # ns.bit_length(): bucket b holds [2**(b-1), 2**b) ns
+PLAN_VERBS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="milliseconds")
+
+
+def _summary(count, total, peak, buckets):
+    """Count/total/mean/max and bucket-bound percentiles, in ms."""
+    out = dict(count=count, total_ms=total / 1e6, mean_ms=total / count / 1e6 if count else 0.0, max_ms=peak / 1e6)
+    for p in (50, 90, 99):
+        need, seen = count * p / 100, 0
+        for b, n in enumerate(buckets):
+            seen += n
+            if n and seen >= need:
+                out[f"p{p}_ms"] = min(2 ** b, peak) / 1e6
+                break
+    out["histogram"] = {f"{2 ** b / 1e6:g}": n for b, n in enumerate(buckets) if n}     # upper bound ms -> count
+    return out
+
+
+class QueryMetrics:
+    """Timings of one process's statements (and @timed methods)."""
+
+    def __init__(self, slow_ms=SLOW_MS, slow_max=SLOW_MAX, explain=True, log_params=False,
+                 file=None, url=None, interval=0.0):
+        self.slow_ms = float(slow_ms)
+        self.explain = explain
+        self.log_params = log_params
+        self.file = file
+        self.url = url
+        self.interval = float(interval)
+        self.export_error = None
+        self._slow_ns = int(self.slow_ms * 1e6)
+        self._lock = threading.Lock()
+        self._queries = {}              # sql text -> [count, total ns, max ns, buckets]
+        self._ops = {}                  # @timed name -> same
+        self._slow = collections.deque(maxlen=int(slow_max))
+        self._plans = {}                # sql text -> plan lines
+        self._local = threading.local()
+        self._started = _now()
+        self._stop = threading.Event()
+        self._closed = False
+        if self.interval > 0 and (file or url):
+            threading.Thread(target=self._export_loop, name="rims-metrics", daemon=True).start()
+        if file or url:
+            atexit.register(self.close)
+
+    def __repr__(self):
+        return f"QueryMetrics(slow_ms={self.slow_ms:g}, file={self.file!r}, url={self.url!r})"
+
+    # ---------- recording ----------
+    def _add(self, table, key, ns):
+        with self._lock:
+            s = table.get(key)
+            if s is None:
+                s = table[key] = [0, 0, 0, [0] * BUCKETS]
+            s[0] += 1
+            s[1] += ns
+            if ns > s[2]:
+                s[2] = ns
+            s[3][min(ns.bit_length(), BUCKETS - 1)] += 1
+
+    def record(self, conn, sql, ns, params=None):
+        """One finished statement: ``ns`` nanoseconds on ``conn``."""
+        self._add(self._queries, sql, ns)
+        if ns >= self._slow_ns:
+            self._log_slow(conn, sql, ns, params)
+
+    def _log_slow(self, conn, sql, ns, params):
+        plan = self._plans.get(sql)
+        if plan is None and self.explain and conn is not None and sql.lstrip()[:7].upper().startswith(PLAN_VERBS):
+            plan = self._plans[sql] = self._explain(conn, sql, params)
+        entry = dict(at=_now(), ms=ns / 1e6, sql=" ".join(sql.split()), op=getattr(self._local, "op", None),
+                     thread=threading.current_thread().name, plan=plan)
+        if self.log_params and params is not None:
+            entry["params"] = repr(params)[:500]
+        with self._lock:
+            self._slow.append(entry)
+
+    @staticmethod
+    def _explain(conn, sql, params):
+        try:
+            rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql,
+                                              params if params is not None else ()).fetchall()
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            return [f"(no plan: {e})"]
+        return [row[-1] for row in rows]
+
+    def begin(self, name):
+        """Start timing operation ``name`` on this thread; pass the result to end()."""
+        prev = getattr(self._local, "op", None)
+        self._local.op = name
+        return name, prev, perf_counter_ns()
+
+    def end(self, token):
+        name, prev, t = token
+        self._add(self._ops, name, perf_counter_ns() - t)
+        self._local.op = prev
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._ops.clear()
+            self._slow.clear()
+        self._started = _now()
+
+    # ---------- reading / export ----------
+    def snapshot(self):
+        """JSON-ready dict: operations and queries (slowest total first) and the slow log."""
+        with self._lock:
+            queries = [(k, v[0], v[1], v[2], list(v[3])) for k, v in self._queries.items()]
+            ops = [(k, v[0], v[1], v[2], list(v[3])) for k, v in self._ops.items()]
+            slow = list(self._slow)
+        merged = {}
+        for sql, count, total, peak, buckets in queries:
+            # the same statement built by different f-strings / indents is one query
+            m = merged.setdefault(" ".join(sql.split()), [0, 0, 0, [0] * BUCKETS])
+            m[0] += count
+            m[1] += total
+            m[2] = max(m[2], peak)
+            m[3] = [a + b for a, b in zip(m[3], buckets)]
+        return dict(pid=os.getpid(), started=self._started, taken=_now(), slow_ms=self.slow_ms,
+                    operations=sorted((dict(name=k, **_summary(*v)) for k, *v in ops),
+                                      key=lambda d: -d["total_ms"]),
+                    queries=sorted((dict(sql=k, **_summary(*v)) for k, v in merged.items()),
+                                   key=lambda d: -d["total_ms"]),
+                    slow=slow)
+
+    def export(self, file=None, url=None):
+        """Write a snapshot to ``file`` (atomically) and/or POST it to ``url``
+        (default: the ones configured)."""
+        file, url = file or self.file, url or self.url
+        data = json.dumps(self.snapshot(), indent=1).encode()
+        if file:
+            tmp = f"{file}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, file)
+        if url:
+            import urllib.request       # not at import time: it pulls in http.client, email, ...
+            req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                resp.read()
+
+    def _export_quietly(self):
+        try:
+            self.export()
+            self.export_error = None
+        except (OSError, ValueError) as e:      # a full disk / a down collector must not break the app
+            self.export_error = f"{type(e).__name__}: {e}"
+
+    def _export_loop(self):
+        while not self._stop.wait(self.interval):
+            self._export_quietly()
+
+    def close(self):
+        """Stop periodic export and write the final snapshot."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        if self.file or self.url:
+            self._export_quietly()
+
+
+# ---------- instrumented sqlite3 classes ----------
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times each statement from execute() to the fetch that finishes it; the
+    timing is recorded at the next execute(), close(), a fetchall(), a short
+    fetchmany() or when the cursor is dropped."""
+
+    _sql = None
+
+    def _finish(self):
+        sql = self._sql
+        if sql is not None:
+            self._sql = None
+            conn = self.connection
+            conn.metrics.record(conn, sql, self._ns, self._params)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        t = perf_counter_ns()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._sql, self._params, self._ns = sql, parameters, perf_counter_ns() - t
+        if self.description is None:        # nothing to fetch: done
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        t = perf_counter_ns()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._sql, self._params, self._ns = sql, None, perf_counter_ns() - t
+            self._finish()
+        return self
+
+    def fetchone(self):
+        t = perf_counter_ns()
+        try:
+            return super().fetchone()
+        finally:
+            if self._sql is not None:
+                self._ns += perf_counter_ns() - t
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        t = perf_counter_ns()
+        rows = []
+        try:
+            rows = super().fetchmany(size)
+            return rows
+        finally:
+            if self._sql is not None:
+                self._ns += perf_counter_ns() - t
+                if len(rows) < size:
+                    self._finish()
+
+    def fetchall(self):
+        t = perf_counter_ns()
+        try:
+            return super().fetchall()
+        finally:
+            if self._sql is not None:
+                self._ns += perf_counter_ns() - t
+                self._finish()
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.Connection recording its statements into ``self.metrics``."""
+
+    metrics = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        t = perf_counter_ns()
+        try:
+            return super().executescript(script)
+        finally:
+            self.metrics.record(None, script, perf_counter_ns() - t)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        t = perf_counter_ns()
+        try:
+            return super().commit()
+        finally:
+            self.metrics.record(None, "COMMIT", perf_counter_ns() - t)
+
+    def rollback(self):
+        if not self.in_transaction:
+            return super().rollback()
+        t = perf_counter_ns()
+        try:
+            return super().rollback()
+        finally:
+            self.metrics.record(None, "ROLLBACK", perf_counter_ns() - t)
+
+
+def timed(name):
+    """Decorator for data-layer methods on objects with a ``pool``: times the
+    call as operation ``name`` when the pool has metrics on."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def call(self, *args, **kwargs):
+            m = self.pool.metrics
+            if m is None:
+                return fn(self, *args, **kwargs)
+            token = m.begin(name)
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                m.end(token)
+        return call
+    return wrap
+
+
+# ---------- switching it on ----------
+def _kwargs(setting):
+    out = dict(setting)
+    for key, conv in (("slow_ms", float), ("slow_max", int), ("interval", float)):
+        if key in out:
+            out[key] = conv(out[key])
+    for key in ("explain", "log_params"):
+        if isinstance(out.get(key), str):
+            out[key] = out[key].lower() not in ("0", "off", "no", "false")
+    return out
+
+
+def from_setting(pool, setting=None):
+    """Turn metrics on for connections ``pool`` opens from now on; returns
+    the pool's QueryMetrics, or None when off.
+
+    ``setting`` is False/None (off), True (defaults), a QueryMetrics, a dict
+    of QueryMetrics arguments or a string such as "slow_ms=50,file=m.json";
+    None falls back to $RIMS_METRICS ("1"/"on" for the defaults). A pool that
+    already has metrics keeps them.
+    """
+    if pool.metrics is not None:
+        return pool.metrics
+    if setting is None:
+        setting = os.environ.get("RIMS_METRICS") or False
+    if isinstance(setting, str):
+        text = setting.strip()
+        if text.lower() in ("", "0", "off", "no", "false"):
+            return None
+        setting = True if text.lower() in ("1", "on", "yes", "true") else _parse_overrides(text)
+    if not setting:
+        return None
+    if not isinstance(setting, QueryMetrics):
+        setting = QueryMetrics(**({} if setting is True else _kwargs(setting)))
+    pool.metrics = setting
+    return setting
+
+
+# ---------- CLI ----------
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.metrics", description="Summarise a metrics file")
+    ap.add_argument("command", choices=("show",))
+    ap.add_argument("file")
+    ap.add_argument("--top", type=int, default=10, help="operations/queries to list")
+    args = ap.parse_args(argv)
+
+    with open(args.file) as f:
+        snap = json.load(f)
+    print(f"pid {snap['pid']}, {snap['started']} .. {snap['taken']}, slow over {snap['slow_ms']:g} ms")
+    for title, rows, key in (("operations", snap["operations"], "name"), ("queries", snap["queries"], "sql")):
+        print(f"\n{title} by total time")
+        print(f"{'count':>8s} {'total ms':>10s} {'p50 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}  {key}")
+        for r in rows[:args.top]:
+            print(f"{r['count']:>8,d} {r['total_ms']:>10.1f} {r.get('p50_ms', 0):>8.2f} {r.get('p99_ms', 0):>8.2f} "
+                  f"{r['max_ms']:>8.2f}  {r[key][:90]}")
+    print(f"\nslow log ({len(snap['slow'])} entries, newest last)")
+    for e in snap["slow"][-args.top:]:
+        print(f"  {e['at']}  {e['ms']:9.1f} ms  {e['op'] or '-'}  {e['sql'][:80]}")
+        for line in e["plan"] or ():
+            print(f"      {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+# rims/migrations.py
+# Versioned schema migrations for rental_inventory.db, tracked in `schema_version`.
+#
+# Each migration runs in its own BEGIN IMMEDIATE transaction (so two terminals
+# starting at once cannot both apply it) and, before committing, proves with
+# EXPLAIN QUERY PLAN that the hot queries it targets actually use its indexes.
+#
+#   python -m rims.migrations status rental_inventory.db
+#   python -m rims.migrations up rental_inventory.db
+#   python -m rims.migrations verify rental_inventory.db
+
+import argparse
+import sqlite3
+
+from . import aggregates, availability, catalog, lookup, receipts, search
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+class PlanCheck:
+    """An EXPLAIN QUERY PLAN assertion: ``sql`` must use ``index`` and, when
+    ``no_temp_btree`` is set, must not fall back to a temp B-tree sort."""
+
+    def __init__(self, sql, index, params=(), no_temp_btree=False):
+        self.sql = sql
+        self.index = index
+        self.params = params
+        self.no_temp_btree = no_temp_btree
+
+    def run(self, conn):
+        plan = explain(conn, self.sql, self.params)
+        text = "\n".join(plan)
+        if self.index not in text:
+            raise MigrationError(f"query does not use {self.index}:\n  {self.sql}\nplan:\n  {text}")
+        if self.no_temp_btree and "USE TEMP B-TREE" in text:
+            raise MigrationError(f"query still sorts in a temp B-tree:\n  {self.sql}\nplan:\n  {text}")
+        return plan
+
+
+class Migration:
+    """One schema step: ``statements`` (SQL strings) and/or ``fn(conn)``, plus
+    the PlanChecks that must pass before it is committed."""
+
+    def __init__(self, version, name, statements=(), fn=None, checks=()):
+        self.version = version
+        self.name = name
+        self.statements = tuple(statements)
+        self.fn = fn
+        self.checks = tuple(checks)
+
+    def apply(self, conn):
+        for sql in self.statements:
+            conn.execute(sql)
+        if self.fn is not None:
+            self.fn(conn)
+
+    def verify(self, conn):
+        for check in self.checks:
+            check.run(conn)
+
+
+HISTORY_SQL = ("SELECT rental_id, receipt_ref, product_type, no_days, total, created_date "
+               "FROM rentals ORDER BY created_date DESC")
+
+MIGRATIONS = [
+    Migration(1, "rentals_history_index",
+              ["CREATE INDEX IF NOT EXISTS idx_rentals_created ON rentals(created_date, rental_id)"],
+              checks=[PlanCheck(HISTORY_SQL, "idx_rentals_created", no_temp_btree=True),
+                      PlanCheck("SELECT date(created_date), COUNT(*) FROM rentals "
+                                "WHERE created_date >= date('now','-30 day') GROUP BY date(created_date)",
+                                "idx_rentals_created")]),
+    Migration(2, "rentals_analytics_covering_index",
+              ["CREATE INDEX IF NOT EXISTS idx_rentals_type_created_total "
+               "ON rentals(product_type, created_date, total)"],
+              checks=[PlanCheck("SELECT product_type, COUNT(*), SUM(total) FROM rentals GROUP BY product_type",
+                                "COVERING INDEX idx_rentals_type_created_total", no_temp_btree=True)]),
+    Migration(3, "rentals_product_code_index",
+              ["CREATE INDEX IF NOT EXISTS idx_rentals_product_code ON rentals(product_code)"],
+              checks=[PlanCheck("SELECT rental_id FROM rentals WHERE product_code=?",
+                                "idx_rentals_product_code", params=("CAR452",))]),
+    Migration(4, "customers_created_index",
+              ["CREATE INDEX IF NOT EXISTS idx_customers_created ON customers(created_date)"],
+              checks=[PlanCheck("SELECT customer_id, customer_name, phone, email, address "
+                                "FROM customers ORDER BY created_date DESC",
+                                "idx_customers_created", no_temp_btree=True)]),
+    # no-op (LIKE fallback) when this SQLite build lacks FTS5; `python -m rims.search rebuild` later
+    Migration(5, "fts_search_index", fn=search.install),
+    # trigger-maintained per day / product type / payment method totals for the dashboards
+    Migration(6, "analytics_aggregates", fn=aggregates.install,
+              checks=[PlanCheck("SELECT day, rentals, revenue FROM rentals_daily "
+                                "WHERE day >= date('now','-30 day') ORDER BY day",
+                                "PRIMARY KEY", no_temp_btree=True)]),
+    # date-interval bookings per product_code (R*Tree index when compiled in)
+    Migration(7, "reservations", fn=availability.install,
+              checks=[PlanCheck("SELECT quantity FROM reservations WHERE product_code=? AND start_date<?",
+                                "idx_reservations_code_start", params=("CAR452", "2025-01-01"))]),
+    # counter-backed receipt refs (BILL-000001, ...) allocated inside the insert transaction
+    Migration(8, "receipt_sequence", fn=receipts.install),
+    # products change counter, polled by the cached product catalog (rims/catalog.py)
+    Migration(9, "products_change_counter", fn=catalog.install),
+    # normalized name/phone/email indexes (+ FTS5 trigram substrings) for the rental form's customer picker
+    Migration(10, "customer_lookup_index", fn=lookup.install,
+              checks=[PlanCheck(f"SELECT customer_id FROM customers WHERE {e} >= ? AND {e} < ? ORDER BY {e}",
+                                index, params=("a", "b"), no_temp_btree=True)
+                      for index, e in ((i, lookup.expr(t)) for i, t in lookup.INDEXES)]),
+]
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for ``sql``."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def _ensure_table(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_version(
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""")
+
+
+def current_version(conn):
+    _ensure_table(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def pending(conn, migrations=None):
+    done = current_version(conn)
+    return [m for m in (migrations or MIGRATIONS) if m.version > done]
+
+
+def migrate(conn, migrations=None, target=None):
+    """Apply every pending migration (up to ``target``) and return the versions
+    applied. Must be called outside an open transaction."""
+    if conn.in_transaction:
+        raise MigrationError("migrate() needs a connection with no open transaction")
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+    _ensure_table(conn)
+    done = {v for (v,) in conn.execute("SELECT version FROM schema_version")}
+    applied = []
+    for m in migrations:
+        if target is not None and m.version > target:
+            break
+        if m.version in done:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have got here first while we waited for the lock
+            if conn.execute("SELECT 1 FROM schema_version WHERE version=?", (m.version,)).fetchone():
+                conn.rollback()
+                continue
+            m.apply(conn)
+            m.verify(conn)
+            conn.execute("INSERT INTO schema_version(version, name) VALUES(?, ?)", (m.version, m.name))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(m.version)
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
+
+
+def verify(conn, migrations=None):
+    """Re-run the plan checks of every applied migration; returns {version: plan lines}."""
+    done = current_version(conn)
+    out = {}
+    for m in migrations or MIGRATIONS:
+        if m.version <= done:
+            out[m.version] = [line for check in m.checks for line in check.run(conn)]
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.migrations")
+    ap.add_argument("command", choices=("status", "up", "verify"))
+    ap.add_argument("db", nargs="?", default="rental_inventory.db")
+    ap.add_argument("--target", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "up":
+            print("applied:", migrate(conn, target=args.target) or "nothing")
+        elif args.command == "verify":
+            for version, plan in verify(conn).items():
+                print(f"v{version}: " + "; ".join(plan))
+        print(f"schema version {current_version(conn)}; pending: "
+              + (", ".join(f"{m.version}:{m.name}" for m in pending(conn)) or "none"))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+# rims/paging.py
+# Keyset (seek) pagination over rentals ordered newest-first by
+# (created_date, rental_id), backed by idx_rentals_created.
+#
+# Pages are fetched with "WHERE (created_date, rental_id) < (last key)" instead
+# of OFFSET, so paging on from a page already seen costs the same as page 1.
+# Only a handful of pages are kept in memory (LRU); the start key of every page
+# seen so far is remembered so scrolling back is a single seek too.
+#
+# A far jump (scrollbar drag) to a page with no known start key still has to
+# find one: it steps over the rows in between with LIMIT 1 OFFSET n, starting
+# from the nearest key known. That is O(distance) steps through
+# idx_rentals_created (reading only the index when there is no filter). After
+# the jump, the pages around the new position are cheap again.
+#
+# Queries may run on a worker thread while the Tk thread reads the cache with
+# peek() / known_count(), which never touch the database.
+
+import threading
+from collections import OrderedDict
+
+HISTORY_COLUMNS = ("rental_id", "receipt_ref", "product_type", "no_days", "total", "created_date")
+KEY_COLUMNS = ("created_date", "rental_id")
+
+
+class KeysetPager:
+    """Newest-first pages of ``columns`` from ``table``.
+
+    ``where``/``params`` optionally filter the rows (e.g. a search). Rows are
+    returned as tuples of ``columns``.
+    """
+
+    def __init__(self, pool, columns=HISTORY_COLUMNS, table="rentals", where="", params=(),
+                 page_size=100, cache_pages=8, keys=KEY_COLUMNS):
+        self.pool = pool
+        self.columns = tuple(columns)
+        self.table = table
+        self.where = where
+        self.params = tuple(params)
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.keys = tuple(keys)
+        self._pages = OrderedDict()     # page no -> rows
+        self._anchors = {0: None}       # page no -> key of the row just before it
+        self._count = None
+        self._lock = threading.Lock()   # guards _pages against peek() from another thread
+        self.stats = dict(queries=0, cache_hits=0, seeks=0)
+
+    # ---------- SQL ----------
+    def _select(self, cols, after, limit, offset=0):
+        keys = ", ".join(self.keys)
+        conds = [f"({self.where})"] if self.where else []
+        params = list(self.params)
+        if after is not None:
+            conds.append(f"({keys}) < ({', '.join('?' * len(self.keys))})")
+            params.extend(after)
+        order = ", ".join(f"{k} DESC" for k in self.keys)
+        sql = (f"SELECT {', '.join(cols)} FROM {self.table}"
+               + (" WHERE " + " AND ".join(conds) if conds else "")
+               + f" ORDER BY {order} LIMIT ?")
+        params.append(limit)
+        if offset:
+            sql += " OFFSET ?"
+            params.append(offset)
+        with self.pool.connect() as c:
+            self.stats["queries"] += 1
+            return c.execute(sql, params).fetchall()
+
+    # ---------- public ----------
+    def count(self):
+        if self._count is None:
+            sql = f"SELECT COUNT(*) FROM {self.table}" + (f" WHERE {self.where}" if self.where else "")
+            with self.pool.connect() as c:
+                self._count = c.execute(sql, self.params).fetchone()[0]
+        return self._count
+
+    def known_count(self):
+        """The row count if it has been read already, else None (no query)."""
+        return self._count
+
+    def page_count(self):
+        n = self.count()
+        return (n + self.page_size - 1) // self.page_size
+
+    def invalidate(self):
+        """Forget cached pages/anchors (call after the underlying rows change)."""
+        with self._lock:
+            self._pages.clear()
+        self._anchors = {0: None}
+        self._count = None
+
+    def cached(self, page_no):
+        return page_no in self._pages
+
+    def page(self, page_no):
+        """Rows of page ``page_no`` (0-based)."""
+        if page_no < 0 or (self._count is not None and page_no >= max(self.page_count(), 1)):
+            return []
+        with self._lock:
+            rows = self._pages.get(page_no)
+            if rows is not None:
+                self._pages.move_to_end(page_no)
+        if rows is not None:
+            self.stats["cache_hits"] += 1
+            return rows
+        after = self._anchor_for(page_no)
+        if page_no > 0 and after is None:
+            return []       # past the end
+        nk = len(self.keys)
+        raw = self._select(self.columns + self.keys, after, self.page_size)
+        rows = [r[:-nk] for r in raw]
+        if raw:
+            self._anchors[page_no + 1] = raw[-1][-nk:]
+        with self._lock:
+            self._pages[page_no] = rows
+            while len(self._pages) > self.cache_pages:
+                self._pages.popitem(last=False)
+        return rows
+
+    def rows(self, start, stop):
+        """Rows ``start``..``stop`` (exclusive) in display order."""
+        if stop <= start:
+            return []
+        ps = self.page_size
+        out = []
+        for p in range(start // ps, (stop - 1) // ps + 1):
+            out.extend(self.page(p))
+        first = (start // ps) * ps
+        return out[start - first:stop - first]
+
+    def peek(self, start, stop):
+        """Like rows(), but only from the cache: None when a page in the range
+        has not been loaded (or the count is not known yet). Never queries."""
+        if self._count is None:
+            return None
+        stop = min(stop, self._count)
+        if stop <= start:
+            return []
+        ps = self.page_size
+        out = []
+        with self._lock:
+            for p in range(start // ps, (stop - 1) // ps + 1):
+                rows = self._pages.get(p)
+                if rows is None:
+                    return None
+                out.extend(rows)
+        first = (start // ps) * ps
+        return out[start - first:stop - first]
+
+    def prefetch(self, page_no):
+        """Load a neighbouring page into the cache if it is not there yet."""
+        if page_no >= 0 and not self.cached(page_no) and page_no < self.page_count():
+            self.page(page_no)
+
+    def _anchor_for(self, page_no):
+        if page_no in self._anchors:
+            return self._anchors[page_no]
+        known = max(p for p in self._anchors if p < page_no)
+        if page_no - known <= 2:
+            # close by: walk forward, caching the pages on the way
+            for p in range(known, page_no):
+                self.page(p)
+            return self._anchors.get(page_no)
+        # far jump (scrollbar drag): seek to the nearest anchor, then OFFSET over the
+        # rows in between - O(skip) index steps, but no rows are fetched for them
+        self.stats["seeks"] += 1
+        skip = (page_no - known) * self.page_size - 1
+        row = self._select(self.keys, self._anchors[known], 1, offset=skip)
+        key = tuple(row[0]) if row else None
+        self._anchors[page_no] = key
+        return key
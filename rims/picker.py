@@ -0,0 +1,74 @@
+# rims/picker.py
+# Type-ahead customer picker for the rental forms: an editable combobox whose
+# drop-down holds the customers matching what has been typed (name, phone or
+# email - see rims/lookup.py). Lookups run on the task executor, debounced and
+# coalesced under one key, so fast typing costs one query per pause. Picking an
+# entry sets ``customer_id``; editing the text afterwards clears it again.
+#
+#   picker = CustomerPicker(frame, db.find_customers, tasks, width=30)
+#   picker.grid(row=2, column=1); ...; save(customer_id=picker.customer_id); picker.clear()
+
+import tkinter as tk
+from tkinter import ttk
+
+from .lookup import label
+
+
+class CustomerPicker(ttk.Combobox):
+    """Editable combobox of ``find(text)`` rows ((customer_id, name, phone, email, ...))."""
+
+    def __init__(self, parent, find, tasks, delay_ms=150, key="customer-lookup", **options):
+        self.var = tk.StringVar(parent)
+        super().__init__(parent, textvariable=self.var, state="normal", **options)
+        self.find = find
+        self.tasks = tasks
+        self.delay_ms = delay_ms
+        self.key = key
+        self.customer_id = None
+        self._rows = []
+        self._job = None
+        self._quiet = False
+        self.var.trace_add("write", lambda *_: self._edited())
+        self.bind("<<ComboboxSelected>>", self._selected, add="+")
+
+    def clear(self):
+        self._cancel()
+        self._quiet = True
+        try:
+            self.var.set("")
+        finally:
+            self._quiet = False
+        self._rows = []
+        self.configure(values=())
+        self.customer_id = None
+
+    # ---------- typing ----------
+    def _edited(self):
+        if self._quiet:
+            return
+        self.customer_id = None
+        self._cancel()
+        self._job = self.after(self.delay_ms, self._search)
+
+    def _cancel(self):
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+
+    def _search(self):
+        self._job = None
+        text = self.var.get().strip()
+        if not text:
+            self._show([])
+            return
+        self.tasks.submit(self.find, text, key=self.key, on_done=self._show)
+
+    def _show(self, rows):
+        self._rows = list(rows)
+        self.configure(values=[label(r) for r in self._rows])
+
+    def _selected(self, event=None):
+        # the combobox has already written the label into the text (and _edited ran)
+        self._cancel()
+        i = self.current()
+        self.customer_id = self._rows[i][0] if 0 <= i < len(self._rows) else None
@@ -0,0 +1,229 @@
+# rims/pool.py
+# Shared SQLite connection manager used by both V1.0 (DatabaseManager) and V1.1 (DB).
+#
+# Every thread gets one long-lived connection that is reused for all of its
+# statements; background workers can borrow from a small bounded pool instead.
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionManager:
+    """Keeps SQLite connections open and hands them out for reuse.
+
+    * ``connect()``  - context manager over the calling thread's own connection.
+    * ``pooled()``   - context manager that borrows a connection from a bounded
+      pool (for worker threads that come and go).
+
+    Both commit on a clean exit and roll back on an exception. Nested blocks on
+    the same connection only commit when the outermost block exits.
+    """
+
+    def __init__(self, path, pool_size=4, timeout=5.0):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._thread_conns = {}          # thread id -> connection
+        self._idle = queue.LifoQueue()   # idle pooled connections
+        self._pool_count = 0
+        self._hooks = {}
+        self.metrics = None              # a rims.metrics.QueryMetrics times new connections' statements
+        self._depth = {}                 # id(conn) -> nesting depth
+        self._stats = dict(opened=0, closed=0, thread_hits=0,
+                           pool_checkouts=0, pool_hits=0, pool_waits=0)
+
+    # ---------- hooks ----------
+    def add_connect_hook(self, fn, key=None):
+        """Call ``fn(conn)`` on every connection opened from now on (and on the
+        ones already open and not checked out). A hook registered again under
+        the same ``key`` replaces the previous one."""
+        with self._lock:
+            self._hooks[key if key is not None else fn] = fn
+            live = list(self._thread_conns.values()) + list(self._idle.queue)
+        for c in live:
+            fn(c)
+
+    def _open(self):
+        if self.metrics is None:
+            c = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        else:
+            from .metrics import InstrumentedConnection
+            c = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                                factory=InstrumentedConnection)
+            c.metrics = self.metrics
+        for fn in list(self._hooks.values()):
+            fn(c)
+        with self._lock:
+            self._stats["opened"] += 1
+        return c
+
+    # ---------- per-thread connection ----------
+    def connection(self):
+        """Return the calling thread's long-lived connection (opened on first use)."""
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = self._open()
+            self._local.conn = c
+            with self._lock:
+                self._thread_conns[threading.get_ident()] = c
+        else:
+            with self._lock:
+                self._stats["thread_hits"] += 1
+        return c
+
+    @contextmanager
+    def connect(self, immediate=False):
+        """``with manager.connect() as conn:`` on the thread's own connection.
+        ``immediate=True`` takes the write lock up front (BEGIN IMMEDIATE), for
+        read-check-write sequences that must not interleave with other writers."""
+        c = self.connection()
+        with self._transaction(c, immediate):
+            yield c
+
+    # ---------- bounded worker pool ----------
+    def _checkout(self, timeout=None):
+        try:
+            c = self._idle.get_nowait()
+            with self._lock:
+                self._stats["pool_checkouts"] += 1
+                self._stats["pool_hits"] += 1
+            return c
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self._pool_count < self.pool_size
+            if grow:
+                self._pool_count += 1
+            else:
+                self._stats["pool_waits"] += 1
+        if grow:
+            try:
+                c = self._open()
+            except Exception:
+                with self._lock:
+                    self._pool_count -= 1
+                raise
+            with self._lock:
+                self._stats["pool_checkouts"] += 1
+            return c
+        try:
+            c = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no pooled connection free after {timeout}s") from None
+        with self._lock:
+            self._stats["pool_checkouts"] += 1
+            self._stats["pool_hits"] += 1
+        return c
+
+    def _checkin(self, c):
+        if c.in_transaction:
+            c.rollback()
+        self._idle.put(c)
+
+    @contextmanager
+    def pooled(self, timeout=None):
+        """Borrow a connection from the bounded pool; blocks while all are in use."""
+        c = self._checkout(timeout)
+        try:
+            with self._transaction(c):
+                yield c
+        finally:
+            self._checkin(c)
+
+    # ---------- transactions ----------
+    @contextmanager
+    def _transaction(self, c, immediate=False):
+        key = id(c)
+        depth = self._depth.get(key, 0)
+        if depth == 0 and immediate and not c.in_transaction:
+            c.execute("BEGIN IMMEDIATE")
+        self._depth[key] = depth + 1
+        try:
+            yield c
+        except BaseException:
+            if depth == 0 and c.in_transaction:
+                c.rollback()
+            raise
+        else:
+            if depth == 0 and c.in_transaction:
+                c.commit()
+        finally:
+            if depth == 0:
+                self._depth.pop(key, None)
+            else:
+                self._depth[key] = depth
+
+    # ---------- housekeeping ----------
+    def stats(self):
+        """Connection-reuse counters; ``reuse_ratio`` is hits / (hits + opens)."""
+        with self._lock:
+            s = dict(self._stats)
+            s["thread_connections"] = len(self._thread_conns)
+            s["pool_size"] = self.pool_size
+            s["pool_open"] = self._pool_count
+        hits = s["thread_hits"] + s["pool_hits"]
+        s["reuse_ratio"] = hits / (hits + s["opened"]) if (hits + s["opened"]) else 0.0
+        return s
+
+    def close_thread(self):
+        """Close the calling thread's connection (e.g. when a worker exits)."""
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            self._thread_conns.pop(threading.get_ident(), None)
+            self._stats["closed"] += 1
+        c.close()
+
+    def close_all(self):
+        """Close every connection this manager opened."""
+        with self._lock:
+            conns = list(self._thread_conns.values())
+            self._thread_conns.clear()
+            self._local = threading.local()
+        while True:
+            try:
+                conns.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            self._pool_count = 0
+            self._stats["closed"] += len(conns)
+        for c in conns:
+            c.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close_all()
+
+
+# ---------- shared registry ----------
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(path="rental_inventory.db", **kwargs):
+    """Return the process-wide manager for ``path`` so every DB wrapper pointed at
+    the same file shares one set of connections."""
+    key = path if path == ":memory:" else os.path.abspath(path)
+    with _managers_lock:
+        m = _managers.get(key)
+        if m is None:
+            m = _managers[key] = ConnectionManager(path, **kwargs)
+        return m
+
+
+def close_all_managers():
+    with _managers_lock:
+        ms = list(_managers.values())
+        _managers.clear()
+    for m in ms:
+        m.close_all()
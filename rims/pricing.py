@@ -0,0 +1,257 @@
+# rims/pricing.py
+# Rental pricing over batches of quotes: days x cost_per_day, less a discount,
+# plus TAX_RATE.
+#
+# Money is worked in integer pence and discounts in basis points, so every
+# rounding step is exact half-up (the same as Decimal ROUND_HALF_UP to the
+# penny) and subtotal + tax == total on every receipt. Inputs are columns
+# (sequences of codes/dates/discounts); batches of NUMPY_MIN or more run on
+# int64 arrays when NumPy is installed, everything else is plain Python integer
+# maths giving the identical results. NumPy is imported on the first such
+# batch, so the apps (one quote at a time) start without it.
+#
+#   subtotal = round(days * rate * (1 - discount%))
+#   tax      = round(subtotal * TAX_RATE)
+#   total    = subtotal + tax
+#
+#   python -m rims.pricing quote rental_inventory.db CAR452 2025-01-01 2025-01-08 --discount 5
+#   python -m rims.pricing requote rental_inventory.db
+
+import argparse
+import bisect
+import datetime
+import importlib.util
+import sqlite3
+import time
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+TAX_RATE = Decimal("0.15")
+PENNY = Decimal("0.01")
+# V1.0's day-range discounts: (from this many days, percent off)
+DISCOUNT_TIERS = ((1, 5), (31, 10), (91, 15), (271, 20))
+
+# smallest batch worth NumPy: below it building the arrays costs more than the loop saves
+NUMPY_MIN = 256
+
+Quote = namedtuple("Quote", "days rate discount subtotal tax total")
+
+_numpy = None
+
+
+def numpy_available():
+    """True when NumPy is installed (without importing it)."""
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _load_numpy():
+    # optional: the pure-Python path gives the same answers
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+# ---------- unit conversion ----------
+# (cached: a batch holds a handful of distinct rates, discounts and dates)
+@lru_cache(maxsize=4096)
+def to_pence(value):
+    """12 / 12.0 / '£12.50' / Decimal -> 1250 (half-up to the penny)."""
+    if isinstance(value, str):
+        value = value.replace("£", "").replace(",", "").strip() or "0"
+    return int((Decimal(str(value)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+@lru_cache(maxsize=4096)
+def to_bp(percent):
+    """5 / 5.0 / '5%' -> 500 basis points; None / '' / 'Select' -> 0."""
+    if percent is None:
+        return 0
+    if isinstance(percent, str):
+        percent = percent.replace("%", "").strip()
+        try:
+            Decimal(percent)
+        except ArithmeticError:
+            return 0
+    return int((Decimal(str(percent)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def pounds(pence):
+    """1250 -> Decimal('12.50')"""
+    return (Decimal(int(pence)) * PENNY).quantize(PENNY)
+
+
+@lru_cache(maxsize=65536)
+def _ordinal(d):
+    if isinstance(d, datetime.datetime):
+        return d.date().toordinal()
+    if isinstance(d, datetime.date):
+        return d.toordinal()
+    return datetime.date.fromisoformat(str(d)[:10]).toordinal()
+
+
+def _div_half_up(num, den):
+    # non-negative integers: round(num / den) with halves going up
+    return (num + den // 2) // den
+
+
+def tier_discount(days, tiers=DISCOUNT_TIERS):
+    """Percent off for a rental of ``days`` days (0 below the first tier)."""
+    i = bisect.bisect_right([t[0] for t in tiers], days)
+    return tiers[i - 1][1] if i else 0
+
+
+class PricingEngine:
+    """Quotes single rentals or whole columns of them.
+
+    ``tiers`` (e.g. DISCOUNT_TIERS) gives the discount for quotes that do not
+    carry their own; without tiers such quotes get none. ``use_numpy`` None
+    uses NumPy (if installed) for batches of NUMPY_MIN or more, True for every
+    batch, False never.
+    """
+
+    def __init__(self, tax_rate=TAX_RATE, tiers=None, use_numpy=None):
+        self.tax_bp = to_bp(Decimal(str(tax_rate)) * 100)
+        self.tiers = tuple(tiers or ())
+        self.use_numpy = use_numpy is not False and numpy_available()
+        self.numpy_min = NUMPY_MIN if use_numpy is None else 0
+
+    def _np(self, n):
+        """The numpy module for a batch of ``n`` quotes, or None for plain ints."""
+        return _load_numpy() if self.use_numpy and n >= self.numpy_min else None
+
+    # ---------- rates ----------
+    def rates(self, conn):
+        """{product_code: cost_per_day in pence} from `products`."""
+        return {code: to_pence(cpd) for code, cpd in
+                conn.execute("SELECT product_code, cost_per_day FROM products WHERE product_code IS NOT NULL")}
+
+    # ---------- one quote ----------
+    def quote(self, rate, start, end, discount=None):
+        """Price one rental of [start, end) at ``rate`` per day (pounds)."""
+        q = self.quote_many([to_pence(rate)], [start], [end], None if discount is None else [discount])
+        days, disc, sub, tax, total = (int(q[k][0]) for k in ("days", "discount_bp", "subtotal", "tax", "total"))
+        return Quote(days, pounds(to_pence(rate)), Decimal(disc) / 100, pounds(sub), pounds(tax), pounds(total))
+
+    # ---------- batches ----------
+    def days(self, starts, ends):
+        """Whole days in each [start, end), at least 1."""
+        np = self._np(len(starts))
+        if np is not None:
+            s = np.array([str(x)[:10] for x in starts], dtype="datetime64[D]")
+            e = np.array([str(x)[:10] for x in ends], dtype="datetime64[D]")
+            return np.maximum((e - s).astype(np.int64), 1)
+        return [max(1, _ordinal(e) - _ordinal(s)) for s, e in zip(starts, ends)]
+
+    def discounts(self, days, discounts=None):
+        """Basis points off for each quote: its own discount where given (not
+        None), else the tier for its number of days."""
+        np = self._np(len(days))
+        if self.tiers:
+            bounds = [t[0] for t in self.tiers]
+            pcts = [0] + [t[1] * 100 for t in self.tiers]
+            if np is not None:
+                tiered = np.array(pcts, dtype=np.int64)[np.searchsorted(np.array(bounds), days, side="right")]
+            else:
+                tiered = [pcts[bisect.bisect_right(bounds, d)] for d in days]
+        else:
+            tiered = np.zeros(len(days), dtype=np.int64) if np is not None else [0] * len(days)
+        if discounts is None:
+            return tiered
+        bp = [to_bp(d) if d is not None else int(t) for d, t in zip(discounts, tiered)]
+        return np.array(bp, dtype=np.int64) if np is not None else bp
+
+    def quote_many(self, rates, starts, ends, discounts=None):
+        """Price columns of quotes. ``rates`` are pence per day (see rates()),
+        ``discounts`` percents (or None for the tiers). Returns a dict of
+        columns (lists, or int64 arrays on the NumPy path): days, discount_bp,
+        subtotal, tax, total - money in pence."""
+        days = self.days(starts, ends)
+        bp = self.discounts(days, discounts)
+        np = self._np(len(days))
+        if np is not None:
+            gross = np.asarray(rates, dtype=np.int64) * days * (10000 - bp)
+            sub = (gross + 5000) // 10000
+            tax = (sub * self.tax_bp + 5000) // 10000
+            return dict(days=days, discount_bp=bp, subtotal=sub, tax=tax, total=sub + tax)
+        sub = [_div_half_up(r * d * (10000 - b), 10000) for r, d, b in zip(rates, days, bp)]
+        tax = [_div_half_up(s * self.tax_bp, 10000) for s in sub]
+        return dict(days=days, discount_bp=bp, subtotal=sub, tax=tax,
+                    total=[s + t for s, t in zip(sub, tax)])
+
+    # ---------- whole-table jobs ----------
+    def price_list(self, conn, start, end, discount=None):
+        """Quote every product for [start, end): [(product_code, Quote), ...]."""
+        rates = self.rates(conn)
+        codes = sorted(rates)
+        q = self.quote_many([rates[c] for c in codes], [start] * len(codes), [end] * len(codes),
+                            None if discount is None else [discount] * len(codes))
+        return [(code, Quote(int(q["days"][i]), pounds(rates[code]), Decimal(int(q["discount_bp"][i])) / 100,
+                             pounds(q["subtotal"][i]), pounds(q["tax"][i]), pounds(q["total"][i])))
+                for i, code in enumerate(codes)]
+
+    def requote_open(self, conn, today=None):
+        """Re-price every rental still running (booked in `reservations` past
+        ``today``) at the current product rates. Returns a list of
+        (rental_id, stored total, new total) in pounds."""
+        today = (today or datetime.date.today()).isoformat()
+        rows = conn.execute("""SELECT r.rental_id, p.cost_per_day, v.start_date, v.end_date, r.discount, r.total
+                               FROM reservations v
+                               JOIN rentals r ON r.rental_id = v.rental_id
+                               JOIN products p ON p.product_code = v.product_code
+                               WHERE v.end_date > ?""", (today,)).fetchall()
+        if not rows:
+            return []
+        ids, cpd, starts, ends, disc, stored = zip(*rows)
+        q = self.quote_many([to_pence(c) for c in cpd], starts, ends, disc)
+        return [(rid, old, pounds(new)) for rid, old, new in zip(ids, stored, q["total"])]
+
+
+def _line(code, q):
+    return f"{code:10s} {q.days:4d} days x £{q.rate} -{q.discount}% = £{q.subtotal} + £{q.tax} = £{q.total}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.pricing", description="Quote or re-quote rentals")
+    ap.add_argument("command", choices=("quote", "requote", "prices"))
+    ap.add_argument("db")
+    ap.add_argument("args", nargs="*", help="quote: CODE START END; prices: START END")
+    ap.add_argument("--discount", type=float, default=None, help="percent off (default: V1.0 day tiers)")
+    ap.add_argument("--python", action="store_true", help="skip the NumPy fast path")
+    args = ap.parse_args(argv)
+
+    engine = PricingEngine(tiers=DISCOUNT_TIERS, use_numpy=False if args.python else None)
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "quote":
+            code, start, end = args.args
+            rate = engine.rates(conn).get(code)
+            if rate is None:
+                print(f"{code}: not a known product")
+                return 1
+            print(_line(code, engine.quote(pounds(rate), start, end, args.discount)))
+        elif args.command == "prices":
+            start, end = args.args
+            for code, q in engine.price_list(conn, start, end, args.discount):
+                print(_line(code, q))
+        else:
+            t = time.perf_counter()
+            out = engine.requote_open(conn)
+            ms = (time.perf_counter() - t) * 1000
+            changed = [r for r in out if r[1] is None or abs(Decimal(str(r[1])) - r[2]) >= PENNY]
+            for rid, old, new in changed[:20]:
+                print(f"  rental {rid}: stored {old} -> {new}")
+            print(f"{len(out):,d} open rentals re-quoted in {ms:.1f} ms "
+                  f"({'numpy' if engine._np(len(out)) is not None else 'python'}); {len(changed):,d} differ")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
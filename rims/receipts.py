@@ -0,0 +1,84 @@
+# rims/receipts.py
+# Receipt references from a counter row in `sequences`, e.g. BILL-000042.
+#
+# The counter is bumped inside the caller's write transaction, so SQLite's
+# write lock hands every process sharing the database a distinct number: no
+# random draws and no birthday-bound collisions. The dash keeps these refs
+# apart from the old random ones (BILL123456), which stay valid.
+#
+# The counter only knows about refs this file handed out. Rentals merged in
+# from another branch's file (rims/bulk.py) carry that file's numbers, so
+# next_ref() checks its pick against the unique index. If the pick is taken,
+# sync() moves the counter past the highest BILL-n in rentals (one scan) and
+# it picks again.
+
+PREFIX = "BILL"
+WIDTH = 6
+
+
+def install(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS sequences(
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )""")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='rentals'").fetchone():
+        sync(conn)
+
+
+def highest(conn, prefix=PREFIX):
+    """Largest n among the counter-style refs (PREFIX-n) in rentals, 0 if none."""
+    return conn.execute("SELECT MAX(CAST(substr(receipt_ref, ?) AS INTEGER)) FROM rentals WHERE receipt_ref GLOB ?",
+                        (len(prefix) + 2, f"{prefix}-[0-9]*")).fetchone()[0] or 0
+
+
+def raise_to(conn, value, name="receipt"):
+    """Move counter ``name`` up to ``value`` (never down)."""
+    conn.execute("INSERT INTO sequences(name, value) VALUES(?, ?) "
+                 "ON CONFLICT(name) DO UPDATE SET value = max(value, excluded.value)", (name, value))
+
+
+def sync(conn, name="receipt", prefix=PREFIX):
+    """Move counter ``name`` past every counter-style ref already in rentals
+    (after rows came in from another file). Call inside a write transaction."""
+    raise_to(conn, highest(conn, prefix), name)
+
+
+def parse_ref(ref, prefix=PREFIX):
+    """'BILL-000042' -> 42; None for refs not from a counter."""
+    head, sep, digits = (ref or "").partition("-")
+    return int(digits) if sep and head == prefix and digits.isdigit() else None
+
+
+def next_value(conn, name="receipt"):
+    """Increment and return counter ``name``. Call inside a write transaction
+    (the UPDATE takes the write lock, the SELECT then sees our own row)."""
+    conn.execute("INSERT INTO sequences(name, value) VALUES(?, 1) "
+                 "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+    return conn.execute("SELECT value FROM sequences WHERE name=?", (name,)).fetchone()[0]
+
+
+def reserve_block(conn, n, name="receipt"):
+    """Advance counter ``name`` by ``n`` in one statement and return the first
+    of the ``n`` values now ours (bulk loads). Call inside a write transaction."""
+    conn.execute("INSERT INTO sequences(name, value) VALUES(?, ?) "
+                 "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, n))
+    return conn.execute("SELECT value FROM sequences WHERE name=?", (name,)).fetchone()[0] - n + 1
+
+
+def format_ref(n, prefix=PREFIX):
+    return f"{prefix}-{n:0{WIDTH}d}"
+
+
+def taken(conn, ref):
+    return conn.execute("SELECT 1 FROM rentals WHERE receipt_ref=?", (ref,)).fetchone() is not None
+
+
+def next_ref(conn, prefix=PREFIX):
+    """Allocate the next free receipt reference, e.g. 'BILL-000042'. Call
+    inside the write transaction that inserts it."""
+    ref = format_ref(next_value(conn, "receipt"), prefix)
+    if taken(conn, ref):
+        # rows merged from another file hold numbers ahead of this counter
+        sync(conn, "receipt", prefix)
+        ref = format_ref(next_value(conn, "receipt"), prefix)
+    return ref
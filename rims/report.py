@@ -0,0 +1,231 @@
+# rims/report.py
+# Streaming PDF reports (rental history) in constant memory.
+#
+#   rows:   a cursor read with fetchmany(batch), never fetchall()
+#   layout: Layout/Column place each row on the page, new page when full
+#   writer: PdfWriter appends every finished page straight to the file (only
+#           the byte offsets of its objects stay in memory); ReportLabWriter is
+#           available too but keeps every page in memory until save().
+#
+# export() is meant to run on a worker thread: ``progress(done, total)`` is
+# called once per batch and ``check()`` may raise to cancel (the partial file
+# is removed).
+
+import datetime
+import os
+import zlib
+
+LETTER = (612.0, 792.0)
+A4 = (595.2756, 841.8898)
+
+
+class Column:
+    def __init__(self, header, x, fmt=str):
+        self.header = header
+        self.x = x
+        self.fmt = fmt
+
+
+class Layout:
+    """Where things go on the page. Headers are repeated on every page."""
+
+    def __init__(self, title, columns, pagesize=LETTER, subtitle=None, margin=50,
+                 title_size=16, header_size=12, body_size=10, line_height=15):
+        self.title = title
+        self.columns = columns
+        self.pagesize = pagesize
+        self.subtitle = subtitle
+        self.margin = margin
+        self.title_size = title_size
+        self.header_size = header_size
+        self.body_size = body_size
+        self.line_height = line_height
+
+
+# ---------- writers ----------
+class PdfWriter:
+    """Minimal PDF writer (base-14 Helvetica, WinAnsi text) that streams pages to disk."""
+
+    FONTS = {False: "Helvetica", True: "Helvetica-Bold"}
+
+    def __init__(self, filename, pagesize=LETTER, compress=True):
+        self.filename = filename
+        self.pagesize = pagesize
+        self.compress = compress
+        self._f = open(filename, "wb")
+        self._offsets = [0, 0, 0, 0, 0]     # obj 1 catalog, 2 pages, 3/4 fonts
+        self._pages = []
+        self._ops = []
+        self.pages = 0
+        self._f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        for n, bold in ((3, False), (4, True)):
+            self._obj(n, b"<< /Type /Font /Subtype /Type1 /BaseFont /" + self.FONTS[bold].encode()
+                      + b" /Encoding /WinAnsiEncoding >>")
+
+    def _obj(self, n, body):
+        while len(self._offsets) <= n:
+            self._offsets.append(0)
+        self._offsets[n] = self._f.tell()
+        self._f.write(b"%d 0 obj\n" % n + body + b"\nendobj\n")
+
+    def _new_id(self):
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+
+    def start_page(self):
+        self._ops = []
+
+    def text(self, x, y, s, size=10, bold=False):
+        # page text is kept as str and encoded once per page
+        s = str(s)
+        if "(" in s or ")" in s or "\\" in s:
+            s = s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        self._ops.append("BT /F%d %g Tf %.2f %.2f Td (%s) Tj ET" % (4 if bold else 3, size, x, y, s))
+
+    def end_page(self):
+        data = "\n".join(self._ops).encode("cp1252", "replace")
+        self._ops = []
+        content, page = self._new_id(), self._new_id()
+        if self.compress:
+            data = zlib.compress(data)
+            self._obj(content, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        else:
+            self._obj(content, b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        w, h = self.pagesize
+        self._obj(page, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                        b"/Resources << /Font << /F3 3 0 R /F4 4 0 R >> >> /Contents %d 0 R >>" % (w, h, content))
+        self._pages.append(page)
+        self.pages += 1
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % p for p in self._pages)
+        self._obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)))
+        xref = self._f.tell()
+        self._f.write(b"xref\n0 %d\n0000000000 65535 f \n" % len(self._offsets))
+        for off in self._offsets[1:]:
+            self._f.write(b"%010d 00000 n \n" % off)
+        self._f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self._offsets), xref))
+        self._f.close()
+
+    def abort(self):
+        self._f.close()
+
+
+class ReportLabWriter:
+    """Same interface over a ReportLab canvas (pages are held until close())."""
+
+    def __init__(self, filename, pagesize=LETTER):
+        from reportlab.pdfgen import canvas
+        self.filename = filename
+        self._c = canvas.Canvas(filename, pagesize=pagesize, pageCompression=1)
+        self.pages = 0
+
+    def start_page(self):
+        pass
+
+    def text(self, x, y, s, size=10, bold=False):
+        self._c.setFont("Helvetica-Bold" if bold else "Helvetica", size)
+        self._c.drawString(x, y, str(s))
+
+    def end_page(self):
+        self._c.showPage()
+        self.pages += 1
+
+    def close(self):
+        self._c.save()
+
+    def abort(self):
+        pass
+
+
+WRITERS = {"stream": PdfWriter, "reportlab": ReportLabWriter}
+
+
+# ---------- pipeline ----------
+def iter_batches(conn, sql, params=(), batch=1000):
+    """Yield lists of up to ``batch`` rows from one cursor."""
+    cur = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cur.close()
+
+
+def export(conn, filename, sql, params=(), layout=None, count_sql=None, writer="stream",
+           batch=1000, progress=None, check=None):
+    """Write the rows of ``sql`` to ``filename``; returns (rows written, pages).
+    ``count_sql`` (same params) gives the total for ``progress``."""
+    total = conn.execute(count_sql, params).fetchone()[0] if count_sql else None
+    w = WRITERS[writer](filename, layout.pagesize)
+    bottom = layout.margin
+    done = 0
+    try:
+        y = _start_page(w, layout, first=True)
+        for rows in iter_batches(conn, sql, params, batch):
+            if check:
+                check()
+            for row in rows:
+                if y < bottom:
+                    w.end_page()
+                    y = _start_page(w, layout)
+                for col in layout.columns:
+                    w.text(col.x, y, col.fmt(row), layout.body_size)
+                y -= layout.line_height
+            done += len(rows)
+            if progress:
+                progress(done, total)
+        w.end_page()
+        w.close()
+    except BaseException:
+        w.abort()
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        raise
+    return done, w.pages
+
+
+def _start_page(w, layout, first=False):
+    width, height = layout.pagesize
+    x0, y = layout.margin, height - layout.margin
+    w.start_page()
+    if first:
+        w.text(x0, y, layout.title, layout.title_size, bold=True)
+        y -= layout.title_size + 4
+        if layout.subtitle:
+            w.text(x0, y, layout.subtitle, layout.title_size, bold=True)
+            y -= layout.title_size + 4
+        y -= layout.line_height + 16
+    for col in layout.columns:
+        w.text(col.x, y, col.header, layout.header_size, bold=True)
+    return y - layout.line_height - 5
+
+
+# ---------- the two rental-history layouts ----------
+def money(v):
+    return f"£{(v or 0):.2f}"
+
+
+def history_layout_v10():
+    """V1.0: Letter, one column per field."""
+    return Layout("Rental History Report", [
+        Column("Receipt Ref", 50, lambda r: str(r[0])),
+        Column("Product", 150, lambda r: str(r[1])),
+        Column("Days", 250, lambda r: str(r[2])),
+        Column("Total", 350, lambda r: money(r[3])),
+        Column("Date", 450, lambda r: str(r[4])[:10]),
+    ], pagesize=LETTER, subtitle=f"Generated on: {datetime.date.today()}")
+
+
+def history_layout_v11():
+    """V1.1: A4, one ' | '-joined line per rental."""
+    return Layout("Rental History", [
+        Column(" | ".join(["ID", "Receipt", "Product", "No.Days", "Total", "Date"]), 40,
+               lambda r: f"{r[0]} | {r[1]} | {r[2]} | {r[3]} | £{r[4]} | {r[5]}"),
+    ], pagesize=A4, margin=40, title_size=14, header_size=10, body_size=10, line_height=14)
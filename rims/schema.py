@@ -0,0 +1,106 @@
+# rims/schema.py
+# Canonical table layout shared by V1.0 and V1.1.
+#
+# Historically each version created its own `rentals` table and whichever ran
+# first won. The canonical layout keeps V1.0's column order (V1.0 still reads
+# rows positionally via SELECT *) with V1.1's column names, plus V1.0's extra
+# customer_id/app_date columns. rims/unify.py rewrites older files into it.
+
+CREATE_CUSTOMERS = """CREATE TABLE IF NOT EXISTS customers(
+    customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_name TEXT NOT NULL,
+    phone TEXT, email TEXT, address TEXT,
+    created_date DATETIME DEFAULT CURRENT_TIMESTAMP
+)"""
+
+CREATE_PRODUCTS = """CREATE TABLE IF NOT EXISTS products(
+    product_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_type TEXT NOT NULL,
+    product_code TEXT UNIQUE,
+    cost_per_day REAL NOT NULL,
+    available_quantity INTEGER DEFAULT 1,
+    status TEXT DEFAULT 'Available'
+)"""
+
+# (name, declaration) in table order
+RENTALS_COLUMNS = (
+    ("rental_id", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("customer_id", "INTEGER REFERENCES customers(customer_id)"),
+    ("receipt_ref", "TEXT UNIQUE"),
+    ("product_type", "TEXT"),
+    ("product_code", "TEXT"),
+    ("no_days", "TEXT"),                 # day-range label, e.g. "1-3" / "31-90"
+    ("cost_per_day", "REAL"),
+    ("account_opened", "TEXT"),
+    ("app_date", "TEXT"),
+    ("next_credit_review", "TEXT"),
+    ("last_credit_review", "TEXT"),
+    ("date_review", "TEXT"),
+    ("credit_limit", "TEXT"),
+    ("credit_check", "TEXT"),
+    ("settlement_due", "TEXT"),
+    ("payment_due", "TEXT"),
+    ("discount", "REAL"),                # percent, 5.0 == 5%
+    ("deposit", "TEXT"),
+    ("pay_due_day", "TEXT"),
+    ("payment_method", "TEXT"),
+    ("check_credit", "INTEGER"),
+    ("term_agreed", "INTEGER"),
+    ("account_on_hold", "INTEGER"),
+    ("restrict_mailing", "INTEGER"),
+    ("tax", "REAL"),
+    ("subtotal", "REAL"),
+    ("total", "REAL"),
+    ("created_date", "DATETIME DEFAULT CURRENT_TIMESTAMP"),
+)
+RENTALS_COLUMN_NAMES = tuple(name for name, _ in RENTALS_COLUMNS)
+
+# older column name(s) -> canonical name
+RENTALS_ALIASES = {
+    "account_opened": ("account_open",),       # V1.0
+    "date_review": ("date_rev",),              # V1.0
+    "settlement_due": ("sett_due_day",),       # V1.0
+}
+
+
+def create_rentals_sql(table="rentals", if_not_exists=True):
+    cols = ",\n    ".join(f"{name} {decl}" for name, decl in RENTALS_COLUMNS)
+    guard = "IF NOT EXISTS " if if_not_exists else ""
+    return f"CREATE TABLE {guard}{table}(\n    {cols}\n)"
+
+
+CREATE_RENTALS = create_rentals_sql()
+
+
+def discount_pct(value):
+    """'5%' / '5' / 5 -> 5.0; 'Select' / '' / None -> 0.0."""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace("%", "").strip())
+    except ValueError:
+        return 0.0
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def is_canonical(conn, table="rentals"):
+    return tuple(table_columns(conn, table)) == RENTALS_COLUMN_NAMES
+
+
+def layout_name(conn, table="rentals"):
+    """'canonical', 'v1.0', 'v1.1', 'missing' or 'unknown'."""
+    cols = set(table_columns(conn, table))
+    if not cols:
+        return "missing"
+    if is_canonical(conn, table):
+        return "canonical"
+    if "sett_due_day" in cols and "customer_id" in cols:
+        return "v1.0"
+    if "settlement_due" in cols and "customer_id" not in cols:
+        return "v1.1"
+    return "unknown"
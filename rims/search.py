@@ -0,0 +1,203 @@
+# rims/search.py
+# Full-text search over rentals and customers (SQLite FTS5).
+#
+# `rentals_fts` / `customers_fts` are external-content FTS5 tables kept in sync
+# by triggers, with prefix indexes so search-as-you-type ("bill12", "van")
+# is an index lookup instead of a LIKE '%term%' scan. When this SQLite build
+# has no FTS5, every call falls back to the old LIKE filters.
+#
+#   python -m rims.search rebuild rental_inventory.db
+#   python -m rims.search query rental_inventory.db "bill 12"
+
+import argparse
+import re
+import sqlite3
+
+RENTAL_FIELDS = ("receipt_ref", "product_type", "product_code")
+CUSTOMER_FIELDS = ("customer_name", "phone", "email", "address")
+
+# (fts table, content table, rowid column, fields)
+INDEXES = (
+    ("rentals_fts", "rentals", "rental_id", RENTAL_FIELDS),
+    ("customers_fts", "customers", "customer_id", CUSTOMER_FIELDS),
+)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def has_index(conn, fts_table="rentals_fts"):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                        (fts_table,)).fetchone() is not None
+
+
+def _trigger_sql(fts, table, rowid, fields):
+    cols = ", ".join(fields)
+    new = ", ".join(f"new.{f}" for f in fields)
+    old = ", ".join(f"old.{f}" for f in fields)
+    delete = (f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+              f"VALUES('delete', old.{rowid}, {old});")
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES(new.{rowid}, {new});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def install(conn):
+    """Create the FTS tables + sync triggers and index existing rows.
+    Returns False (and does nothing) when FTS5 is not compiled in."""
+    if not fts5_available(conn):
+        return False
+    for fts, table, rowid, fields in INDEXES:
+        if has_index(conn, fts):
+            continue
+        conn.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                     f"{', '.join(fields)}, content='{table}', content_rowid='{rowid}', "
+                     f"prefix='2 3 4')")
+        for sql in _trigger_sql(fts, table, rowid, fields):
+            conn.execute(sql)
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+    return True
+
+
+def rebuild(conn):
+    """Re-index everything (e.g. after FTS5 became available or a bulk load)."""
+    if not install(conn):
+        return False
+    for fts, *_ in INDEXES:
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES('optimize')")
+    return True
+
+
+def _bulk_insert(conn, fts, sql, params=()):
+    # no incremental merging while loading, then back to the FTS5 defaults
+    conn.execute(f"INSERT INTO {fts}({fts}, rank) VALUES('automerge', 0)")
+    conn.execute(f"INSERT INTO {fts}({fts}, rank) VALUES('crisismerge', 64)")
+    conn.execute(sql, params)
+    conn.execute(f"INSERT INTO {fts}({fts}, rank) VALUES('automerge', 4)")
+    conn.execute(f"INSERT INTO {fts}({fts}, rank) VALUES('crisismerge', 16)")
+
+
+def index_since(conn, table, rowid):
+    """Index the rows of ``table`` whose rowid is above ``rowid`` (appended by a
+    bulk load that ran with the sync triggers dropped)."""
+    for fts, content, key, fields in INDEXES:
+        if content == table and has_index(conn, fts):
+            cols = ", ".join(fields)
+            _bulk_insert(conn, fts, f"INSERT INTO {fts}(rowid, {cols}) SELECT {key}, {cols} FROM {table} "
+                                    f"WHERE {key} > ?", (rowid,))
+
+
+def rebuild_table(conn, table):
+    """Full re-index of one content table."""
+    for fts, content, *_ in INDEXES:
+        if content == table and has_index(conn, fts):
+            _bulk_insert(conn, fts, f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+
+
+def match_query(term):
+    """User text -> FTS5 query: every word must match as a prefix.
+    'bill 12' -> '"bill"* "12"*'. Returns '' if there is nothing to search."""
+    words = _TOKEN.findall(term or "")
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+
+
+def _like_filter(term, fields):
+    like = f"%{term}%"
+    return " OR ".join(f"{f} LIKE ?" for f in fields), (like,) * len(fields)
+
+
+class SearchIndex:
+    """Builds WHERE clauses / ranked lookups against the FTS tables, or the
+    LIKE fallback when they are not there."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._enabled = None
+
+    def enabled(self):
+        if self._enabled is None:
+            with self.pool.connect() as c:
+                self._enabled = has_index(c, "rentals_fts") and has_index(c, "customers_fts")
+        return self._enabled
+
+    def _filter(self, term, fts, rowid, fields, like_fields):
+        q = match_query(term)
+        if q and self.enabled():
+            return f"{rowid} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)", (q,)
+        return _like_filter(term, like_fields or fields)
+
+    def rentals_filter(self, term, like_fields=None):
+        """(where, params) selecting rentals that match ``term``."""
+        return self._filter(term, "rentals_fts", "rental_id", RENTAL_FIELDS, like_fields)
+
+    def customers_filter(self, term, like_fields=None):
+        return self._filter(term, "customers_fts", "customer_id", CUSTOMER_FIELDS, like_fields)
+
+    def rank_rentals(self, term, limit=20):
+        """Best matches first (bm25): (rental_id, receipt_ref, product_type, product_code, total, created_date)."""
+        q = match_query(term)
+        with self.pool.connect() as c:
+            if q and self.enabled():
+                return c.execute("""SELECT r.rental_id, r.receipt_ref, r.product_type, r.product_code, r.total, r.created_date
+                                    FROM rentals_fts f JOIN rentals r ON r.rental_id = f.rowid
+                                    WHERE rentals_fts MATCH ? ORDER BY f.rank LIMIT ?""", (q, limit)).fetchall()
+            where, params = _like_filter(term, RENTAL_FIELDS)
+            return c.execute(f"""SELECT rental_id, receipt_ref, product_type, product_code, total, created_date
+                                 FROM rentals WHERE {where} ORDER BY created_date DESC LIMIT ?""",
+                             params + (limit,)).fetchall()
+
+    def rank_customers(self, term, limit=20):
+        """Best matches first: (customer_id, customer_name, phone, email, address)."""
+        q = match_query(term)
+        with self.pool.connect() as c:
+            if q and self.enabled():
+                return c.execute("""SELECT c.customer_id, c.customer_name, c.phone, c.email, c.address
+                                    FROM customers_fts f JOIN customers c ON c.customer_id = f.rowid
+                                    WHERE customers_fts MATCH ? ORDER BY f.rank LIMIT ?""", (q, limit)).fetchall()
+            where, params = _like_filter(term, CUSTOMER_FIELDS)
+            return c.execute(f"""SELECT customer_id, customer_name, phone, email, address
+                                 FROM customers WHERE {where} ORDER BY customer_name LIMIT ?""",
+                             params + (limit,)).fetchall()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.search")
+    ap.add_argument("command", choices=("status", "rebuild", "query"))
+    ap.add_argument("db", nargs="?", default="rental_inventory.db")
+    ap.add_argument("term", nargs="?", default="")
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "rebuild":
+            with conn:
+                ok = rebuild(conn)
+            print("rebuilt" if ok else "FTS5 not available in this SQLite build; LIKE fallback in use")
+        elif args.command == "query":
+            from .pool import ConnectionManager
+            with ConnectionManager(args.db) as pool:
+                for row in SearchIndex(pool).rank_rentals(args.term):
+                    print(row)
+        else:
+            print(f"fts5 compiled in: {fts5_available(conn)}; "
+                  f"rentals_fts: {has_index(conn, 'rentals_fts')}; customers_fts: {has_index(conn, 'customers_fts')}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
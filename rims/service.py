@@ -0,0 +1,323 @@
+# rims/service.py
+# Headless rental service: the business logic behind both UIs - quotes,
+# bookings, rental search, analytics and customer CRUD - with no Tk in it.
+#
+# Arguments are plain values and results plain dicts/lists (JSON-ready apart
+# from Decimal money, which rims/api.py writes as strings), so the desktop
+# apps, the HTTP API (rims/api.py) and batch jobs all run the same engine.
+# Every method borrows the calling thread's pooled connection, so a service
+# can be shared by any number of worker threads.
+#
+#   svc = RentalService("rental_inventory.db")
+#   svc.quote("VAN775", "2025-01-01", days=7, discount="5%")
+#   svc.book({"product_code": "VAN775", "start": "2025-01-01", "days": 7, "customer_id": 3})
+
+import datetime
+
+from . import aggregates, get_manager, migrations, receipts, schema, storage, unify, writebehind
+from . import metrics as query_metrics
+from .availability import AvailabilityEngine
+from .catalog import ProductCatalog
+from .lookup import CustomerLookup
+from .paging import HISTORY_COLUMNS
+from .pricing import PricingEngine, TAX_RATE
+from .search import SearchIndex
+
+DEFAULT_PRODUCTS = (
+    ("Car", "CAR452", 12.00, 5),
+    ("Van", "VAN775", 19.00, 3),
+    ("Minibus", "MIN334", 12.00, 2),
+    ("Truck", "TRK7483", 15.00, 2),
+)
+CUSTOMER_COLUMNS = ("customer_id", "customer_name", "phone", "email", "address")
+# rentals columns a booking may set; the rest are priced, allocated or defaulted here
+BOOKING_FIELDS = frozenset(schema.RENTALS_COLUMN_NAMES) - {
+    "rental_id", "receipt_ref", "product_type", "product_code", "cost_per_day", "discount",
+    "tax", "subtotal", "total", "created_date"}
+
+
+class ServiceError(ValueError):
+    """A request the service cannot carry out; ``status`` is the HTTP status."""
+    status = 400
+
+
+class NotFound(ServiceError):
+    status = 404
+
+
+def _date(d):
+    if isinstance(d, datetime.datetime):
+        return d.date()
+    if isinstance(d, datetime.date):
+        return d
+    return datetime.date.fromisoformat(str(d)[:10])
+
+
+def _row_dict(cur, row):
+    return dict(zip((d[0] for d in cur.description), row)) if row is not None else None
+
+
+class RentalService:
+    """One rental database (created, unified and migrated on first use)."""
+
+    def __init__(self, name="rental_inventory.db", profile=None, tax_rate=TAX_RATE, tiers=None,
+                 write_behind=None, metrics=None):
+        self.name = name
+        self.pool = get_manager(name)
+        # statement timings + slow-query log before the first connection opens;
+        # None reads $RIMS_METRICS, e.g. "slow_ms=50,file=rims_metrics.json"
+        self.metrics = query_metrics.from_setting(self.pool, metrics)
+        # WAL + pragmas; profile defaults to $RIMS_PROFILE or "desk"
+        self.storage = storage.configure(self.pool, profile)
+        self.init()
+        # FTS5 search (LIKE fallback when FTS5 is not compiled in)
+        self.search = SearchIndex(self.pool)
+        # type-ahead customer picker: normalized name/phone/email prefixes + trigram substrings
+        self.lookup = CustomerLookup(self.pool)
+        # date-interval bookings checked against products.available_quantity
+        self.availability = AvailabilityEngine()
+        # products by type/code in memory; reloaded only when products change
+        self.catalog = ProductCatalog(self.pool)
+        self.pricing = PricingEngine(tax_rate, tiers)
+        # opt-in group commit for the desktop save paths (see write());
+        # None reads $RIMS_WRITE_BEHIND, e.g. "flush_ms=20,max_rows=100"
+        self.writes = writebehind.from_setting(self.pool, write_behind)
+
+    def init(self):
+        with self.pool.connect() as c:
+            # canonical layout shared by V1.0 and V1.1 (see rims/schema.py)
+            c.execute(schema.CREATE_CUSTOMERS)
+            c.execute(schema.CREATE_PRODUCTS)
+            c.execute(schema.CREATE_RENTALS)
+            c.executemany("INSERT OR IGNORE INTO products(product_type, product_code, cost_per_day, available_quantity) "
+                          "VALUES(?,?,?,?)", DEFAULT_PRODUCTS)
+        # rewrite an older V1.0/V1.1 rentals table, then indexes etc.
+        unify.ensure_canonical(self.pool.connection())
+        migrations.migrate(self.pool.connection())
+
+    # ---------- housekeeping ----------
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def checkpoint(self, mode="PASSIVE"):
+        with self.pool.connect() as c:
+            return storage.checkpoint(c, mode)
+
+    def write(self, fn, *args, **kwargs):
+        """Run a write method, e.g. ``write(svc.insert_rental, row)``: directly,
+        or through the write-behind queue when one is enabled. Either way it
+        has committed when this returns."""
+        if self.writes is None:
+            return fn(*args, **kwargs)
+        return self.writes.call(fn, *args, **kwargs)
+
+    def close(self):
+        """Commit and stop the write-behind queue, if any; write out the metrics."""
+        if self.writes is not None:
+            self.writes.close()
+        if self.metrics is not None:
+            self.metrics.close()
+
+    # ---------- products / quotes ----------
+    def products(self):
+        """Every product, ordered by type then code."""
+        self.catalog.refresh()
+        return [p._asdict() for p in self.catalog.products()]
+
+    def _product(self, code):
+        p = self.catalog.get(code)
+        if p is None and self.catalog.refresh():
+            p = self.catalog.get(code)
+        if p is None:
+            raise NotFound(f"unknown product code {code!r}")
+        return p
+
+    @staticmethod
+    def _span(start=None, end=None, days=None):
+        try:
+            start = _date(start) if start else datetime.date.today()
+            if end:
+                end = _date(end)
+            else:
+                end = start + datetime.timedelta(days=int(days or 1))
+        except (TypeError, ValueError) as e:
+            raise ServiceError(f"bad rental dates: {e}") from None
+        if end <= start:
+            raise ServiceError(f"rental must end after it starts ({start} to {end})")
+        return start, end
+
+    def quote(self, product_code, start=None, end=None, days=None, discount=None):
+        """Price renting ``product_code`` for [start, end) (or ``days`` from
+        ``start``, default today). ``discount`` is a percent ('5%', 5) or None
+        for the engine's tiers."""
+        p = self._product(product_code)
+        start, end = self._span(start, end, days)
+        q = self.pricing.quote(p.cost_per_day, start, end, discount)
+        return dict(product_code=p.product_code, product_type=p.product_type,
+                    start=start.isoformat(), end=end.isoformat(), **q._asdict())
+
+    def available(self, product_code, start, end):
+        """Units of ``product_code`` free for the whole of [start, end); None if untracked."""
+        with self.pool.connect() as c:
+            return self.availability.free(c, product_code, start, end)
+
+    # ---------- bookings ----------
+    def insert_rental(self, row, start=None, end=None):
+        """Insert one rentals row (dict of column -> value) and book a unit for
+        [start, end) in the same BEGIN IMMEDIATE transaction. An empty
+        receipt_ref is allocated from the counter. Raises OverbookedError
+        (nothing saved) when every unit is taken. Returns (rental_id, receipt_ref)."""
+        row = dict(row)
+        unknown = sorted(set(row) - set(schema.RENTALS_COLUMN_NAMES))
+        if unknown:
+            raise ServiceError(f"not rentals column(s): {', '.join(unknown)}")
+        if "discount" in row:
+            row["discount"] = schema.discount_pct(row["discount"])   # "5%" -> 5.0
+        # write lock from the availability check to the commit: no double booking
+        with self.pool.connect(immediate=True) as c:
+            if not row.get("receipt_ref"):
+                row["receipt_ref"] = receipts.next_ref(c)
+            cols = list(row)
+            cur = c.execute(f"INSERT INTO rentals({', '.join(cols)}) VALUES({', '.join('?' * len(cols))})",
+                            [row[k] for k in cols])
+            if end is not None:
+                self.availability.reserve(c, row.get("product_code"), start or datetime.date.today(), end,
+                                          rental_id=cur.lastrowid)
+        return cur.lastrowid, row["receipt_ref"]
+
+    def book(self, request):
+        """Price and save a rental. ``request`` holds product_code, start and
+        end or days, optionally discount, receipt_ref and any other rentals
+        column (customer_id, payment_method, ...). The price is always worked
+        out here. Returns the quote plus rental_id and receipt_ref."""
+        request = dict(request)
+        code = request.pop("product_code", None)
+        if not code:
+            raise ServiceError("product_code is required")
+        start, end, days = request.pop("start", None), request.pop("end", None), request.pop("days", None)
+        discount = request.pop("discount", None)
+        receipt_ref = request.pop("receipt_ref", None)
+        unknown = sorted(set(request) - BOOKING_FIELDS)
+        if unknown:
+            raise ServiceError(f"unknown rental field(s): {', '.join(unknown)}")
+        customer_id = request.get("customer_id")
+        if customer_id is not None:
+            self.customer(customer_id)          # NotFound rather than a dangling id
+        q = self.quote(code, start, end, days, discount)
+        row = dict(request, receipt_ref=receipt_ref, product_type=q["product_type"], product_code=code,
+                   cost_per_day=float(q["rate"]), discount=float(q["discount"]),
+                   tax=float(q["tax"]), subtotal=float(q["subtotal"]), total=float(q["total"]))
+        row.setdefault("no_days", str(q["days"]))
+        row.setdefault("app_date", q["start"])
+        rental_id, ref = self.insert_rental(row, q["start"], q["end"])
+        return dict(q, rental_id=rental_id, receipt_ref=ref)
+
+    # ---------- rentals ----------
+    def rentals(self, search=None, limit=50, before=None):
+        """Newest-first page of rentals (optionally matching ``search``).
+        ``before`` is the ``next`` key of the previous page."""
+        limit = max(1, min(int(limit), 1000))
+        conds, params = [], []
+        if search:
+            where, p = self.search.rentals_filter(search)
+            conds.append(f"({where})")
+            params.extend(p)
+        if before:
+            created, _, rid = str(before).rpartition("|")
+            conds.append("(created_date, rental_id) < (?, ?)")
+            params.extend((created, int(rid)))
+        sql = (f"SELECT {', '.join(HISTORY_COLUMNS)} FROM rentals"
+               + (" WHERE " + " AND ".join(conds) if conds else "")
+               + " ORDER BY created_date DESC, rental_id DESC LIMIT ?")
+        with self.pool.connect() as c:
+            rows = c.execute(sql, params + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = [dict(zip(HISTORY_COLUMNS, r)) for r in rows[:limit]]
+        nxt = f"{rows[-1]['created_date']}|{rows[-1]['rental_id']}" if more else None
+        return dict(rows=rows, next=nxt)
+
+    def rental(self, rental_id):
+        with self.pool.connect() as c:
+            cur = c.execute("SELECT * FROM rentals WHERE rental_id=?", (int(rental_id),))
+            row = _row_dict(cur, cur.fetchone())
+        if row is None:
+            raise NotFound(f"no rental {rental_id}")
+        return row
+
+    def search_ranked(self, term, kind="rentals", limit=20):
+        """Best matches first (bm25 when FTS5 is there)."""
+        if kind == "customers":
+            return [dict(zip(CUSTOMER_COLUMNS, r)) for r in self.search.rank_customers(term, limit)]
+        if kind != "rentals":
+            raise ServiceError("kind must be rentals or customers")
+        cols = ("rental_id", "receipt_ref", "product_type", "product_code", "total", "created_date")
+        return [dict(zip(cols, r)) for r in self.search.rank_rentals(term, limit)]
+
+    # ---------- analytics ----------
+    def analytics(self, days=30):
+        """Summary-table figures (rims/aggregates.py): cost ~ number of summary rows."""
+        with self.pool.connect() as c:
+            rentals, revenue, average = aggregates.totals(c)
+            return dict(
+                totals=dict(rentals=rentals, revenue=revenue, average=average),
+                by_type=[dict(product_type=t, rentals=n, revenue=r) for t, n, r in aggregates.by_type(c)],
+                by_payment=[dict(payment_method=m, rentals=n, revenue=r) for m, n, r in aggregates.by_payment(c)],
+                daily=[dict(day=d, rentals=n, revenue=r) for d, n, r in aggregates.daily(c, days)],
+                monthly=[dict(month=m, revenue=r, rentals=n) for m, r, n in aggregates.monthly(c)])
+
+    # ---------- customers ----------
+    def customers(self, search=None, limit=None):
+        """Customers, newest first (optionally matching ``search``)."""
+        sql = f"SELECT {', '.join(CUSTOMER_COLUMNS)} FROM customers"
+        params = ()
+        if search:
+            where, params = self.search.customers_filter(search)
+            sql += f" WHERE {where}"
+        sql += " ORDER BY created_date DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = tuple(params) + (int(limit),)
+        with self.pool.connect() as c:
+            return [dict(zip(CUSTOMER_COLUMNS, r)) for r in c.execute(sql, params).fetchall()]
+
+    def find_customers(self, term, limit=10):
+        """Type-ahead matches for ``term`` (name, phone or email; prefix matches
+        first, then substrings), at most ``limit``."""
+        return [dict(zip(CUSTOMER_COLUMNS, r)) for r in self.lookup.find(term, limit)]
+
+    def customer(self, customer_id):
+        with self.pool.connect() as c:
+            row = c.execute(f"SELECT {', '.join(CUSTOMER_COLUMNS)} FROM customers WHERE customer_id=?",
+                            (int(customer_id),)).fetchone()
+        if row is None:
+            raise NotFound(f"no customer {customer_id}")
+        return dict(zip(CUSTOMER_COLUMNS, row))
+
+    def add_customer(self, name, phone=None, email=None, address=None):
+        """Returns the new customer_id."""
+        if not (name or "").strip():
+            raise ServiceError("customer name is required")
+        with self.pool.connect() as c:
+            return c.execute("INSERT INTO customers(customer_name, phone, email, address) VALUES(?,?,?,?)",
+                             (name.strip(), phone, email, address)).lastrowid
+
+    def update_customer(self, customer_id, name=None, phone=None, email=None, address=None):
+        """Set the given (not None) fields."""
+        fields = dict(customer_name=name, phone=phone, email=email, address=address)
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if "customer_name" in fields and not fields["customer_name"].strip():
+            raise ServiceError("customer name is required")
+        if not fields:
+            return self.customer(customer_id)
+        with self.pool.connect() as c:
+            n = c.execute(f"UPDATE customers SET {', '.join(k + '=?' for k in fields)} WHERE customer_id=?",
+                          list(fields.values()) + [int(customer_id)]).rowcount
+        if not n:
+            raise NotFound(f"no customer {customer_id}")
+        return self.customer(customer_id)
+
+    def delete_customer(self, customer_id):
+        with self.pool.connect() as c:
+            n = c.execute("DELETE FROM customers WHERE customer_id=?", (int(customer_id),)).rowcount
+        if not n:
+            raise NotFound(f"no customer {customer_id}")
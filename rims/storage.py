@@ -0,0 +1,130 @@
+# rims/storage.py
+# Storage configuration for rental_inventory.db: WAL journaling plus named
+# pragma profiles, picked once at startup and applied to every pooled connection.
+#
+#   RIMS_PROFILE=batch-import python V1.1.py
+#   RIMS_PRAGMAS="cache_size=-65536,mmap_size=0" python V1.1.py
+#   python -m rims.storage checkpoint rental_inventory.db --mode TRUNCATE
+
+import argparse
+import os
+import sqlite3
+
+MB = 1024 * 1024
+
+# Order matters: journal_mode first (it cannot change inside a transaction),
+# then the per-connection tuning knobs.
+PRAGMA_ORDER = ("journal_mode", "synchronous", "cache_size", "mmap_size",
+                "temp_store", "busy_timeout", "wal_autocheckpoint", "foreign_keys")
+
+PROFILES = {
+    # counter terminals: several readers + the odd writer on one shared file
+    "desk": dict(journal_mode="WAL", synchronous="NORMAL", cache_size=-16000,
+                 mmap_size=64 * MB, temp_store="MEMORY", busy_timeout=5000,
+                 wal_autocheckpoint=1000),
+    # nightly branch loads: throughput over durability, long waits are fine
+    "batch-import": dict(journal_mode="WAL", synchronous="OFF", cache_size=-262144,
+                         mmap_size=256 * MB, temp_store="MEMORY", busy_timeout=30000,
+                         wal_autocheckpoint=10000),
+    # reporting / analytics box that mostly reads
+    "read-replica": dict(journal_mode="WAL", synchronous="NORMAL", cache_size=-65536,
+                         mmap_size=1024 * MB, temp_store="MEMORY", busy_timeout=10000,
+                         wal_autocheckpoint=1000),
+}
+DEFAULT_PROFILE = "desk"
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+class StorageProfile:
+    """A named set of pragmas that can be applied to a connection."""
+
+    def __init__(self, name, pragmas):
+        self.name = name
+        self.pragmas = dict(pragmas)
+
+    def apply(self, conn):
+        for key in PRAGMA_ORDER:
+            if key in self.pragmas:
+                conn.execute(f"PRAGMA {key}={self.pragmas[key]}")
+        for key, value in self.pragmas.items():
+            if key not in PRAGMA_ORDER:
+                conn.execute(f"PRAGMA {key}={value}")
+
+    def __repr__(self):
+        return f"StorageProfile({self.name!r}, {self.pragmas!r})"
+
+
+def _parse_overrides(text):
+    out = {}
+    for part in (text or "").split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            out[k.strip()] = v.strip()
+    return out
+
+
+def get_profile(name=None, **overrides):
+    """Build a profile from ``name`` (default: $RIMS_PROFILE or "desk") with
+    $RIMS_PRAGMAS and keyword ``overrides`` layered on top."""
+    name = name or os.environ.get("RIMS_PROFILE") or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"unknown storage profile {name!r}; choose from {', '.join(PROFILES)}")
+    pragmas = dict(PROFILES[name])
+    pragmas.update(_parse_overrides(os.environ.get("RIMS_PRAGMAS")))
+    pragmas.update(overrides)
+    return StorageProfile(name, pragmas)
+
+
+def configure(manager, profile=None):
+    """Apply ``profile`` (a name or StorageProfile) to every connection the
+    ConnectionManager hands out. Returns the profile in effect."""
+    if not isinstance(profile, StorageProfile):
+        profile = get_profile(profile)
+    manager.add_connect_hook(profile.apply, key="storage-profile")
+    manager.storage_profile = profile
+    return profile
+
+
+def current_settings(conn):
+    """Read back the pragmas a connection is actually running with."""
+    return {k: conn.execute(f"PRAGMA {k}").fetchone()[0] for k in PRAGMA_ORDER}
+
+
+def checkpoint(conn, mode="PASSIVE"):
+    """Run a WAL checkpoint; returns (busy, wal_frames, checkpointed_frames)."""
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"checkpoint mode must be one of {', '.join(CHECKPOINT_MODES)}")
+    return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.storage",
+                                 description="Inspect or checkpoint rental_inventory.db")
+    ap.add_argument("command", choices=("show", "apply", "checkpoint", "profiles"))
+    ap.add_argument("db", nargs="?", default="rental_inventory.db")
+    ap.add_argument("--profile", default=None)
+    ap.add_argument("--mode", default="PASSIVE", choices=CHECKPOINT_MODES)
+    args = ap.parse_args(argv)
+
+    if args.command == "profiles":
+        for name, pragmas in PROFILES.items():
+            print(f"{name:13s} {pragmas}")
+        return 0
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "apply":
+            get_profile(args.profile).apply(conn)
+        if args.command == "checkpoint":
+            busy, log, done = checkpoint(conn, args.mode)
+            print(f"checkpoint {args.mode}: busy={busy} wal_frames={log} checkpointed={done}")
+        else:
+            for k, v in current_settings(conn).items():
+                print(f"{k:20s} {v}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
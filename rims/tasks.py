@@ -0,0 +1,248 @@
+# rims/tasks.py
+# Background task executor for the Tk apps.
+#
+# Database queries, PDF export and chart data loading run on worker threads
+# (or, for picklable CPU-heavy jobs, a process pool); their results are handed
+# back to the Tk main thread through a queue drained by ``root.after``, so
+# callbacks may touch widgets freely and the main loop never blocks on I/O.
+#
+# Tasks submitted under the same ``key`` are coalesced: a request that arrives
+# while an earlier one is still queued replaces it, and one that arrives while
+# it is running is queued to run once afterwards (the stale result is dropped).
+#
+# Cancelling stops a task that has not started, or one that calls
+# ``task.check()``. Once the function has returned, its result is delivered
+# to ``on_done`` even if Cancel was pressed meanwhile. A save that committed
+# must still be confirmed, or the user would save it again.
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class Task:
+    """Handle for a submitted job. Workers that take ``task=`` can call
+    ``task.report(fraction, text)`` and ``task.check()`` (raises if cancelled)."""
+
+    def __init__(self, executor, fn, args, kwargs, key, on_done, on_error, on_progress, pass_task, process):
+        self._executor = executor
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.key = key
+        self.on_done, self.on_error, self.on_progress = on_done, on_error, on_progress
+        self.pass_task = pass_task
+        self.process = process
+        self.state = "pending"          # pending -> running -> done/error/cancelled
+        self.follow_up = None
+        self.quiet = False              # left out of on_busy (periodic polls)
+        self._cancel = threading.Event()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        # the future is left queued: _run still starts, sees the flag and posts
+        # "cancelled", so _finish releases the key and the busy count
+        self._cancel.set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def report(self, fraction=None, text=""):
+        """Called from the worker; delivered to ``on_progress`` on the Tk thread."""
+        self._executor._results.put(("progress", self, (fraction, text)))
+
+
+class TaskExecutor:
+    """Runs callables off the Tk main thread and delivers results back on it.
+
+    ``on_busy(n)`` is called on the Tk thread whenever the number of active
+    tasks changes (drive a progress indicator from it); ``quiet`` tasks such as
+    periodic polls are left out of it. ``on_error(exc)`` is the default error
+    handler for tasks that don't pass their own.
+    """
+
+    def __init__(self, root, workers=2, poll_ms=30, on_busy=None, on_error=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self.on_error = on_error
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rims-worker")
+        self._procs = None
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._keyed = {}
+        self._active = 0
+        self._quiet = 0                 # active tasks submitted with quiet=True
+        self._poll_job = None
+        self.stats = dict(submitted=0, coalesced=0, completed=0, cancelled=0, failed=0)
+
+    # ---------- submitting (Tk thread only) ----------
+    def submit(self, fn, *args, key=None, on_done=None, on_error=None, on_progress=None,
+               pass_task=False, process=False, quiet=False, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the background; ``on_done(result)`` runs on
+        the Tk thread. With ``process=True`` the call goes to a process pool
+        (``fn`` and its arguments must be picklable). ``quiet=True`` keeps the
+        task out of the busy count (use one key per kind of quiet task)."""
+        task = Task(self, fn, args, kwargs, key, on_done, on_error, on_progress, pass_task, process)
+        task.quiet = quiet
+        self.stats["submitted"] += 1
+        if key is not None:
+            with self._lock:
+                current = self._keyed.get(key)
+                if current is not None and current.state == "pending" and not current.cancelled:
+                    # not started yet: just retarget it at the newest request
+                    current.fn, current.args, current.kwargs = fn, args, kwargs
+                    current.on_done, current.on_error, current.on_progress = on_done, on_error, on_progress
+                    current.pass_task, current.process = pass_task, process
+                    self.stats["coalesced"] += 1
+                    return current
+                if current is not None and current.state in ("pending", "running"):
+                    # running, or cancelled before it started: run this once it is finished
+                    if current.follow_up is not None:
+                        self.stats["coalesced"] += 1
+                    current.follow_up = task
+                    return task
+                self._keyed[key] = task
+        self._start(task)
+        return task
+
+    def _start(self, task):
+        self._active += 1
+        if task.quiet:
+            self._quiet += 1
+        else:
+            self._busy_changed()
+        task.future = self._threads.submit(self._run, task)
+        self._ensure_polling()
+
+    def _run(self, task):
+        # worker thread
+        with self._lock:
+            if task.cancelled:
+                task.state = "cancelled"
+            else:
+                task.state = "running"
+            fn, args, kwargs = task.fn, task.args, dict(task.kwargs)
+        if task.state == "cancelled":
+            self._results.put(("cancelled", task, None))
+            return
+        try:
+            if task.process:
+                if self._procs is None:
+                    with self._lock:
+                        if self._procs is None:
+                            self._procs = ProcessPoolExecutor(max_workers=1)
+                result = self._procs.submit(fn, *args, **kwargs).result()
+            else:
+                if task.pass_task:
+                    kwargs["task"] = task
+                result = fn(*args, **kwargs)
+        except TaskCancelled:
+            self._results.put(("cancelled", task, None))
+        except BaseException as e:
+            self._results.put(("error", task, e))
+        else:
+            # it ran to the end (a write has committed): report it, cancelled or not
+            self._results.put(("done", task, result))
+
+    # ---------- delivering (Tk thread) ----------
+    def _ensure_polling(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_job = None
+        try:
+            while True:
+                try:
+                    kind, task, value = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "progress":
+                    if task.on_progress and not task.cancelled:
+                        task.on_progress(*value)
+                    continue
+                self._finish(task, kind, value)
+        finally:
+            # keep draining even if a callback raised
+            if self._active:
+                self._ensure_polling()
+
+    def _finish(self, task, kind, value):
+        self._active -= 1
+        if task.quiet:
+            self._quiet -= 1
+        with self._lock:
+            task.state = kind
+            follow_up = task.follow_up
+            if task.key is not None and self._keyed.get(task.key) is task:
+                if follow_up is not None:
+                    self._keyed[task.key] = follow_up
+                else:
+                    del self._keyed[task.key]
+        try:
+            if follow_up is not None:
+                # a newer request for the same key is waiting; this result is stale
+                self.stats["coalesced"] += 1
+            elif kind == "done":
+                self.stats["completed"] += 1
+                if task.on_done:
+                    task.on_done(value)
+            elif kind == "error":
+                self.stats["failed"] += 1
+                handler = task.on_error or self.on_error
+                if handler:
+                    handler(value)
+                else:
+                    raise value
+            else:
+                self.stats["cancelled"] += 1
+        finally:
+            if follow_up is not None:
+                self._start(follow_up)
+            if not task.quiet:
+                self._busy_changed()
+
+    def _busy_changed(self):
+        if self.on_busy:
+            self.on_busy(self._active - self._quiet)
+
+    # ---------- control ----------
+    @property
+    def active(self):
+        return self._active
+
+    def pending(self, key):
+        """True while a task for ``key`` is queued or running."""
+        with self._lock:
+            return key in self._keyed
+
+    def cancel(self, key):
+        """Cancel the task (and any queued follow-up) registered under ``key``."""
+        with self._lock:
+            task = self._keyed.get(key)
+        while task is not None:
+            task.cancel()
+            task = task.follow_up
+
+    def cancel_all(self):
+        with self._lock:
+            tasks = list(self._keyed.values())
+        for t in tasks:
+            t.cancel()
+
+    def shutdown(self, wait=False):
+        self.cancel_all()
+        self._threads.shutdown(wait=wait, cancel_futures=True)
+        if self._procs is not None:
+            self._procs.shutdown(wait=wait, cancel_futures=True)
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
@@ -0,0 +1,331 @@
+# rims/uiprofile.py
+# Opt-in responsiveness profiler for the Tk apps: how long each event handler
+# runs on the main thread, how long the event loop goes without servicing
+# events, and which code a slow handler was in.
+#
+# While on, every Tcl callback created afterwards is timed - button and menu
+# commands, bind() handlers (<<TreeviewSelect>>, <<ComboboxSelected>>, ...),
+# trace_add() callbacks, after()/after_idle() jobs (which is how worker results
+# come back, see rims/tasks.py) and protocol handlers. It hooks
+# tkinter.CallWrapper, so it has to be switched on before the widgets are
+# built; the apps do that first thing in their constructor. A handler's time is
+# inclusive (a trace fired by var.set() inside a command is part of the
+# command too); in the report, nested handlers show up as children.
+#
+# An after() heartbeat measures the event loop itself: a beat that fires more
+# than ``stall_ms`` late is a stall, logged with the handlers that ran during
+# it. Stall time no handler accounts for (Tk geometry/redraw of a big widget,
+# say) is reported as untracked. A handler that opens a modal dialog counts the
+# time the dialog is open, but the loop keeps running under a dialog, so that is
+# not a stall.
+#
+# While a handler runs, a thread samples the main thread's Python stack every
+# ``sample_ms``. The samples split each handler's own time across the code it
+# was in, and the result is written as folded stacks ("a;b;c <microseconds>")
+# for flamegraph.pl, speedscope or inferno, next to a JSON summary.
+#
+#   RIMS_UI_PROFILE=1 python V1.1.py                       # -> rims_ui_profile.json + .folded on exit
+#   RIMS_UI_PROFILE="file=ui.json,stall_ms=50,sample_ms=2" python V1.0.py
+#   python -m rims.uiprofile show ui.json --top 15
+#   flamegraph.pl ui.folded > ui.svg
+
+import argparse
+import atexit
+import collections
+import datetime
+import json
+import os
+import sys
+import threading
+import tkinter
+from time import perf_counter_ns
+
+from .metrics import BUCKETS, _summary
+from .storage import _parse_overrides
+
+FILE = "rims_ui_profile.json"
+HEARTBEAT_MS = 50
+STALL_MS = 100.0
+SAMPLE_MS = 5.0
+STALL_MAX = 200
+# what registered a callback (the function two frames above CallWrapper()) -> kind
+KINDS = {"_options": "command", "_bind": "bind", "trace_add": "trace",
+         "trace_variable": "trace", "after": "after", "after_idle": "after", "wm_protocol": "protocol"}
+_BASE_WRAPPER = tkinter.CallWrapper
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="milliseconds")
+
+
+def _target(func):
+    """The callable behind a callback: unwraps functools.partial and the local
+    callit() that after() wraps its job in."""
+    while hasattr(func, "func") and not hasattr(func, "__code__"):        # functools.partial
+        func = func.func
+    code = getattr(func, "__code__", None)
+    if code is not None and code.co_name == "callit" and func.__closure__:
+        cells = dict(zip(code.co_freevars, func.__closure__))
+        if "func" in cells:
+            return _target(cells["func"].cell_contents)
+    return func
+
+
+def _label(func):
+    """Readable name of a callable: its qualified name, plus file:line for lambdas."""
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    code = getattr(getattr(func, "__func__", func), "__code__", None)
+    if "<lambda>" in name and code is not None:
+        name = f"{name}@{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+    return name
+
+
+def _frame_name(code):
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Call:
+    __slots__ = ("name", "samples", "child_ns")
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = []           # stacks (tuples of code objects) taken while this call was innermost
+        self.child_ns = 0           # time in handlers nested inside this one
+
+
+class UIProfiler:
+    """Handler timings and event-loop stalls of the Tk app in this process."""
+
+    def __init__(self, root, heartbeat_ms=HEARTBEAT_MS, stall_ms=STALL_MS, sample_ms=SAMPLE_MS,
+                 stall_max=STALL_MAX, file=FILE):
+        self.root = root
+        self.heartbeat_ms = int(heartbeat_ms)
+        self.stall_ms = float(stall_ms)
+        self.sample_ms = float(sample_ms)
+        self.file = file
+        self._stall_ns = int(self.stall_ms * 1e6)
+        self._handlers = {}         # "kind name" -> [count, total ns, max ns, buckets]
+        self._folded = collections.Counter()        # "a;b;c" -> ns
+        self._names = {}            # code object -> folded frame name
+        self._stack = []            # _Call per handler running on the main thread, outermost first
+        self._window = []           # (name, ns) of top-level handlers since the last beat
+        self._window_ns = 0
+        self._stalls = collections.deque(maxlen=int(stall_max))
+        self.loop = dict(beats=0, stalls=0, stall_ms=0.0, worst_ms=0.0, untracked_ms=0.0)
+        self._main = threading.main_thread().ident
+        self._started = _now()
+        self._stop = threading.Event()
+        self._job = None
+        self._due = None
+        self._closed = False
+        self._install()
+        if self.sample_ms > 0:
+            threading.Thread(target=self._sample_loop, name="rims-uiprofile", daemon=True).start()
+        self._beat()
+        atexit.register(self.close)
+
+    def __repr__(self):
+        return f"UIProfiler(stall_ms={self.stall_ms:g}, file={self.file!r})"
+
+    # ---------- hooking callbacks ----------
+    def _install(self):
+        profiler = self
+
+        class ProfiledCallWrapper(_BASE_WRAPPER):
+            def __init__(self, func, subst, widget):
+                super().__init__(func, subst, widget)
+                func = _target(func)
+                if getattr(func, "__self__", None) is profiler:     # the heartbeat itself
+                    self.name = None
+                    return
+                caller = sys._getframe(2)
+                kind = KINDS.get(caller.f_code.co_name, "callback")        # e.g. a direct register()
+                if kind == "bind":
+                    kind = f"bind {caller.f_locals.get('sequence')}"
+                self.name = f"{kind} {_label(func)}"
+
+            def __call__(self, *args):
+                if self.name is None or profiler._closed:
+                    return super().__call__(*args)
+                call = _Call(self.name)
+                profiler._stack.append(call)
+                t = perf_counter_ns()
+                try:
+                    return super().__call__(*args)
+                finally:
+                    ns = perf_counter_ns() - t
+                    profiler._stack.pop()
+                    profiler._finish(call, ns)
+
+        self._wrapper_code = ProfiledCallWrapper.__call__.__code__
+        tkinter.CallWrapper = ProfiledCallWrapper
+
+    def _finish(self, call, ns):
+        s = self._handlers.get(call.name)
+        if s is None:
+            s = self._handlers[call.name] = [0, 0, 0, [0] * BUCKETS]
+        s[0] += 1
+        s[1] += ns
+        if ns > s[2]:
+            s[2] = ns
+        s[3][min(ns.bit_length(), BUCKETS - 1)] += 1
+        path = ";".join([c.name for c in self._stack] + [call.name]) if self._stack else call.name
+        own = max(ns - call.child_ns, 0)
+        samples = call.samples
+        if samples:
+            share = own / len(samples)
+            names = self._names
+            for stack in samples:
+                for code in stack:
+                    if code not in names:
+                        names[code] = _frame_name(code)
+                self._folded[";".join([path] + [names[code] for code in stack])] += share
+        else:
+            self._folded[path] += own
+        if self._stack:
+            self._stack[-1].child_ns += ns
+        else:
+            self._window.append((call.name, ns))
+            self._window_ns += ns
+
+    # ---------- sampling ----------
+    def _sample_loop(self):
+        wait = self.sample_ms / 1000
+        stop = self._wrapper_code, _BASE_WRAPPER.__call__.__code__
+        while not self._stop.wait(wait):
+            try:
+                call = self._stack[-1]
+            except IndexError:
+                continue
+            frame = sys._current_frames().get(self._main)
+            stack = []
+            while frame is not None and frame.f_code not in stop:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            while stack and stack[-1].co_filename == tkinter.__file__:      # after()'s callit wrapper
+                stack.pop()
+            stack.reverse()
+            call.samples.append(tuple(stack))
+
+    # ---------- heartbeat ----------
+    def _beat(self):
+        now = perf_counter_ns()
+        if self._due is not None:
+            late = now - self._due
+            self.loop["beats"] += 1
+            if late > self._stall_ns:
+                ms = late / 1e6
+                self.loop["stalls"] += 1
+                self.loop["stall_ms"] += ms
+                self.loop["worst_ms"] = max(self.loop["worst_ms"], ms)
+                untracked = max(late - self._window_ns, 0)
+                self.loop["untracked_ms"] += untracked / 1e6
+                if untracked:
+                    self._folded["(event loop stalled outside handlers)"] += untracked
+                top = sorted(self._window, key=lambda h: -h[1])[:5]
+                self._stalls.append(dict(at=_now(), ms=ms, untracked_ms=untracked / 1e6,
+                                         handlers=[dict(name=n, ms=h / 1e6) for n, h in top]))
+        self._window = []
+        self._window_ns = 0
+        self._due = now + self.heartbeat_ms * 1_000_000
+        self._job = self.root.after(self.heartbeat_ms, self._beat)
+
+    # ---------- report ----------
+    def snapshot(self):
+        """JSON-ready dict: handlers (slowest total first), loop totals and the stall log."""
+        handlers = sorted((dict(name=k, **_summary(v[0], v[1], v[2], v[3])) for k, v in self._handlers.items()),
+                          key=lambda d: -d["total_ms"])
+        return dict(pid=os.getpid(), started=self._started, taken=_now(), heartbeat_ms=self.heartbeat_ms,
+                    stall_ms=self.stall_ms, sample_ms=self.sample_ms, loop=dict(self.loop),
+                    handlers=handlers, stalls=list(self._stalls))
+
+    def folded(self):
+        """Folded stacks, one "frame;frame;... microseconds" line each."""
+        return [f"{stack} {round(ns / 1000)}" for stack, ns in sorted(self._folded.items()) if ns >= 500]
+
+    def write(self, file=None):
+        """Write the JSON summary to ``file`` and the folded stacks next to it
+        (same name, .folded); returns the two paths."""
+        file = file or self.file
+        folded = os.path.splitext(file)[0] + ".folded"
+        for path, text in ((file, json.dumps(self.snapshot(), indent=1)), (folded, "\n".join(self.folded()) + "\n")):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        return file, folded
+
+    def close(self):
+        """Stop the heartbeat and the sampler, unhook tkinter and write the report."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        if tkinter.CallWrapper.__call__.__code__ is self._wrapper_code:
+            tkinter.CallWrapper = _BASE_WRAPPER
+        if self._job is not None:
+            try:
+                self.root.after_cancel(self._job)
+            except tkinter.TclError:        # the root is already destroyed
+                pass
+        if self.file:
+            try:
+                self.write()
+            except OSError as e:
+                print(f"rims.uiprofile: could not write {self.file}: {e}", file=sys.stderr)
+
+
+# ---------- switching it on ----------
+def from_setting(root, setting=None):
+    """Start profiling ``root``'s callbacks; returns the UIProfiler, or None when off.
+
+    ``setting`` is False/None (off), True (defaults), a dict of UIProfiler
+    arguments or a string such as "stall_ms=50,file=ui.json"; None falls back to
+    $RIMS_UI_PROFILE ("1"/"on" for the defaults).
+    """
+    if setting is None:
+        setting = os.environ.get("RIMS_UI_PROFILE") or False
+    if isinstance(setting, str):
+        text = setting.strip()
+        if text.lower() in ("", "0", "off", "no", "false"):
+            return None
+        setting = True if text.lower() in ("1", "on", "yes", "true") else _parse_overrides(text)
+    if not setting:
+        return None
+    kwargs = {} if setting is True else dict(setting)
+    for key, conv in (("heartbeat_ms", int), ("stall_ms", float), ("sample_ms", float), ("stall_max", int)):
+        if key in kwargs:
+            kwargs[key] = conv(kwargs[key])
+    return UIProfiler(root, **kwargs)
+
+
+# ---------- CLI ----------
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.uiprofile", description="Summarise a UI profile")
+    ap.add_argument("command", choices=("show",))
+    ap.add_argument("file")
+    ap.add_argument("--top", type=int, default=10, help="handlers/stalls to list")
+    args = ap.parse_args(argv)
+
+    with open(args.file) as f:
+        snap = json.load(f)
+    loop = snap["loop"]
+    print(f"pid {snap['pid']}, {snap['started']} .. {snap['taken']}, heartbeat {snap['heartbeat_ms']} ms")
+    print(f"event loop: {loop['stalls']} stalls over {snap['stall_ms']:g} ms in {loop['beats']} beats, "
+          f"{loop['stall_ms']:.0f} ms stalled (worst {loop['worst_ms']:.0f} ms, "
+          f"{loop['untracked_ms']:.0f} ms outside handlers)")
+    print("\nhandlers by total time")
+    print(f"{'count':>8s} {'total ms':>10s} {'p50 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}  handler")
+    for r in snap["handlers"][:args.top]:
+        print(f"{r['count']:>8,d} {r['total_ms']:>10.1f} {r.get('p50_ms', 0):>8.2f} {r.get('p99_ms', 0):>8.2f} "
+              f"{r['max_ms']:>8.2f}  {r['name'][:90]}")
+    print(f"\nstalls ({len(snap['stalls'])} logged, worst first)")
+    for s in sorted(snap["stalls"], key=lambda s: -s["ms"])[:args.top]:
+        print(f"  {s['at']}  {s['ms']:9.1f} ms  ({s['untracked_ms']:.1f} ms untracked)")
+        for h in s["handlers"]:
+            print(f"      {h['ms']:9.1f} ms  {h['name'][:90]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
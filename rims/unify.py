@@ -0,0 +1,281 @@
+# rims/unify.py
+# Online, batched rewrite of an existing `rentals` table (V1.0 or V1.1 layout)
+# into the canonical layout from rims/schema.py.
+#
+# The copy runs in bounded chunks, each its own short BEGIN IMMEDIATE
+# transaction, so other terminals keep reading and writing in between. Triggers
+# on the old table mirror any writes that land while the copy is running, and
+# progress is stored in `schema_migration_state`, so a killed run simply
+# resumes from the last committed chunk. The final cut-over (rename) is a
+# single short transaction.
+#
+#   python -m rims.unify rental_inventory.db --chunk 20000
+
+import argparse
+import re
+import sqlite3
+import time
+
+from . import schema
+
+NEW_TABLE = "rentals_canonical"
+LEGACY_TABLE = "rentals_legacy"
+STATE_NAME = "rentals_canonical"
+TRIGGER_PREFIX = "_unify_"
+
+
+class UnifyError(RuntimeError):
+    pass
+
+
+def _ensure_state(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_migration_state(
+        name TEXT PRIMARY KEY,
+        source_layout TEXT,
+        last_rowid INTEGER DEFAULT 0,
+        rows_copied INTEGER DEFAULT 0,
+        total_rows INTEGER DEFAULT 0,
+        started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        finished_at DATETIME
+    )""")
+
+
+def _state(conn):
+    _ensure_state(conn)
+    row = conn.execute("SELECT source_layout, last_rowid, rows_copied, total_rows, finished_at "
+                       "FROM schema_migration_state WHERE name=?", (STATE_NAME,)).fetchone()
+    if row is None:
+        return None
+    return dict(zip(("source_layout", "last_rowid", "rows_copied", "total_rows", "finished_at"), row))
+
+
+def _select_exprs(source_cols):
+    """Canonical column -> SQL expression over the legacy row."""
+    source = set(source_cols)
+    exprs = []
+    for name in schema.RENTALS_COLUMN_NAMES:
+        src = name if name in source else next(
+            (alias for alias in schema.RENTALS_ALIASES.get(name, ()) if alias in source), None)
+        if name == "discount" and src:
+            # V1.1 stored "5%" / "Select"
+            expr = (f"CASE WHEN typeof({src}) IN ('integer','real') THEN {src} "
+                    f"WHEN {src} GLOB '[0-9]*' THEN CAST(REPLACE({src},'%','') AS REAL) ELSE 0 END")
+        elif src:
+            expr = src
+        elif name == "app_date" and "created_date" in source:
+            expr = "date(created_date)"
+        else:
+            expr = "NULL"
+        exprs.append(expr)
+    return exprs
+
+
+def _copy_sql(source_cols, where):
+    cols = ", ".join(schema.RENTALS_COLUMN_NAMES)
+    exprs = ", ".join(_select_exprs(source_cols))
+    return f"INSERT OR IGNORE INTO {NEW_TABLE}({cols}) SELECT {exprs} FROM rentals WHERE {where}"
+
+
+def _mirror_triggers(source_cols):
+    cols = ", ".join(schema.RENTALS_COLUMN_NAMES)
+    exprs = ", ".join(_select_exprs(source_cols))
+    upsert = (f"INSERT OR REPLACE INTO {NEW_TABLE}({cols}) "
+              f"SELECT {exprs} FROM rentals WHERE rental_id = NEW.rental_id;")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}ai AFTER INSERT ON rentals BEGIN {upsert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}au AFTER UPDATE ON rentals BEGIN "
+        f"DELETE FROM {NEW_TABLE} WHERE rental_id = OLD.rental_id; {upsert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}ad AFTER DELETE ON rentals BEGIN "
+        f"DELETE FROM {NEW_TABLE} WHERE rental_id = OLD.rental_id; END",
+    ]
+
+
+def _objects_on(conn, kind, table):
+    return conn.execute("SELECT name, sql FROM sqlite_master WHERE type=? AND tbl_name=? AND sql IS NOT NULL",
+                        (kind, table)).fetchall()
+
+
+def _retarget_index(sql, table):
+    return re.sub(r"\bON\s+\"?rentals\"?\s*\(", f"ON {table}(", sql, count=1, flags=re.I)
+
+
+class Unifier:
+    """Converts `rentals` to the canonical layout in ``chunk``-row transactions.
+
+    ``progress(info)`` is called after every chunk with rows_copied, total_rows,
+    rows_per_sec and elapsed.
+    """
+
+    def __init__(self, conn, chunk=20000, progress=None, keep_legacy=False, pause=0.0):
+        if conn.in_transaction:
+            raise UnifyError("Unifier needs a connection with no open transaction")
+        self.conn = conn
+        self.chunk = chunk
+        self.progress = progress
+        self.keep_legacy = keep_legacy
+        self.pause = pause      # seconds to sleep between chunks, to yield the write lock
+
+    def needed(self):
+        layout = schema.layout_name(self.conn)
+        return layout not in ("canonical", "missing") or self._pending_drop()
+
+    def _pending_drop(self):
+        return (not self.keep_legacy and
+                bool(schema.table_columns(self.conn, LEGACY_TABLE)))
+
+    def run(self):
+        """Run (or resume) the conversion. Returns the final state dict."""
+        layout = schema.layout_name(self.conn)
+        if layout == "unknown":
+            raise UnifyError("rentals has an unrecognised layout: "
+                             + ", ".join(schema.table_columns(self.conn, "rentals")))
+        if layout not in ("canonical", "missing"):
+            source_cols = schema.table_columns(self.conn, "rentals")
+            self._start(layout, source_cols)
+            self._copy(source_cols)
+            self._cutover(source_cols)
+        if self._pending_drop():
+            self._write("DROP TABLE IF EXISTS " + LEGACY_TABLE)
+        return _state(self.conn)
+
+    # ---------- phases ----------
+    def _write(self, *statements):
+        c = self.conn
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            for sql in statements:
+                c.execute(sql)
+            c.commit()
+        except BaseException:
+            c.rollback()
+            raise
+
+    def _start(self, layout, source_cols):
+        c = self.conn
+        _ensure_state(c)
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            st = _state(c)
+            resuming = (st is not None and st["finished_at"] is None
+                        and schema.table_columns(c, NEW_TABLE))
+            if not resuming:
+                c.execute(f"DROP TABLE IF EXISTS {NEW_TABLE}")
+                c.execute(schema.create_rentals_sql(NEW_TABLE))
+                # move the secondary indexes over now, so the cut-over is a rename only
+                for name, sql in _objects_on(c, "index", "rentals"):
+                    c.execute(f'DROP INDEX "{name}"')
+                    c.execute(_retarget_index(sql, NEW_TABLE))
+                for sql in _mirror_triggers(source_cols):
+                    c.execute(sql)
+                total = c.execute("SELECT COUNT(*) FROM rentals").fetchone()[0]
+                c.execute("INSERT OR REPLACE INTO schema_migration_state"
+                          "(name, source_layout, last_rowid, rows_copied, total_rows) VALUES(?,?,0,0,?)",
+                          (STATE_NAME, layout, total))
+            c.commit()
+        except BaseException:
+            c.rollback()
+            raise
+
+    def _copy(self, source_cols):
+        c = self.conn
+        st = _state(c)
+        last, copied, total = st["last_rowid"], st["rows_copied"], st["total_rows"]
+        copy_sql = _copy_sql(source_cols, "rental_id > ? AND rental_id <= ?")
+        t0 = time.perf_counter()
+        done_this_run = 0
+        while True:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                hi = c.execute("SELECT MAX(rental_id) FROM (SELECT rental_id FROM rentals "
+                               "WHERE rental_id > ? ORDER BY rental_id LIMIT ?)",
+                               (last, self.chunk)).fetchone()[0]
+                if hi is None:
+                    c.rollback()
+                    break
+                n = c.execute(copy_sql, (last, hi)).rowcount
+                n = max(n, 0)
+                copied += n
+                done_this_run += n
+                last = hi
+                c.execute("UPDATE schema_migration_state SET last_rowid=?, rows_copied=? WHERE name=?",
+                          (last, copied, STATE_NAME))
+                c.commit()
+            except BaseException:
+                c.rollback()
+                raise
+            if self.progress:
+                elapsed = time.perf_counter() - t0
+                self.progress(dict(rows_copied=copied, total_rows=total, last_rowid=last,
+                                   elapsed=elapsed,
+                                   rows_per_sec=done_this_run / elapsed if elapsed else 0.0))
+            if self.pause:
+                time.sleep(self.pause)
+
+    def _cutover(self, source_cols):
+        c = self.conn
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            # anything that slipped in after the last chunk
+            last = _state(c)["last_rowid"]
+            c.execute(_copy_sql(source_cols, "rental_id > ?"), (last,))
+            legacy = c.execute("SELECT COUNT(*) FROM rentals").fetchone()[0]
+            new = c.execute(f"SELECT COUNT(*) FROM {NEW_TABLE}").fetchone()[0]
+            if legacy != new:
+                raise UnifyError(f"row count mismatch before cut-over: rentals={legacy} {NEW_TABLE}={new}")
+            seq = c.execute("SELECT seq FROM sqlite_sequence WHERE name='rentals'").fetchone()
+            # other triggers on rentals (search/aggregates sync) move to the new table
+            moved = []
+            for name, sql in _objects_on(c, "trigger", "rentals"):
+                c.execute(f'DROP TRIGGER "{name}"')
+                if not name.startswith(TRIGGER_PREFIX):
+                    moved.append(sql)
+            c.execute(f"ALTER TABLE rentals RENAME TO {LEGACY_TABLE}")
+            c.execute(f"ALTER TABLE {NEW_TABLE} RENAME TO rentals")
+            for sql in moved:
+                c.execute(sql)
+            if seq:
+                c.execute("UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name='rentals'", (seq[0],))
+            c.execute("UPDATE schema_migration_state SET finished_at=CURRENT_TIMESTAMP, rows_copied=? "
+                      "WHERE name=?", (new, STATE_NAME))
+            c.commit()
+        except BaseException:
+            c.rollback()
+            raise
+
+
+def ensure_canonical(conn, **kwargs):
+    """Convert `rentals` to the canonical layout if it is not already; no-op otherwise."""
+    u = Unifier(conn, **kwargs)
+    if u.needed():
+        return u.run()
+    return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m rims.unify",
+                                 description="Rewrite rentals into the canonical V1.0/V1.1 layout")
+    ap.add_argument("db", nargs="?", default="rental_inventory.db")
+    ap.add_argument("--chunk", type=int, default=20000, help="rows per transaction")
+    ap.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between chunks")
+    ap.add_argument("--keep-legacy", action="store_true", help="keep the old table as rentals_legacy")
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        print(f"rentals layout: {schema.layout_name(conn)}")
+
+        def report(p):
+            pct = 100.0 * p["rows_copied"] / p["total_rows"] if p["total_rows"] else 100.0
+            print(f"  {p['rows_copied']:>10,d}/{p['total_rows']:,d} ({pct:5.1f}%)  "
+                  f"{p['rows_per_sec']:,.0f} rows/s", flush=True)
+
+        state = ensure_canonical(conn, chunk=args.chunk, progress=report,
+                                 keep_legacy=args.keep_legacy, pause=args.pause)
+        print("done" if state else "nothing to do", f"- rentals layout: {schema.layout_name(conn)}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,193 @@
+# rims/virtual_tree.py
+# Virtual-list mode for a ttk.Treeview.
+#
+# The Treeview only ever holds as many items as fit on screen; scrolling
+# rewrites their values from a KeysetPager window instead of inserting one Tk
+# item per row, so Tk memory stays constant whatever the size of the rentals
+# table.
+#
+# With a TaskExecutor (``tasks``) the Tk thread never queries: a window that is
+# not in the pager's cache shows placeholder rows while the pages are read on a
+# worker, coalesced under one key so a scrollbar drag costs one read per pause.
+# The same worker call then prefetches the neighbouring pages. Without one,
+# everything runs inline (headless use).
+
+from tkinter import ttk
+
+
+class VirtualTreeview:
+    """Drive ``tree`` (a ttk.Treeview) and ``scrollbar`` from a pager.
+
+    ``fmt(row)`` turns a pager row into the tuple of values shown.
+    ``tasks`` (a TaskExecutor) moves the pager's queries off the Tk thread.
+    """
+
+    PLACEHOLDER = ("…",)
+
+    def __init__(self, tree, scrollbar, pager=None, fmt=None, rows=20, tasks=None, key=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fmt = fmt or (lambda r: r)
+        self.tasks = tasks
+        self.key = key or ("virtual-tree", str(tree))
+        self.pager = None
+        self.offset = 0
+        self.visible = rows
+        self._slots = []
+        self._drawn = None          # (pager, offset, visible) the slots show
+        self._prefetch_job = None
+
+        tree.configure(height=rows, yscrollcommand="")
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", self._on_resize, add="+")
+        tree.bind("<MouseWheel>", self._on_wheel, add="+")
+        tree.bind("<Button-4>", lambda e: self.scroll(-3), add="+")
+        tree.bind("<Button-5>", lambda e: self.scroll(3), add="+")
+        tree.bind("<Prior>", lambda e: self.scroll(-self.visible), add="+")
+        tree.bind("<Next>", lambda e: self.scroll(self.visible), add="+")
+        tree.bind("<Home>", lambda e: self.goto(0), add="+")
+        tree.bind("<End>", lambda e: self.goto(self.total()), add="+")
+        if pager is not None:
+            self.set_pager(pager)
+
+    # ---------- data ----------
+    def set_pager(self, pager):
+        self.pager = pager
+        self.offset = 0
+        self._drawn = None
+        self.render()
+
+    def refresh(self):
+        """Re-read the current window (after inserts/deletes)."""
+        if self.pager is not None:
+            self._drawn = None
+            self._load(invalidate=True)
+
+    def total(self):
+        # only what is known: the count is read with the first window
+        return (self.pager.known_count() or 0) if self.pager is not None else 0
+
+    # ---------- scrolling ----------
+    def scroll(self, rows):
+        self.goto(self.offset + rows)
+        return "break"
+
+    def goto(self, offset):
+        top = max(0, self.total() - self.visible)
+        offset = max(0, min(int(offset), top))
+        if offset != self.offset:
+            self.offset = offset
+            self.tree.selection_remove(self.tree.selection())
+            self.render()
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"|"pages")."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.goto(float(args[1]) * self.total())
+        elif args[0] == "scroll":
+            n = int(args[1])
+            self.scroll(n * self.visible if args[2] == "pages" else n)
+
+    def _on_wheel(self, e):
+        return self.scroll(-3 if e.delta > 0 else 3)
+
+    def _row_height(self):
+        try:
+            return int(ttk.Style(self.tree).lookup("Treeview", "rowheight") or 20)
+        except (TypeError, ValueError):
+            return 20
+
+    def _on_resize(self, _e=None):
+        # rows that fit below the heading row
+        height = self.tree.winfo_height()
+        rh = self._row_height()
+        rows = max(1, (height - rh - 4) // rh) if height > 1 else self.visible
+        if rows != self.visible:
+            self.visible = rows
+            self.tree.configure(height=rows)
+            self.render()
+
+    # ---------- drawing ----------
+    def _ensure_slots(self, n):
+        while len(self._slots) < n:
+            self._slots.append(self.tree.insert("", "end", values=()))
+        while len(self._slots) > n:
+            self.tree.delete(self._slots.pop())
+
+    def render(self):
+        if self.pager is None:
+            self._ensure_slots(0)
+            return
+        total = self.pager.known_count()
+        if total is not None:
+            self.offset = max(0, min(self.offset, max(0, total - self.visible)))
+        rows = self.pager.peek(self.offset, self.offset + self.visible)
+        if rows is None:
+            # not cached: placeholders now, the real rows when the worker has them
+            n = self.visible if total is None else max(0, min(self.visible, total - self.offset))
+            self._draw([self.PLACEHOLDER] * n, total or 0, formatted=True)
+            self._drawn = None
+            self._load()
+            return
+        self._draw(rows, total)
+        self._drawn = (self.pager, self.offset, self.visible)
+        self._schedule_prefetch()
+
+    def _draw(self, rows, total, formatted=False):
+        self._ensure_slots(len(rows))
+        for iid, row in zip(self._slots, rows):
+            self.tree.item(iid, values=row if formatted else self.fmt(row))
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # ---------- loading ----------
+    def _load(self, invalidate=False):
+        args = (self.pager, self.offset, self.visible, invalidate)
+        if self.tasks is None:
+            self._loaded(self._read(*args))
+        else:
+            self.tasks.submit(self._read, *args, key=self.key, on_done=self._loaded)
+
+    @staticmethod
+    def _read(pager, offset, visible, invalidate):
+        # worker thread: the window, then its neighbours into the cache
+        if invalidate:
+            pager.invalidate()
+        total = pager.count()
+        offset = max(0, min(offset, max(0, total - visible)))
+        rows = pager.rows(offset, min(total, offset + visible))
+        ps = pager.page_size
+        for p in ((offset + visible) // ps + 1, offset // ps - 1):
+            pager.prefetch(p)
+        return pager, offset, visible, rows
+
+    def _loaded(self, result):
+        pager, offset, visible, rows = result
+        if pager is not self.pager:
+            return          # a newer pager was set meanwhile
+        if (offset, visible) == (self.offset, self.visible):
+            if self._drawn != (pager, offset, visible):
+                self._draw(rows, pager.known_count())
+                self._drawn = (pager, offset, visible)
+        elif self._drawn != (self.pager, self.offset, self.visible):
+            self.render()   # scrolled on while this window loaded
+
+    def _schedule_prefetch(self):
+        if self._prefetch_job is not None:
+            self.tree.after_cancel(self._prefetch_job)
+        self._prefetch_job = self.tree.after_idle(self._prefetch)
+
+    def _prefetch(self):
+        self._prefetch_job = None
+        if self.pager is None:
+            return
+        ps = self.pager.page_size
+        first = self.offset // ps
+        last = (self.offset + self.visible) // ps
+        if all(p < 0 or self.pager.cached(p) or p * ps >= self.total() for p in (last + 1, first - 1)):
+            return
+        self._load()
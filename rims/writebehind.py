@@ -0,0 +1,182 @@
+# rims/writebehind.py
+# Group-commit write-behind queue for SQLite.
+#
+# Writes (any callable using the pool's thread connection, e.g.
+# RentalService.insert_rental) are handed to one writer thread, which commits
+# them together in a single BEGIN IMMEDIATE ... COMMIT once ``max_rows`` are
+# queued or ``flush_ms`` after the first of them arrived, whichever comes
+# first - a burst of saves pays for one commit (one fsync) instead of one each.
+# The default flush_ms=0 commits whatever is queued as soon as the writer is
+# free: saves arriving during one COMMIT form the next batch, so batches grow
+# with load (and with fsync cost) without a fixed wait on every save.
+# Each write runs in its own SAVEPOINT, so a failing one (a full booking, a
+# bad row) is rolled back alone and the rest of the batch still commits.
+#
+# submit() returns a concurrent.futures.Future: the durability ack. It is
+# resolved only after the COMMIT containing the write has returned. With
+# ``durable=True`` the writer runs synchronous=FULL, so an acknowledged write
+# survives power loss as well as a killed process (WAL + NORMAL, the "desk"
+# profile, only promises the latter). benchmarks/crash_recovery.py checks it.
+#
+#   wb = WriteBehind(svc.pool, flush_ms=20, max_rows=100)
+#   rental_id, ref = wb.call(svc.insert_rental, row, start, end)   # waits for the ack
+#   ack = wb.submit(svc.add_customer, "Jo Bloggs")                  # or keep the future
+#   wb.close()
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .storage import _parse_overrides
+
+FLUSH_MS = 0.0
+MAX_ROWS = 100
+
+
+class WriteBehind:
+    """One writer thread group-committing the writes submitted to it."""
+
+    def __init__(self, pool, flush_ms=FLUSH_MS, max_rows=MAX_ROWS, durable=True):
+        self.pool = pool
+        self.flush_ms = float(flush_ms)
+        self.max_rows = max(1, int(max_rows))
+        self.durable = durable
+        self._queue = queue.Queue()
+        self._closed = False
+        self.stats = dict(writes=0, failed_writes=0, batches=0, largest_batch=0, commit_seconds=0.0)
+        self._thread = threading.Thread(target=self._write_loop, name="rims-writer", daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"WriteBehind(flush_ms={self.flush_ms:g}, max_rows={self.max_rows}, durable={self.durable})"
+
+    # ---------- submitting (any thread) ----------
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)``; returns a Future resolved with its
+        result (or exception) once the batch it ran in has committed."""
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        future = Future()
+        self._queue.put((fn, args, kwargs, future))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """submit() and wait for the ack. On the writer thread itself (a write
+        calling another) ``fn`` just runs inside the current batch."""
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def flush(self, timeout=None):
+        """Commit everything queued so far now, without waiting out flush_ms."""
+        if not self._closed:
+            self.submit(None).result(timeout)
+
+    def close(self):
+        """Commit what is queued, then stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---------- writer ----------
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.flush_ms / 1000.0
+        while len(batch) < self.max_rows and batch[-1][0] is not None:    # None fn: flush() barrier
+            try:
+                # take what is already queued; then wait out flush_ms for more
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                wait = deadline - time.perf_counter()
+                if wait <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=wait)
+                except queue.Empty:
+                    break
+            if item is None:
+                self._queue.put(None)        # finish this batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _run_batch(self, batch):
+        outcomes = []
+        t = time.perf_counter()
+        try:
+            if self.durable:
+                # set per batch: a later storage.configure() re-applies the profile's level
+                self.pool.connection().execute("PRAGMA synchronous = FULL")
+            with self.pool.connect(immediate=True) as c:
+                for fn, args, kwargs, future in batch:
+                    # a write cancelled while queued is not run at all
+                    if not future.set_running_or_notify_cancel() or fn is None:
+                        outcomes.append((None, None))
+                        continue
+                    c.execute("SAVEPOINT rims_write")
+                    try:
+                        result = fn(*args, **kwargs)
+                    except Exception as e:
+                        c.execute("ROLLBACK TO rims_write")
+                        c.execute("RELEASE rims_write")
+                        outcomes.append((e, None))
+                    else:
+                        c.execute("RELEASE rims_write")
+                        outcomes.append((None, result))
+        except Exception as e:              # BEGIN/COMMIT failed: nothing in the batch was saved
+            outcomes = [(e, None)] * len(batch)
+        writes = sum(1 for item in batch if item[0] is not None)
+        self.stats["commit_seconds"] += time.perf_counter() - t
+        self.stats["batches"] += 1
+        self.stats["writes"] += writes
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], writes)
+        for (fn, _, _, future), (exc, result) in zip(batch, outcomes):
+            if future.cancelled() or (not future.running() and not future.set_running_or_notify_cancel()):
+                continue                    # cancelled before it ran
+            if exc is not None:
+                if fn is not None:
+                    self.stats["failed_writes"] += 1
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def _write_loop(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                self._run_batch(batch)
+        finally:
+            self.pool.close_thread()
+
+
+def from_setting(pool, setting=None):
+    """A WriteBehind for ``setting``, or None for direct writes.
+
+    ``setting`` is False/None (off), True (defaults), a dict of WriteBehind
+    arguments or a string such as "flush_ms=20,max_rows=50"; None falls back
+    to $RIMS_WRITE_BEHIND ("1"/"on" for the defaults).
+    """
+    if setting is None:
+        setting = os.environ.get("RIMS_WRITE_BEHIND") or False
+    if isinstance(setting, str):
+        text = setting.strip().lower()
+        if text in ("", "0", "off", "no", "false"):
+            return None
+        if text in ("1", "on", "yes", "true"):
+            setting = True
+        else:
+            setting = _parse_overrides(text)
+            if "durable" in setting:
+                setting["durable"] = setting["durable"] not in ("0", "off", "no", "false")
+    if not setting:
+        return None
+    return WriteBehind(pool, **({} if setting is True else setting))
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims import bulk                       # noqa: E402
+from rims.service import RentalService      # noqa: E402
+
+
+def branch(path, n):
+    """A database holding ``n`` rentals with refs from its own counter."""
+    svc = RentalService(str(path))
+    for _ in range(n):
+        svc.insert_rental({"product_type": "Car", "total": 10.0})
+    svc.close()
+
+
+def load(db, csv_path, **kw):
+    conn = sqlite3.connect(str(db), isolation_level=None)
+    try:
+        return bulk.import_csv(conn, "rentals", str(csv_path), **kw)
+    finally:
+        conn.close()
+
+
+def refs(db):
+    conn = sqlite3.connect(str(db))
+    try:
+        return [r for (r,) in conn.execute("SELECT receipt_ref FROM rentals ORDER BY rental_id")]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def exported(tmp_path):
+    branch(tmp_path / "a.db", 3)
+    conn = sqlite3.connect(str(tmp_path / "a.db"))
+    bulk.export_csv(conn, "rentals", str(tmp_path / "a.csv"))
+    conn.close()
+    return tmp_path / "a.csv"
+
+
+def test_booking_after_import_into_fresh_database(tmp_path, exported):
+    RentalService(str(tmp_path / "b.db")).close()
+    res = load(tmp_path / "b.db", exported)
+    assert res["rows"] == 3 and res["renumbered"] == 0
+    svc = RentalService(str(tmp_path / "b.db"))
+    try:
+        assert svc.insert_rental({"product_type": "Van"})[1] == "BILL-000004"
+    finally:
+        svc.close()
+
+
+@pytest.mark.parametrize("on_conflict", ["abort", "ignore"])
+def test_colliding_refs_are_renumbered_not_dropped(tmp_path, exported, on_conflict):
+    branch(tmp_path / "b.db", 2)                # BILL-000001, BILL-000002 already taken
+    res = load(tmp_path / "b.db", exported, on_conflict=on_conflict)
+    assert res["rows"] == 3
+    assert [(old, new) for _, old, new in res["renumbered_refs"]] == [("BILL-000001", "BILL-000004"),
+                                                                     ("BILL-000002", "BILL-000005")]
+    assert sorted(refs(tmp_path / "b.db")) == [f"BILL-{n:06d}" for n in range(1, 6)]
+
+
+def test_ignored_rows_are_not_counted(tmp_path, exported):
+    branch(tmp_path / "b.db", 2)
+    res = load(tmp_path / "b.db", exported, on_conflict="ignore", renumber_refs=False)
+    assert res["rows"] == 1
+    assert len(refs(tmp_path / "b.db")) == 3
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims import receipts                   # noqa: E402
+from rims.service import RentalService      # noqa: E402
+
+
+@pytest.fixture
+def service(tmp_path):
+    svc = RentalService(str(tmp_path / "rentals.db"))
+    yield svc
+    svc.close()
+
+
+def test_counter_skips_refs_merged_from_another_file(service):
+    # another branch's rental, numbered by that branch's counter
+    service.insert_rental({"receipt_ref": "BILL-000001", "product_type": "Car"})
+    _, ref = service.insert_rental({"product_type": "Car"})
+    assert ref == "BILL-000002"
+
+
+def test_counter_jumps_past_the_highest_merged_ref(service):
+    service.insert_rental({"receipt_ref": "BILL-000001", "product_type": "Car"})
+    service.insert_rental({"receipt_ref": "BILL-000007", "product_type": "Car"})
+    refs = [service.insert_rental({"product_type": "Van"})[1] for _ in range(3)]
+    assert refs == ["BILL-000008", "BILL-000009", "BILL-000010"]
+
+
+def test_parse_ref():
+    assert receipts.parse_ref("BILL-000042") == 42
+    assert receipts.parse_ref("BILL123456") is None
+    assert receipts.parse_ref(None) is None
@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+import time
+import tkinter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rims.tasks import TaskExecutor     # noqa: E402
+
+
+@pytest.fixture
+def executor():
+    root = tkinter.Tcl()      # an event loop without a display
+    ex = TaskExecutor(root, workers=1, poll_ms=5)
+    yield root, ex
+    ex.shutdown()
+
+
+def pump(root, until, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not until():
+        assert time.monotonic() < deadline, "timed out"
+        root.tk.dooneevent(tkinter._tkinter.DONT_WAIT) or time.sleep(0.005)
+
+
+def test_cancelled_queued_task_releases_its_key(executor):
+    root, ex = executor
+    gate = threading.Event()
+    ex.submit(gate.wait, 5)                         # holds the only worker
+    ran = []
+    ex.submit(ran.append, "first", key="save-rental")
+    ex.cancel_all()
+    gate.set()
+    pump(root, lambda: not ex.pending("save-rental") and ex.active == 0)
+    assert ran == []
+    assert ex.stats["cancelled"] == 1
+
+    done = []
+    ex.submit(lambda: "second", key="save-rental", on_done=done.append)
+    pump(root, lambda: done)
+    assert done == ["second"]
+    assert ex.active == 0
+
+
+def test_submit_after_cancel_of_pending_task_is_not_swallowed(executor):
+    root, ex = executor
+    gate = threading.Event()
+    ex.submit(gate.wait, 5)
+    ex.submit(lambda: "old", key="history")
+    ex.cancel("history")
+    done = []
+    ex.submit(lambda: "new", key="history", on_done=done.append)
+    gate.set()
+    pump(root, lambda: done)
+    assert done == ["new"]
+
+
+def test_result_is_delivered_when_cancelled_while_running(executor):
+    root, ex = executor
+    started, gate = threading.Event(), threading.Event()
+
+    def save():
+        started.set()
+        gate.wait(5)
+        return "BILL-000001"
+
+    done = []
+    ex.submit(save, key="save-rental", on_done=done.append)
+    started.wait(5)
+    ex.cancel_all()
+    gate.set()
+    pump(root, lambda: done)
+    assert done == ["BILL-000001"]
+    assert not ex.pending("save-rental")
+
+
+def test_quiet_tasks_stay_out_of_on_busy(executor):
+    root, ex = executor
+    busy = []
+    ex.on_busy = busy.append
+    done = []
+    ex.submit(lambda: None, key="catalog-poll", quiet=True, on_done=done.append)
+    pump(root, lambda: done and ex.active == 0)
+    assert busy == []
+    ex.submit(lambda: None, on_done=done.append)
+    pump(root, lambda: len(done) == 2 and ex.active == 0)
+    assert busy == [1, 0]